@@ -0,0 +1,210 @@
+# aggregates.py
+"""
+Agregados de ingesta para los paneles del dashboard.
+
+El timer mantiene un artefacto JSON pequeño (AGGREGATES_BLOB) con:
+
+- hourly: suma y conteo del puntaje de sentimiento por hora UTC (la misma
+  serie que prepare_series, pero sin recorrer los posts)
+- labels: total de posts por etiqueta de sentimiento
+- terms: frecuencia documental y etiquetas de los AGG_MAX_TERMS términos
+  más frecuentes
+- pairs: co-ocurrencia entre los AGG_PAIR_TERMS términos más frecuentes
+
+Cada ejecución suma las filas nuevas y resta la versión anterior de las que
+cambiaron, así que el costo no depende del historial. Los conteos de
+labels/hourly son exactos; terms/pairs son exactos para los términos que
+siempre estuvieron en la parte alta del ranking (un término que entra tarde
+al ranking no trae su historial de co-ocurrencia). El campo posts permite
+detectar un artefacto desfasado y reconstruirlo desde el estado completo.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from forecasting import sent_map
+from snapshot_deltas import changed_rows, merge_with_previous, superseded_rows
+from word_graph import build_elements, dominant_sentiment, incidence_matrix, prune_edges, tokenize_posts
+
+AGGREGATES_BLOB = "_agregados/agregados.json"
+AGG_MAX_TERMS = int(os.getenv("AGG_MAX_TERMS", 1000))
+AGG_PAIR_TERMS = int(os.getenv("AGG_PAIR_TERMS", 200))
+AGGREGATES_VERSION = 1
+
+_PAIR_SEP = "\t"
+
+
+def empty_aggregates() -> dict:
+    return {"version": AGGREGATES_VERSION, "posts": 0, "hourly": {}, "labels": {}, "terms": {}, "pairs": {}}
+
+
+def _hourly(df: pd.DataFrame) -> dict:
+    if "Fecha" not in df.columns or "Sentimiento" not in df.columns:
+        return {}
+    fechas = df["Fecha"]
+    if not isinstance(fechas.dtype, pd.DatetimeTZDtype):
+        fechas = pd.to_datetime(fechas, utc=True, errors="coerce", format="ISO8601")
+    valid = fechas.notna() & df["Sentimiento"].notna()
+    if not valid.any():
+        return {}
+    hours = fechas[valid].dt.floor("h").dt.strftime("%Y-%m-%dT%H:%M:%S")
+    scores = df.loc[valid, "Sentimiento"].astype(object).map(sent_map).fillna(0).astype(float)
+    grouped = pd.DataFrame({"h": hours.to_numpy(), "s": scores.to_numpy()}).groupby("h")["s"].agg(["sum", "count"])
+    return {h: [float(row["sum"]), int(row["count"])] for h, row in grouped.iterrows()}
+
+
+def _terms(frame: pd.DataFrame) -> dict:
+    if frame.empty:
+        return {}
+    counts = frame.groupby("token", sort=False).size()
+    labels = frame[frame["sent"] != ""].groupby(["token", "sent"], sort=False).size()
+    terms = {t: {"n": int(n), "s": {}} for t, n in counts.items()}
+    for (t, s), n in labels.items():
+        terms[t]["s"][s] = int(n)
+    return terms
+
+
+def _pairs(frame: pd.DataFrame, pair_terms, n_posts: int) -> dict:
+    terms = sorted(pair_terms)
+    if frame.empty or len(terms) < 2:
+        return {}
+    X = incidence_matrix(frame, terms, n_posts)
+    C = sp.triu(X.T @ X, k=1).tocoo()
+    return {f"{terms[a]}{_PAIR_SEP}{terms[b]}": int(w) for a, b, w in zip(C.row, C.col, C.data)}
+
+
+def _rank(terms: dict):
+    return sorted(terms, key=lambda t: (-terms[t]["n"], t))
+
+
+def _combine(target: dict, other: dict, sign: int) -> None:
+    """Suma (sign=1) o resta (sign=-1) other sobre target, sin podar."""
+    target["posts"] += sign * other["posts"]
+    for h, (s, n) in other["hourly"].items():
+        cur = target["hourly"].setdefault(h, [0.0, 0])
+        cur[0] += sign * s
+        cur[1] += sign * n
+    for label, n in other["labels"].items():
+        target["labels"][label] = target["labels"].get(label, 0) + sign * n
+    for t, info in other["terms"].items():
+        cur = target["terms"].setdefault(t, {"n": 0, "s": {}})
+        cur["n"] += sign * info["n"]
+        for s, n in info["s"].items():
+            cur["s"][s] = cur["s"].get(s, 0) + sign * n
+    for pair, n in other["pairs"].items():
+        target["pairs"][pair] = target["pairs"].get(pair, 0) + sign * n
+
+
+def _prune(agg: dict, max_terms: int, pair_terms: set) -> dict:
+    agg["hourly"] = {h: v for h, v in sorted(agg["hourly"].items()) if v[1] > 0}
+    agg["labels"] = {k: v for k, v in agg["labels"].items() if v > 0}
+    terms = {t: {"n": i["n"], "s": {s: n for s, n in i["s"].items() if n > 0}}
+             for t, i in agg["terms"].items() if i["n"] > 0}
+    agg["terms"] = {t: terms[t] for t in _rank(terms)[:max_terms]}
+    agg["pairs"] = {p: n for p, n in agg["pairs"].items()
+                    if n > 0 and all(t in pair_terms for t in p.split(_PAIR_SEP))}
+    return agg
+
+
+def _partial(df: pd.DataFrame, frame: pd.DataFrame, pair_terms=None) -> dict:
+    agg = empty_aggregates()
+    agg["posts"] = len(df)
+    agg["hourly"] = _hourly(df)
+    if "Sentimiento" in df.columns:
+        agg["labels"] = {str(k): int(v) for k, v in df["Sentimiento"].astype(object).value_counts().items()}
+    agg["terms"] = _terms(frame)
+    if pair_terms is not None:
+        agg["pairs"] = _pairs(frame, pair_terms, len(df))
+    return agg
+
+
+def _frame(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or "Post" not in df.columns:
+        return pd.DataFrame({"post": [], "token": [], "sent": []})
+    return tokenize_posts(df)
+
+
+def compute_aggregates(df: pd.DataFrame, max_terms: int = AGG_MAX_TERMS, pair_terms: int = AGG_PAIR_TERMS) -> dict:
+    """Agregados completos de un DataFrame de posts."""
+    frame = _frame(df)
+    agg = _partial(df, frame)
+    top = set(_rank(agg["terms"])[:pair_terms])
+    agg["pairs"] = _pairs(frame, top, len(df))
+    return _prune(agg, max_terms, top)
+
+
+def update_aggregates(previous: dict, df_new: pd.DataFrame, df_prev: pd.DataFrame,
+                      max_terms: int = AGG_MAX_TERMS, pair_terms: int = AGG_PAIR_TERMS) -> dict:
+    """
+    Agregados de apply_deltas(df_prev, [df_new]) a partir de los de df_prev:
+    suma las filas nuevas o cambiadas y resta su versión anterior. Si previous
+    no corresponde a df_prev (otra versión o distinto número de posts) se
+    reconstruye desde el estado completo.
+    """
+    if (not previous or previous.get("version") != AGGREGATES_VERSION
+            or previous.get("posts") != len(df_prev)):
+        return compute_aggregates(merge_with_previous(df_new, df_prev), max_terms, pair_terms)
+
+    added = changed_rows(df_new, df_prev)
+    if added.empty:
+        return previous
+    removed = superseded_rows(added, df_prev)
+
+    added_frame, removed_frame = _frame(added), _frame(removed)
+    agg = {**previous, "hourly": {h: list(v) for h, v in previous["hourly"].items()},
+           "labels": dict(previous["labels"]),
+           "terms": {t: {"n": i["n"], "s": dict(i["s"])} for t, i in previous["terms"].items()},
+           "pairs": dict(previous["pairs"])}
+    _combine(agg, _partial(added, added_frame), 1)
+    _combine(agg, _partial(removed, removed_frame), -1)
+
+    # Los pares se cuentan sólo entre los términos que quedan en la parte alta
+    ranked = {t: i for t, i in agg["terms"].items() if i["n"] > 0}
+    top = set(_rank(ranked)[:pair_terms])
+    _combine(agg, {**empty_aggregates(), "pairs": _pairs(added_frame, top, len(added))}, 1)
+    _combine(agg, {**empty_aggregates(), "pairs": _pairs(removed_frame, top, len(removed))}, -1)
+    return _prune(agg, max_terms, top)
+
+
+# -----------------------------
+# Lectura desde el dashboard
+# -----------------------------
+def label_counts(agg: dict) -> pd.DataFrame:
+    labels = agg.get("labels", {})
+    return pd.DataFrame({"Sentimiento": list(labels), "Posts": list(labels.values())})
+
+
+def hourly_series(agg: dict, resample_freq: str):
+    """Serie ds/y equivalente a prepare_series, desde las sumas y conteos por hora."""
+    hourly = agg.get("hourly", {})
+    if not hourly:
+        return None
+    df = pd.DataFrame([(h, s, n) for h, (s, n) in hourly.items()], columns=["ds", "sum", "count"])
+    df["ds"] = pd.to_datetime(df["ds"])
+    period = df.set_index("ds").sort_index().resample(resample_freq).sum()
+    y = (period["sum"] / period["count"].where(period["count"] > 0)).fillna(0)
+    return pd.DataFrame({"ds": period.index, "y": y.to_numpy()})
+
+
+def graph_elements(agg: dict, top_n: int, min_weight: int = 1, top_k_edges: int = None):
+    """Elementos de Cytoscape (mismo formato que generar_grafo_palabras) desde los agregados."""
+    terms = agg.get("terms", {})
+    top_terms = _rank(terms)[:top_n]
+    if not top_terms:
+        return []
+    index = {t: i for i, t in enumerate(top_terms)}
+    rows, cols, data = [], [], []
+    for pair, n in agg.get("pairs", {}).items():
+        a, b = pair.split(_PAIR_SEP)
+        if a in index and b in index:
+            i, j = sorted((index[a], index[b]))
+            rows.append(i)
+            cols.append(j)
+            data.append(n)
+    C = sp.coo_matrix((data, (rows, cols)), shape=(len(top_terms), len(top_terms))).tocsr()
+    a, b, w = prune_edges(C + C.T, min_weight=min_weight, top_k=top_k_edges)
+    sent_modes = {t: dominant_sentiment(terms[t]["s"]) for t in top_terms if terms[t]["s"]}
+    names = np.asarray(top_terms, dtype=object)
+    freqs = [terms[t]["n"] for t in top_terms]
+    return build_elements(top_terms, freqs, sent_modes, zip(names[a], names[b], w))
@@ -0,0 +1,112 @@
+# azure_sentiment.py
+"""
+Cliente del endpoint de sentimiento de Azure Text Analytics (v3.0).
+
+- Una sola requests.Session con pool de conexiones y reintentos (429/5xx,
+  respetando Retry-After), reutilizada entre invocaciones del mismo host.
+- Lotes que respetan los límites del servicio (10 documentos por petición,
+  5.120 caracteres por documento, 1 MB por petición) enviados en paralelo
+  con un máximo configurable de peticiones en vuelo, común a todos los
+  hilos que usan el mismo cliente (p. ej. varias páginas a la vez).
+- Los resultados se devuelven por id de documento, nunca por posición.
+"""
+
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ingest_metrics import http_hook, in_current_context
+
+MAX_DOCUMENTS_PER_REQUEST = 10
+MAX_CHARS_PER_DOCUMENT = 5120
+MAX_REQUEST_BYTES = 1_000_000
+SENTIMENT_CONCURRENCY = int(os.environ.get("AZURE_SENTIMENT_CONCURRENCY", 4))
+SENTIMENT_TIMEOUT_S = float(os.environ.get("AZURE_SENTIMENT_TIMEOUT_S", 30))
+SENTIMENT_LANGUAGE = os.environ.get("AZURE_TEXT_LANGUAGE")  # vacío = detección por defecto del servicio
+
+
+def make_batches(documents, max_documents: int = MAX_DOCUMENTS_PER_REQUEST, max_bytes: int = MAX_REQUEST_BYTES):
+    """Agrupa documentos {'id', 'text'} en lotes válidos para una petición."""
+    batches, batch, size = [], [], 0
+    for doc in documents:
+        language = doc.get("language", SENTIMENT_LANGUAGE)
+        doc = {"id": str(doc["id"]), "text": doc["text"][:MAX_CHARS_PER_DOCUMENT]}
+        if language:
+            doc["language"] = language
+        doc_bytes = len(json.dumps(doc, ensure_ascii=False).encode("utf-8")) + 1
+        if batch and (len(batch) >= max_documents or size + doc_bytes > max_bytes):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(doc)
+        size += doc_bytes
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class SentimentClient:
+    """Cliente con sesión HTTP compartida y lotes concurrentes."""
+
+    def __init__(self, endpoint: str, api_key: str, max_in_flight: int = SENTIMENT_CONCURRENCY,
+                 timeout: float = SENTIMENT_TIMEOUT_S, retries: int = 3):
+        self.url = f"{endpoint.rstrip('/')}/text/analytics/v3.0/sentiment"
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        # El límite es del cliente, no de cada llamada a analyze
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self.session = requests.Session()
+        self.session.headers.update({"Ocp-Apim-Subscription-Key": api_key, "Content-Type": "application/json"})
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset({"POST"}), respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.hooks["response"].append(http_hook("sentiment_http"))
+
+    def _post_batch(self, batch):
+        # Mismos bytes que midió make_batches (UTF-8 sin escapar)
+        data = json.dumps({"documents": batch}, ensure_ascii=False).encode("utf-8")
+        with self._in_flight:
+            response = self.session.post(self.url, data=data, timeout=self.timeout)
+        response.raise_for_status()
+        body = response.json()
+        for error in body.get("errors", []):
+            logging.warning(f"⚠️ Documento {error.get('id')} sin sentimiento: {error.get('error', {}).get('message')}")
+        return body.get("documents", [])
+
+    def analyze(self, documents) -> dict:
+        """
+        Analiza documentos {'id', 'text'} y devuelve {id: documento de resultado}.
+        Los documentos con error o que no regresan simplemente no aparecen.
+        """
+        batches = make_batches(documents)
+        if not batches:
+            return {}
+        results = {}
+        if len(batches) == 1 or self.max_in_flight == 1:
+            responses = map(self._post_batch, batches)
+        else:
+            executor = ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches)))
+            responses = executor.map(in_current_context(self._post_batch), batches)
+            executor.shutdown(wait=False)
+        for docs in responses:
+            for doc in docs:
+                results[doc["id"]] = doc
+        return results
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_sentiment_client(endpoint: str, api_key: str) -> SentimentClient:
+    """Cliente compartido por (endpoint, clave) para reutilizar conexiones entre invocaciones."""
+    with _clients_lock:
+        client = _clients.get((endpoint, api_key))
+        if client is None:
+            client = _clients[(endpoint, api_key)] = SentimentClient(endpoint, api_key)
+        return client
@@ -0,0 +1,329 @@
+# benchmarks/bench_dashboard.py
+"""
+Suite de escalabilidad del dashboard con datos sintéticos (benchmarks.synthetic).
+
+Para cada tamaño, en un proceso nuevo con el snapshot en una carpeta temporal:
+- load_latest_csv: lectura en frío (caché vacía) y en caliente
+- generar_grafo_palabras: grafo completo sobre todos los posts
+- build_forecast_figure: en frío (sin pronóstico en caché) y en caliente
+- callbacks: cada panel vía /_dash-update-component (cálculo + serialización
+  JSON de la respuesta), como los pide el navegador tras un refresco
+
+Se mide tiempo de pared (frío = primera llamada, caliente = mediana de
+--repeat), pico de memoria (tracemalloc, en una pasada aparte en frío para
+no inflar los tiempos) y bytes de la respuesta de cada callback.
+
+El resumen se imprime por pantalla; con --output se guardan además los
+resultados (JSON) con la configuración y el commit (fuera del repositorio).
+--baseline compara contra una corrida anterior y termina con código 1 si
+algún tiempo empeora más de --tolerance.
+
+Uso:
+    python benchmarks/bench_dashboard.py [--sizes 1000 10000 100000 1000000] [--repeat 3]
+        [--engine holtwinters] [--aggregates] [--skip generar_grafo_palabras]
+        [--output /tmp/bench_dashboard.json]
+        [--baseline anterior.json --tolerance 0.25]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# -----------------------------
+# Proceso hijo: un tamaño
+# -----------------------------
+def _payload(outputs, inputs, state=(), changed=None):
+    """
+    Cuerpo de /_dash-update-component tal como lo arma el navegador. inputs y
+    state van en el orden del callback; changed es el input que lo disparó
+    (por defecto el primero).
+    """
+    return {
+        "output": outputs[0][0] + "." + outputs[0][1] if len(outputs) == 1
+                  else ".." + "...".join(f"{i}.{p}" for i, p in outputs) + "..",
+        "outputs": [{"id": i, "property": p} for i, p in outputs],
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "state": [{"id": i, "property": p, "value": v} for i, p, v in state],
+        "changedPropIds": [changed or f"{inputs[0][0]}.{inputs[0][1]}"],
+    }
+
+
+def _measure(name: str, fn, reset, repeat: int) -> dict:
+    """Frío (tras reset), caliente (mediana de repeat) y pico de memoria en frío."""
+    import gc
+    import tracemalloc
+
+    # En stderr: si el proceso muere (p. ej. sin memoria) el padre sabe en qué medición
+    print(f"▶ {name}", file=sys.stderr, flush=True)
+    reset()
+    gc.collect()
+    t0 = time.perf_counter()
+    result = fn()
+    cold = time.perf_counter() - t0
+
+    warm = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        warm.append(time.perf_counter() - t0)
+
+    reset()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        "cold_s": round(cold, 5),
+        "warm_s": round(statistics.median(warm), 5) if warm else None,
+        "peak_mb": round(peak / 2 ** 20, 2),
+    }
+
+
+def run_child(args) -> dict:
+    import tempfile
+
+    folder = tempfile.mkdtemp(prefix="bench_dashboard_")
+    # Antes de importar el dashboard: lee su configuración al importarse
+    os.environ.update({
+        "CSV_FOLDER": folder,
+        "ENABLE_FB_LOGIN": "false",
+        "FORECAST_BACKGROUND": "false",  # el pronóstico se mide en el mismo hilo
+        "FORECAST_ENGINE": args.engine,
+        "USE_AGGREGATES": "true" if args.aggregates else "false",
+    })
+    os.environ.pop("DATA_CONTAINER", None)
+    os.environ.pop("FORECAST_CACHE_DIR", None)
+    sys.path.insert(0, ROOT)
+
+    import logging
+    import warnings
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+
+    from benchmarks.synthetic import generar_posts
+    from snapshot_format import serialize_snapshot, snapshot_extension
+
+    t0 = time.perf_counter()
+    df = generar_posts(args.size, seed=args.seed)
+    df.insert(0, "Id", [f"pagina_{i}" for i in range(len(df))])
+    t_generate = time.perf_counter() - t0
+    data = serialize_snapshot(df)
+    path = os.path.join(folder, f"sentimiento_2025-09-30_00-00-00{snapshot_extension()}")
+    with open(path, "wb") as f:
+        f.write(data)
+    snapshot_bytes = len(data)
+    del data
+    if args.aggregates:
+        from aggregates import AGGREGATES_BLOB, compute_aggregates
+        from snapshot_format import apply_schema
+        agg = compute_aggregates(apply_schema(df))
+        agg["updated_at"] = "bench"
+        os.makedirs(os.path.dirname(os.path.join(folder, AGGREGATES_BLOB)), exist_ok=True)
+        with open(os.path.join(folder, AGGREGATES_BLOB), "w", encoding="utf-8") as f:
+            json.dump(agg, f)
+    del df  # el dashboard trabaja sobre lo que lee del snapshot, como en producción
+
+    import forecasting
+    import dashboard_app
+    from word_graph import TokenIndex, generar_grafo_palabras
+
+    def reset_dataset():
+        dashboard_app._dataset_cache.update(folder=None, folder_mtime=None, latest=None, key=None, df=None)
+
+    def reset_forecast():
+        forecasting.forecast_cache = forecasting.ForecastCache()
+        forecasting._last_good.clear()
+
+    def reset_all():
+        # Los agregados quedan cargados, como tras el callback de versión
+        reset_dataset()
+        reset_forecast()
+        dashboard_app.token_index = TokenIndex(max_posts=dashboard_app.TOKEN_INDEX_MAX_POSTS)
+
+    results = {}
+    loaded, results["load_latest_csv"] = _measure("load_latest_csv", lambda: dashboard_app.load_latest_csv(folder)[0],
+                                                   reset_dataset, args.repeat)
+    if "generar_grafo_palabras" not in args.skip:
+        _, results["generar_grafo_palabras"] = _measure(
+            "generar_grafo_palabras", lambda: generar_grafo_palabras(loaded, top_n=dashboard_app.TOP_WORDS), lambda: None, args.repeat)
+    if "build_forecast_figure" not in args.skip:
+        _, results["build_forecast_figure"] = _measure(
+            "build_forecast_figure", lambda: forecasting.build_forecast_figure(loaded, dashboard_app.FORECAST_HOURS,
+                                                      dashboard_app.RESAMPLE_FREQ),
+            reset_forecast, args.repeat)
+
+    # Callbacks de un refresco completo, por el mismo camino que el navegador
+    client = dashboard_app.server.test_client()
+
+    def post(payload):
+        response = client.post("/_dash-update-component", json=payload)
+        assert response.status_code in (200, 204), response.status_code
+        return response
+
+    # El token no cambia entre resets (mismo archivo): se calcula una vez fuera de las mediciones
+    dashboard_app.load_aggregates()
+    dashboard_app.current_dataset()
+    version = dashboard_app.get_dataset_version()
+
+    callbacks = {
+        "callback_version": lambda: post(_payload(
+            [("dataset-version", "data"), ("last-update", "children")],
+            [("refresh-interval", "n_intervals", None)], [("dataset-version", "data", None)])),
+        "callback_histograma": lambda: post(_payload(
+            [("grafico-sentimientos", "figure"), ("histograma-version", "data")],
+            [("dataset-version", "data", version)], [("histograma-version", "data", None)])),
+        "callback_grafo": lambda: post(_payload(
+            [("grafo-palabras", "elements"), ("grafo-version", "data")],
+            [("dataset-version", "data", version)], [("grafo-version", "data", None)])),
+        "callback_tabla": lambda: post(_payload(
+            [("tabla-posts", "columns"), ("tabla-posts", "data"), ("tabla-posts", "page_count"),
+             ("tabla-version", "data")],
+            [("tabla-posts", "page_current", 0), ("tabla-posts", "page_size", 25),
+             ("tabla-posts", "sort_by", []), ("tabla-posts", "filter_query", ""),
+             ("dataset-version", "data", version)],
+            [("tabla-version", "data", None)], changed="dataset-version.data")),
+        "callback_pronostico": lambda: post(_payload(
+            [("forecast-sentimiento", "figure"), ("forecast-poll", "disabled"), ("forecast-version", "data")],
+            [("dataset-version", "data", version), ("forecast-poll", "n_intervals", None)],
+            [("forecast-version", "data", None)])),
+    }
+    for name, fn in callbacks.items():
+        if name in args.skip:
+            continue
+        response, results[name] = _measure(name, fn, reset_all, args.repeat)
+        results[name]["payload_bytes"] = len(response.data)
+
+    return {
+        "rows": args.size,
+        "generate_s": round(t_generate, 3),
+        "snapshot_bytes": snapshot_bytes,
+        "dataframe_mb": round(loaded.memory_usage(deep=True).sum() / 2 ** 20, 2),
+        "results": results,
+    }
+
+
+# -----------------------------
+# Proceso principal
+# -----------------------------
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def _print_size(run: dict) -> None:
+    print(f"\n{run['rows']:,} filas (snapshot {run['snapshot_bytes'] / 2 ** 20:.1f} MB, "
+          f"DataFrame {run['dataframe_mb']:.1f} MB)")
+    print(f"  {'medición':<24} {'frío':>10} {'caliente':>10} {'pico':>10} {'respuesta':>12}")
+    for name, r in run["results"].items():
+        warm = f"{r['warm_s'] * 1000:>8.1f}ms" if r["warm_s"] is not None else f"{'-':>10}"
+        payload = f"{r['payload_bytes']:>12,}" if "payload_bytes" in r else f"{'-':>12}"
+        print(f"  {name:<24} {r['cold_s'] * 1000:>8.1f}ms {warm} {r['peak_mb']:>8.1f}MB {payload}")
+
+
+def _compare(current: dict, baseline_path: str, tolerance: float, min_delta_s: float) -> bool:
+    """
+    Imprime las regresiones de tiempo contra baseline; True si no hay
+    ninguna. Diferencias menores a min_delta_s se ignoran (ruido).
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {run["rows"]: run["results"] for run in json.load(f)["runs"] if "results" in run}
+    ok = True
+    print(f"\nComparación con {baseline_path} (tolerancia {tolerance:.0%}):")
+    for run in current["runs"]:
+        previous = baseline.get(run["rows"], {})
+        for name, r in run.get("results", {}).items():
+            old = previous.get(name)
+            if not old:
+                continue
+            for metric in ("cold_s", "warm_s"):
+                if not old.get(metric) or r.get(metric) is None:
+                    continue
+                ratio = r[metric] / old[metric]
+                if ratio > 1 + tolerance and r[metric] - old[metric] > min_delta_s:
+                    ok = False
+                    print(f"  ❌ {run['rows']:>9,} {name:<24} {metric}: "
+                          f"{old[metric] * 1000:.1f}ms -> {r[metric] * 1000:.1f}ms (x{ratio:.2f})")
+    if ok:
+        print("  ✅ Sin regresiones")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engine", default="holtwinters", help="motor de pronóstico (FORECAST_ENGINE)")
+    parser.add_argument("--aggregates", action="store_true",
+                        help="escribir también el artefacto de agregados (paneles desde aggregates.py)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", nargs="+", default=[], metavar="MEDICIÓN",
+                        help="mediciones a omitir (p. ej. generar_grafo_palabras con 1M filas y poca memoria)")
+    parser.add_argument("--output", help="archivo donde guardar los resultados (JSON)")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=5, help="diferencias menores no cuentan como regresión")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return
+
+    runs = []
+    for size in args.sizes:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", "--size", str(size),
+               "--repeat", str(args.repeat), "--engine", args.engine, "--seed", str(args.seed)]
+        if args.aggregates:
+            cmd.append("--aggregates")
+        if args.skip:
+            cmd += ["--skip", *args.skip]
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            # Con 1M filas el proceso puede morir por memoria (-9): se registra y se sigue
+            last = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ""
+            reason = f"código de salida {proc.returncode}" + (f", {last}" if last else "")
+            print(f"\n⚠️ {size:,} filas: falló ({reason})", file=sys.stderr)
+            runs.append({"rows": size, "error": reason})
+            continue
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        runs.append(run)
+        _print_size(run)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {"repeat": args.repeat, "engine": args.engine, "aggregates": args.aggregates, "seed": args.seed,
+                   "skip": args.skip},
+        "runs": runs,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Resultados en {args.output}")
+
+    if args.baseline and not _compare(report, args.baseline, args.tolerance, args.min_delta_ms / 1000):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
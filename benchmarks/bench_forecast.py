@@ -0,0 +1,75 @@
+# benchmarks/bench_forecast.py
+"""
+Compara los motores de pronóstico (latencia de ajuste y precisión) sobre
+los snapshots de datos/ y, opcionalmente, sobre series sintéticas.
+
+Para cada serie se reservan las últimas --horizon horas como prueba, se
+ajusta con el resto y se reporta MAE, RMSE y cobertura del intervalo.
+
+Uso:
+    python benchmarks/bench_forecast.py [--folder datos] [--horizon 8] [--synthetic 1000 10000]
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import logging
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from forecasting import FORECAST_ENGINES, prepare_series
+from benchmarks.synthetic import generar_posts
+
+
+def _series(folder, freq, synthetic):
+    for path in sorted(glob.glob(os.path.join(folder, "*.csv"))):
+        yield os.path.basename(path), prepare_series(pd.read_csv(path), freq)
+    for n in synthetic:
+        yield f"sintético {n} posts", prepare_series(generar_posts(n, seed=n), freq)
+
+
+def _evaluar(fit, train, test, horizon, freq, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        forecast = fit(train, horizon, freq)
+        tiempos.append(time.perf_counter() - t0)
+    pred = forecast.tail(horizon)
+    err = test["y"].to_numpy() - pred["yhat"].to_numpy()
+    dentro = (test["y"].to_numpy() >= pred["yhat_lower"].to_numpy()) & (test["y"].to_numpy() <= pred["yhat_upper"].to_numpy())
+    return np.median(tiempos), np.abs(err).mean(), np.sqrt((err ** 2).mean()), dentro.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", default=os.getenv("CSV_FOLDER", "datos"))
+    parser.add_argument("--horizon", type=int, default=int(os.getenv("FORECAST_HOURS", 8)))
+    parser.add_argument("--freq", default="1h")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[10_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engines", nargs="+", default=list(FORECAST_ENGINES))
+    args = parser.parse_args()
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+    warnings.simplefilter("ignore", FutureWarning)
+
+    print(f"{'serie':<40} {'motor':<12} {'puntos':>6} {'ajuste (s)':>10} {'MAE':>7} {'RMSE':>7} {'cobertura':>9}")
+    for nombre, series in _series(args.folder, args.freq, args.synthetic):
+        if series is None or len(series) <= args.horizon + 2:
+            print(f"{nombre:<40} (serie demasiado corta)")
+            continue
+        train, test = series.iloc[:-args.horizon], series.iloc[-args.horizon:]
+        for engine in args.engines:
+            fit, _ = FORECAST_ENGINES[engine]
+            t, mae, rmse, cov = _evaluar(fit, train, test, args.horizon, args.freq, args.repeat)
+            print(f"{nombre:<40} {engine:<12} {len(train):>6} {t:>10.4f} {mae:>7.3f} {rmse:>7.3f} {cov:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
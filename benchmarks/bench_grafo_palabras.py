@@ -0,0 +1,73 @@
+# benchmarks/bench_grafo_palabras.py
+"""
+Compara generar_grafo_palabras (vectorizado) contra la implementación
+original con iterrows, verificando que los elementos sean idénticos
+(nodos en el mismo orden; aristas como conjunto, ya que la ruta dispersa
+las emite en orden canónico).
+
+Uso:
+    python benchmarks/bench_grafo_palabras.py [--sizes 1000 10000 100000] [--top 25]
+    python benchmarks/bench_grafo_palabras.py --top 300 --top-k-edges 8 --skip-iterrows
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from word_graph import generar_grafo_palabras, generar_grafo_palabras_iterrows
+from benchmarks.synthetic import generar_posts
+
+
+def _medir(fn, df, repeticiones, **kwargs):
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = fn(df, **kwargs)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor, resultado
+
+
+def _normalizar(elements):
+    nodos = [e for e in elements if "source" not in e["data"]]
+    aristas = sorted((e["data"]["id"], e["data"]["weight"]) for e in elements if "source" in e["data"])
+    return nodos, aristas
+
+
+def _n_aristas(elements):
+    return sum(1 for e in elements if "source" in e["data"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-weight", type=int, default=1)
+    parser.add_argument("--top-k-edges", type=int, default=None)
+    parser.add_argument("--skip-iterrows", action="store_true", help="sólo medir la ruta vectorizada")
+    args = parser.parse_args()
+
+    # La poda cambia el resultado a propósito: sólo se compara sin poda
+    comparar = not args.skip_iterrows and args.min_weight <= 1 and not args.top_k_edges
+
+    print(f"{'posts':>8} {'iterrows (s)':>13} {'vectorizado (s)':>16} {'speedup':>8} {'aristas':>8}  iguales")
+    for n in args.sizes:
+        df = generar_posts(n, seed=n, vocab_extra=args.top * 4)
+        repeticiones = 1 if n >= 100_000 else args.repeat
+        t_new, new = _medir(generar_grafo_palabras, df, repeticiones, top_n=args.top,
+                            min_weight=args.min_weight, top_k_edges=args.top_k_edges)
+        if not comparar:
+            print(f"{n:>8} {'-':>13} {t_new:>16.3f} {'-':>8} {_n_aristas(new):>8}  -")
+            continue
+        t_old, old = _medir(generar_grafo_palabras_iterrows, df, repeticiones, top_n=args.top)
+        iguales = _normalizar(old) == _normalizar(new)
+        print(f"{n:>8} {t_old:>13.3f} {t_new:>16.3f} {t_old / t_new:>7.1f}x {_n_aristas(new):>8}  {iguales}")
+        if not iguales:
+            sys.exit(f"❌ Los elementos difieren con {n} posts")
+
+
+if __name__ == "__main__":
+    main()
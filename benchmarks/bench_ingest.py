@@ -0,0 +1,271 @@
+# benchmarks/bench_ingest.py
+"""
+Benchmark de la ingesta completa (timer_trigger.main) sin Facebook ni Azure.
+
+Cada tamaño corre en un proceso nuevo con:
+- un servidor HTTP local que imita /{page}/feed de Graph (paginado con
+  paging.next y cabecera X-App-Usage) y el endpoint de sentimiento de Text
+  Analytics, con latencia y tasa de errores configurables (los errores de
+  sentimiento son 503 y el cliente los reintenta; un error de Graph hace
+  fallar esa página, como en producción),
+- Blob Storage en una carpeta temporal (LOCAL_BLOB_ROOT) y una caché de
+  sentimiento vacía.
+
+Reporta posts/s de punta a punta y percentiles por etapa (las etapas de
+ingest_metrics), y opcionalmente los guarda en JSON.
+
+Uso:
+    python benchmarks/bench_ingest.py [--sizes 50 500 5000 50000] [--pages 1]
+        [--graph-latency-ms 20] [--sentiment-latency-ms 30]
+        [--graph-error-rate 0] [--sentiment-error-rate 0.01] [--json salida.json]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# -----------------------------
+# Servidor local (Graph + sentimiento)
+# -----------------------------
+def _start_stub_server(posts_by_page: dict, graph_latency: float, sentiment_latency: float,
+                       graph_error_rate: float, sentiment_error_rate: float, usage_pct: float, seed: int):
+    import random
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    labels = ("positive", "negative", "neutral")
+
+    def fails(rate):
+        with rng_lock:
+            return rng.random() < rate
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive: los clientes reutilizan conexiones como en Azure
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            time.sleep(graph_latency)
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            query = parse_qs(url.query)
+            if len(parts) < 3 or parts[-1] != "feed" or parts[-2] not in posts_by_page:
+                return self._send(404, {"error": {"message": "página desconocida"}})
+            if fails(graph_error_rate):
+                return self._send(500, {"error": {"message": "error simulado"}})
+            posts = posts_by_page[parts[-2]]
+            limit = int(query.get("limit", ["25"])[0])
+            offset = int(query.get("after", ["0"])[0])
+            body = {"data": posts[offset:offset + limit]}
+            if offset + limit < len(posts):
+                body["paging"] = {"next": f"http://{self.headers['Host']}{url.path}?limit={limit}&after={offset + limit}"}
+            usage = json.dumps({"call_count": usage_pct, "total_time": usage_pct, "total_cputime": usage_pct})
+            self._send(200, body, {"X-App-Usage": usage})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(sentiment_latency)
+            if fails(sentiment_error_rate):
+                return self._send(503, {"error": {"code": "ServiceUnavailable"}})
+            documents = [
+                {"id": doc["id"], "sentiment": labels[len(doc["text"]) % 3], "warnings": [], "sentences": [],
+                 "confidenceScores": {"positive": 0.4, "neutral": 0.3, "negative": 0.3}}
+                for doc in body.get("documents", [])
+            ]
+            self._send(200, {"documents": documents, "errors": [], "modelVersion": "stub"})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _graph_posts(n: int, pages: int, seed: int) -> dict:
+    """Posts sintéticos en el formato de Graph, repartidos entre pages páginas (del más nuevo al más viejo)."""
+    from benchmarks.synthetic import generar_posts
+
+    df = generar_posts(n, seed=seed)
+    posts_by_page = {f"pagina{p}": [] for p in range(pages)}
+    for i, row in enumerate(df.itertuples(index=False)):
+        page_id = f"pagina{i % pages}"
+        posts_by_page[page_id].append({
+            "id": f"{page_id}_{i}",
+            "message": row.Post,
+            "created_time": row.Fecha,
+            "likes": {"summary": {"total_count": int(row.Likes)}},
+        })
+    return posts_by_page
+
+
+# -----------------------------
+# Proceso hijo: una ingesta completa
+# -----------------------------
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * q / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def run_child(args) -> dict:
+    tmp = tempfile.mkdtemp(prefix="bench_ingest_")
+    # Antes de importar el proyecto: los módulos leen su configuración al importarse
+    os.environ.update({
+        "LOCAL_BLOB_ROOT": os.path.join(tmp, "blobs"),
+        "SENTIMENT_CACHE_PATH": os.path.join(tmp, "sentiment_cache.sqlite"),
+        "FACEBOOK_ACCESS_TOKEN": "token-de-prueba",
+        "AZURE_TEXT_KEY": "clave-de-prueba",
+        "INGEST_METRICS": "true",
+    })
+    sys.path.insert(0, ROOT)
+
+    import time
+    import logging
+    from types import SimpleNamespace
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    posts_by_page = _graph_posts(args.size, args.pages, args.seed)
+    server = _start_stub_server(posts_by_page, args.graph_latency_ms / 1000, args.sentiment_latency_ms / 1000,
+                                args.graph_error_rate, args.sentiment_error_rate, args.graph_usage_pct, args.seed)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ["AZURE_TEXT_ENDPOINT"] = base_url
+    os.environ["META_PAGE_IDS"] = ",".join(posts_by_page)
+
+    import facebook_feed
+    import ingest_metrics
+    import timer_trigger
+    from sentiment_utils import read_latest_blob
+
+    facebook_feed.GRAPH_URL = f"{base_url}/v19.0"
+    # Todo el histórico en una ejecución: sin tope de páginas ni de tiempo
+    timer_trigger.INGEST_BACKFILL_PAGES = args.size // facebook_feed.FEED_LIMIT + 2
+    timer_trigger.INGEST_TIME_BUDGET_S = 3600
+
+    samples, runs = {}, []
+
+    class SampledRunMetrics(ingest_metrics.RunMetrics):
+        """RunMetrics que además guarda cada duración para sacar percentiles."""
+
+        def __init__(self, name):
+            super().__init__(name)
+            runs.append(self)
+
+        def add(self, name, seconds=0.0, **kwargs):
+            super().add(name, seconds=seconds, **kwargs)
+            with self._lock:
+                samples.setdefault(name, []).append(seconds)
+
+        def emit(self):
+            pass
+
+    ingest_metrics.RunMetrics = SampledRunMetrics
+
+    t0 = time.perf_counter()
+    timer_trigger.main(SimpleNamespace(past_due=False))
+    elapsed = time.perf_counter() - t0
+    server.shutdown()
+
+    saved = len(read_latest_blob(timer_trigger.CONTAINER_NAME))
+    summary = runs[0].summary() if runs else {}
+    return {
+        "posts": args.size,
+        "pages": args.pages,
+        "saved": saved,
+        "seconds": round(elapsed, 4),
+        "posts_per_s": round(saved / elapsed, 1) if elapsed else 0.0,
+        "http": summary.get("http", {}),
+        "retries": summary.get("retries", 0),
+        "stages": {
+            name: {
+                "calls": len(values),
+                "total_s": round(sum(values), 4),
+                "p50_ms": round(_percentile(values, 50) * 1000, 2),
+                "p90_ms": round(_percentile(values, 90) * 1000, 2),
+                "p99_ms": round(_percentile(values, 99) * 1000, 2),
+            }
+            for name, values in samples.items()
+        },
+    }
+
+
+# -----------------------------
+# Proceso principal
+# -----------------------------
+def _print_result(result: dict) -> None:
+    print(f"\n{result['posts']:,} posts en {result['pages']} páginas: {result['seconds']:.2f}s, "
+          f"{result['posts_per_s']:,.1f} posts/s ({result['saved']:,} guardados, {result['retries']} reintentos)")
+    print(f"  http: {result['http']}")
+    print(f"  {'etapa':<16} {'llamadas':>8} {'total':>9} {'p50':>9} {'p90':>9} {'p99':>9}")
+    for name, stage in sorted(result["stages"].items(), key=lambda item: -item[1]["total_s"]):
+        print(f"  {name:<16} {stage['calls']:>8} {stage['total_s']:>8.3f}s {stage['p50_ms']:>7.1f}ms "
+              f"{stage['p90_ms']:>7.1f}ms {stage['p99_ms']:>7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000, 50000])
+    parser.add_argument("--pages", type=int, default=1, help="páginas entre las que se reparten los posts")
+    parser.add_argument("--graph-latency-ms", type=float, default=20)
+    parser.add_argument("--sentiment-latency-ms", type=float, default=30)
+    parser.add_argument("--graph-error-rate", type=float, default=0.0)
+    parser.add_argument("--sentiment-error-rate", type=float, default=0.0)
+    parser.add_argument("--graph-usage-pct", type=float, default=10, help="uso reportado en X-App-Usage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="archivo donde guardar los resultados")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return
+
+    results = []
+    for size in args.sizes:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", "--size", str(size),
+               "--pages", str(args.pages), "--seed", str(args.seed),
+               "--graph-latency-ms", str(args.graph_latency_ms),
+               "--sentiment-latency-ms", str(args.sentiment_latency_ms),
+               "--graph-error-rate", str(args.graph_error_rate),
+               "--sentiment-error-rate", str(args.sentiment_error_rate),
+               "--graph-usage-pct", str(args.graph_usage_pct)]
+        proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            sys.exit(proc.returncode)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        results.append(result)
+        _print_result(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ("child", "size", "json")},
+                       "results": results}, f, indent=2)
+        print(f"\n💾 Resultados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/bench_snapshot_format.py
+"""
+Tamaño y tiempo de parseo de los snapshots por formato (snapshot_format).
+
+Para cada tamaño compara:
+- csv (legado): pd.read_csv sin tipos + prepare_series con el regex de fechas
+- csv / csv.gz / parquet: deserialize_snapshot (esquema tipado) + prepare_series
+
+Uso:
+    python benchmarks/bench_snapshot_format.py [--sizes 10000 100000] [--repeat 3]
+"""
+
+import os
+import io
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from forecasting import prepare_series
+from snapshot_format import deserialize_snapshot, serialize_snapshot, snapshot_extension
+from benchmarks.synthetic import generar_posts
+
+
+def _mediana(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        result = fn()
+        tiempos.append(time.perf_counter() - t0)
+    return sorted(tiempos)[len(tiempos) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--freq", default="1h")
+    args = parser.parse_args()
+
+    print(f"{'filas':>8} {'formato':<13} {'bytes':>12} {'escritura':>10} {'lectura':>10} {'+serie':>10}")
+    for n in args.sizes:
+        df = generar_posts(n, seed=n)
+
+        legacy = df.to_csv(index=False).encode("utf-8")
+        t_read, legado = _mediana(lambda: pd.read_csv(io.BytesIO(legacy)), args.repeat)
+        t_serie, _ = _mediana(lambda: prepare_series(legado, args.freq), args.repeat)
+        print(f"{n:>8} {'csv (legado)':<13} {len(legacy):>12,} {'-':>10} {t_read * 1000:>8.1f}ms {t_serie * 1000:>8.1f}ms")
+
+        for fmt in ("csv", "csv.gz", "parquet"):
+            name = f"snapshot{snapshot_extension(fmt)}"
+            t_write, data = _mediana(lambda: serialize_snapshot(df, fmt), args.repeat)
+            t_read, typed = _mediana(lambda: deserialize_snapshot(data, name), args.repeat)
+            t_serie, _ = _mediana(lambda: prepare_series(typed, args.freq), args.repeat)
+            print(f"{n:>8} {fmt:<13} {len(data):>12,} {t_write * 1000:>8.1f}ms "
+                  f"{t_read * 1000:>8.1f}ms {t_serie * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_startup.py
+"""
+Benchmark reproducible de arranque de dashboard_app.
+
+Cada corrida usa un proceso nuevo (arranque en frío) y mide:
+  - tiempo de import por módulo (python -X importtime, acumulado),
+  - tiempo hasta la primera respuesta de "/", "/_dash-layout" y del
+    primer refresco (versión del dataset + histograma), usando el cliente
+    de pruebas de Flask.
+
+Uso:
+    python benchmarks/bench_startup.py [--runs 5] [--top 15]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta en el proceso hijo: importa la app y hace las primeras peticiones
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import dashboard_app
+t_import = time.perf_counter()
+client = dashboard_app.server.test_client()
+r = client.get("/")
+t_index = time.perf_counter()
+assert r.status_code == 200, r.status_code
+scripts_ok = b"dash_cytoscape" in r.data
+r = client.get("/_dash-layout")
+t_layout = time.perf_counter()
+assert r.status_code == 200, r.status_code
+def _payload(outputs, inputs, state=()):
+    return {
+        "output": outputs[0][0] + "." + outputs[0][1] if len(outputs) == 1
+                  else ".." + "...".join(f"{i}.{p}" for i, p in outputs) + "..",
+        "outputs": [{"id": i, "property": p} for i, p in outputs],
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "state": [{"id": i, "property": p, "value": v} for i, p, v in state],
+        "changedPropIds": [f"{i}.{p}" for i, p, _ in inputs],
+    }
+# Primer refresco: versión del dataset y luego el histograma que depende de ella
+payload = _payload([("dataset-version", "data"), ("last-update", "children")],
+                   [("refresh-interval", "n_intervals", None)], [("dataset-version", "data", None)])
+r = client.post("/_dash-update-component", json=payload)
+assert r.status_code == 200, r.status_code
+version = r.get_json()["response"]["dataset-version"]["data"]
+payload = _payload([("grafico-sentimientos", "figure"), ("histograma-version", "data")],
+                   [("dataset-version", "data", version)], [("histograma-version", "data", None)])
+r = client.post("/_dash-update-component", json=payload)
+t_callback = time.perf_counter()
+assert r.status_code == 200, r.status_code
+json.dump({
+    "import": t_import - t0,
+    "first_index": t_index - t0,
+    "first_layout": t_layout - t0,
+    "first_callback": t_callback - t0,
+    "callback_bytes": len(r.data),
+    "scripts_ok": scripts_ok,
+    "loaded": sorted(m for m in ("prophet", "networkx", "dash_cytoscape", "plotly.express") if m in sys.modules),
+}, sys.stdout)
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("ENABLE_FB_LOGIN", "false")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _importtime():
+    """Tiempo acumulado (s) por módulo según -X importtime, en un proceso nuevo."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import dashboard_app"],
+                          cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    tiempos = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        tiempos[name.strip()] = int(cumulative) / 1e6
+    return tiempos
+
+
+def _first_response():
+    proc = subprocess.run([sys.executable, "-c", _CHILD], cwd=ROOT, env=_env(),
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="módulos más lentos a listar")
+    parser.add_argument("--json", help="guardar resultados en este archivo")
+    args = parser.parse_args()
+
+    imports = [_importtime() for _ in range(args.runs)]
+    modulos = {m: statistics.median(r.get(m, 0.0) for r in imports) for m in imports[0]}
+    print(f"Import por módulo (mediana de {args.runs} corridas, acumulado):")
+    for nombre, t in sorted(modulos.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {nombre:<45} {t * 1000:>9.1f} ms")
+
+    corridas = [_first_response() for _ in range(args.runs)]
+    resumen = {k: statistics.median(c[k] for c in corridas)
+               for k in ("import", "first_index", "first_layout", "first_callback")}
+    print("\nPrimera respuesta desde el arranque del proceso (mediana):")
+    for k, t in resumen.items():
+        print(f"  {k:<16} {t * 1000:>9.1f} ms")
+    print(f"  bytes del callback del histograma: {corridas[0]['callback_bytes']}")
+    print(f"  módulos pesados cargados tras la primera respuesta: {', '.join(corridas[0]['loaded']) or '-'}")
+    if not corridas[0]["scripts_ok"]:
+        print("  ⚠️ El índice no incluye los scripts de dash_cytoscape")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"imports": modulos, "first_response": resumen, "runs": corridas}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/synthetic.py
+"""
+Generador de posts sintéticos en español con el esquema de los snapshots
+(Fecha, Post, Likes, Sentimiento). Determinista para una semilla dada.
+"""
+
+import numpy as np
+import pandas as pd
+
+_VOCAB = (
+    "gobierno presidente elecciones seguridad violencia economía inflación salud hospital "
+    "escuela maestros estudiantes universidad protesta marcha policía fiscalía justicia "
+    "tragedia incendio accidente carretera lluvias huracán sismo alerta ciudad estado "
+    "municipio alcalde gobernador congreso reforma ley senado diputados empresa empleo "
+    "salario precios gasolina transporte metro aeropuerto turismo playa futbol selección "
+    "partido campeonato víctimas rescate familias mujeres menores comunidad vecinos agua "
+    "energía electricidad proyecto inversión mercado dólar peso banco crédito vivienda"
+).split()
+_STOP = "de la el en y que los las un una por con para del al se su más como".split()
+_PUNCT = ["", "", "", ",", ".", ":", ";", "!", "?", "…"]
+_SENTIMIENTOS = np.array(["positive", "negative", "neutral"], dtype=object)
+
+
+def generar_posts(n: int, seed: int = 0, palabras_por_post: int = 18, vocab_extra: int = 0) -> pd.DataFrame:
+    """
+    Devuelve n posts sintéticos. vocab_extra añade términos raros (palabraN)
+    para simular un vocabulario de cola larga.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = np.array(_VOCAB + [f"palabra{i}" for i in range(vocab_extra)], dtype=object)
+    stop = np.array(_STOP, dtype=object)
+    punct = np.array(_PUNCT, dtype=object)
+
+    # Distribución tipo Zipf sobre el vocabulario
+    pesos = 1.0 / np.arange(1, len(vocab) + 1)
+    pesos /= pesos.sum()
+
+    n_words = rng.integers(palabras_por_post // 2, palabras_por_post * 3 // 2 + 1, size=n)
+    total = int(n_words.sum())
+    contenido = vocab[rng.choice(len(vocab), size=total, p=pesos)]
+    es_stop = rng.random(total) < 0.35
+    contenido[es_stop] = stop[rng.integers(0, len(stop), size=int(es_stop.sum()))]
+    capital = rng.random(total) < 0.1
+    contenido[capital] = [w.capitalize() for w in contenido[capital]]
+    words = contenido + punct[rng.integers(0, len(punct), size=total)]
+
+    cortes = np.cumsum(n_words)[:-1]
+    posts = [" ".join(chunk) for chunk in np.split(words, cortes)]
+
+    fin = pd.Timestamp("2025-09-30T00:00:00Z")
+    offsets = np.sort(rng.integers(0, 30 * 24 * 3600, size=n))[::-1]
+    fechas = (fin - pd.to_timedelta(offsets, unit="s")).strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+    return pd.DataFrame({
+        "Fecha": fechas,
+        "Post": posts,
+        "Likes": rng.poisson(3, size=n),
+        "Sentimiento": _SENTIMIENTOS[rng.integers(0, 3, size=n)],
+    })
@@ -0,0 +1,209 @@
+# compact_snapshots.py
+"""
+Compactación y retención de snapshots (contenedor datos-facebook o carpeta local).
+
+- Los snapshots de 5 minutos (bases y deltas) con más de --min-age-hours se
+  agrupan por hora UTC en _compactado/horario/AAAA-MM-DD/HH.<ext>, con la
+  última versión de cada post (por Id), y se borran los originales.
+- Las particiones horarias con más de --hourly-days se agrupan por día en
+  _compactado/diario/AAAA-MM-DD.<ext>.
+- Lo que tenga más de --retention-days se borra sin compactar.
+
+Nunca se toca el snapshot al que apunta el puntero (ni sus deltas) ni el
+estado de ingesta, así que puede correr mientras escribe el timer. Es
+idempotente: si una partición ya existe los originales se vuelven a aplicar
+sobre ella (el resultado no cambia) y los originales sólo se borran después
+de escribir la partición.
+
+Uso:
+    python compact_snapshots.py [--container datos-facebook | --folder datos] [--dry-run]
+"""
+
+import os
+import re
+import sys
+import logging
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from snapshot_deltas import apply_deltas
+from snapshot_format import apply_schema, deserialize_snapshot, is_snapshot_name, serialize_snapshot, snapshot_extension
+from local_blob_storage import LocalContainerClient
+from sentiment_utils import DELTAS_PREFIX, find_latest_snapshot, get_container_client, read_pointer
+
+COMPACTED_PREFIX = "_compactado/"
+HOURLY_PREFIX = COMPACTED_PREFIX + "horario/"
+DAILY_PREFIX = COMPACTED_PREFIX + "diario/"
+COMPACTION_MIN_AGE_HOURS = float(os.getenv("COMPACTION_MIN_AGE_HOURS", 1))
+COMPACTION_HOURLY_DAYS = float(os.getenv("COMPACTION_HOURLY_DAYS", 2))
+COMPACTION_RETENTION_DAYS = float(os.getenv("COMPACTION_RETENTION_DAYS", 90))
+
+_TIMESTAMP_RE = re.compile(r"(\d{4}-\d{2}-\d{2})_(\d{2})-(\d{2})-(\d{2})")
+_HOURLY_RE = re.compile(r"^" + HOURLY_PREFIX + r"(\d{4}-\d{2}-\d{2})/(\d{2})\.")
+_DAILY_RE = re.compile(r"^" + DAILY_PREFIX + r"(\d{4}-\d{2}-\d{2})\.")
+
+
+def blob_time(blob) -> datetime:
+    """Momento de escritura del snapshot según su nombre (el último timestamp), o last_modified."""
+    matches = _TIMESTAMP_RE.findall(blob.name)
+    if matches:
+        day, hh, mm, ss = matches[-1]
+        return datetime.fromisoformat(f"{day}T{hh}:{mm}:{ss}+00:00")
+    return blob.last_modified
+
+
+def _stem(name: str) -> str:
+    return name[:name.rindex(".", 0, len(name) - 3 if name.endswith(".gz") else len(name))]
+
+
+def plan_compaction(blobs, protected, now: datetime, min_age_hours: float = COMPACTION_MIN_AGE_HOURS,
+                    hourly_days: float = COMPACTION_HOURLY_DAYS,
+                    retention_days: float = COMPACTION_RETENTION_DAYS) -> dict:
+    """
+    Acciones a partir del listado (sin leer ni escribir nada):
+    {'hourly': {partición: [originales]}, 'daily': {partición: [horarias]}, 'expire': [blobs]}.
+    Las particiones se nombran sin extensión; los originales van en orden cronológico.
+    """
+    source_cutoff = now - timedelta(hours=min_age_hours)
+    hourly_cutoff = (now - timedelta(days=hourly_days)).date()
+    retention_cutoff = now - timedelta(days=retention_days)
+
+    hourly, daily, expire = defaultdict(list), defaultdict(list), []
+    existing_hourly = {}
+    for blob in sorted(blobs, key=lambda b: (blob_time(b), b.name)):
+        name = blob.name
+        if name in protected or not is_snapshot_name(name):
+            continue
+        when = blob_time(blob)
+        if name.startswith(COMPACTED_PREFIX):
+            hourly_match, daily_match = _HOURLY_RE.match(name), _DAILY_RE.match(name)
+            if daily_match:
+                day = daily_match.group(1)
+                if datetime.fromisoformat(day + "T00:00:00+00:00") + timedelta(days=1) <= retention_cutoff:
+                    expire.append(name)
+            elif hourly_match:
+                day, hour = hourly_match.groups()
+                existing_hourly[_stem(name)] = (day, hour)
+            continue
+        if name.startswith("_") and not name.startswith(DELTAS_PREFIX):
+            continue  # _estado/ y otros metadatos
+        if when >= source_cutoff:
+            continue
+        if when < retention_cutoff:
+            expire.append(name)
+            continue
+        hourly[f"{HOURLY_PREFIX}{when:%Y-%m-%d}/{when:%H}"].append(name)
+
+    # Horarias (existentes o por crear) viejas -> diarias
+    candidates = dict(existing_hourly)
+    for partition in hourly:
+        day, hour = _HOURLY_RE.match(partition + ".").groups()
+        candidates[partition] = (day, hour)
+    for partition, (day, hour) in sorted(candidates.items(), key=lambda item: item[1]):
+        start = datetime.fromisoformat(f"{day}T{hour}:00:00+00:00")
+        if start + timedelta(hours=1) <= retention_cutoff:
+            if partition in existing_hourly:
+                expire.append(partition)
+            else:
+                expire.extend(hourly.pop(partition))
+        elif start.date() < hourly_cutoff:
+            daily[f"{DAILY_PREFIX}{day}"].append(partition)
+
+    return {"hourly": dict(hourly), "daily": dict(daily), "expire": expire}
+
+
+def _protected(container_client, names) -> set:
+    """Puntero actual (base y deltas) y estado: no se tocan."""
+    pointer = read_pointer(container_client)
+    base, deltas = pointer.get("blob"), pointer.get("deltas", [])
+    if not base:
+        base, deltas = find_latest_snapshot(container_client)
+    protected = {n for n in names if n.startswith("_estado/")}
+    if base:
+        protected.add(base)
+        protected.update(deltas)
+        protected.update(n for n in names if n.startswith(f"{DELTAS_PREFIX}{_stem(base)}/"))
+    return protected
+
+
+def _read_logical(container_client, name: str, existing_names):
+    """Lee un blob o una partición (que puede existir con más de una extensión)."""
+    frames = [deserialize_snapshot(container_client.get_blob_client(real).download_blob().readall(), real)
+              for real in existing_names.get(name, [name])]
+    return apply_deltas(pd.DataFrame(), frames)
+
+
+def _compact_into(container_client, partition: str, sources, existing_names, dry_run: bool) -> None:
+    """Aplica los originales (en orden) sobre la partición existente, la escribe y borra los originales."""
+    target = partition + snapshot_extension()
+    previous = existing_names.get(partition, [])
+    logging.info(f"🗜️ {target} <- {len(sources)} blobs" + (" (sobre la partición existente)" if previous else ""))
+    if dry_run:
+        return
+    state = _read_logical(container_client, partition, existing_names) if previous else pd.DataFrame()
+    merged = apply_deltas(state, [_read_logical(container_client, name, existing_names) for name in sources])
+    container_client.get_blob_client(target).upload_blob(serialize_snapshot(apply_schema(merged)), overwrite=True)
+    # Los originales se borran sólo después de escribir la partición
+    for real in [r for name in sources for r in existing_names.get(name, [name])] + previous:
+        if real != target:
+            container_client.delete_blob(real)
+    existing_names[partition] = [target]
+
+
+def run_compaction(container_client, now: datetime = None, dry_run: bool = False, **limits) -> dict:
+    """Planifica y ejecuta la compactación. Devuelve el plan (con dry_run no escribe ni borra)."""
+    now = now or datetime.now(timezone.utc)
+    blobs = list(container_client.list_blobs())
+    names = [b.name for b in blobs]
+    plan = plan_compaction(blobs, _protected(container_client, names), now, **limits)
+
+    # Partición (sin extensión) -> blobs que ya existen con ese nombre
+    existing_names = defaultdict(list)
+    for name in names:
+        if name.startswith(COMPACTED_PREFIX) and is_snapshot_name(name):
+            existing_names[_stem(name)].append(name)
+
+    for partition, sources in sorted(plan["hourly"].items()):
+        _compact_into(container_client, partition, sources, existing_names, dry_run)
+    for partition, sources in sorted(plan["daily"].items()):
+        _compact_into(container_client, partition, sources, existing_names, dry_run)
+    for name in plan["expire"]:
+        for real in existing_names.get(name, [name]):
+            logging.info(f"🗑️ Retención: {real}")
+            if not dry_run:
+                container_client.delete_blob(real)
+
+    logging.info(f"✅ Compactación {'simulada' if dry_run else 'terminada'}: "
+                 f"{len(plan['hourly'])} horarias, {len(plan['daily'])} diarias, {len(plan['expire'])} borrados")
+    return plan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--container", default=os.getenv("AZURE_CONTAINER_NAME", "datos-facebook"))
+    target.add_argument("--folder", help="carpeta local de snapshots (p. ej. datos)")
+    parser.add_argument("--dry-run", action="store_true", help="sólo mostrar qué se haría")
+    parser.add_argument("--min-age-hours", type=float, default=COMPACTION_MIN_AGE_HOURS)
+    parser.add_argument("--hourly-days", type=float, default=COMPACTION_HOURLY_DAYS)
+    parser.add_argument("--retention-days", type=float, default=COMPACTION_RETENTION_DAYS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.folder:
+        folder = os.path.abspath(args.folder)
+        container_client = LocalContainerClient(os.path.dirname(folder), os.path.basename(folder))
+    else:
+        container_client = get_container_client(args.container)
+    if container_client is None or not container_client.exists():
+        logging.error("❌ No se encontró el contenedor o la carpeta de snapshots.")
+        return 1
+
+    run_compaction(container_client, dry_run=args.dry_run, min_age_hours=args.min_age_hours,
+                   hourly_days=args.hourly_days, retention_days=args.retention_days)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
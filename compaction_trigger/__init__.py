@@ -0,0 +1,22 @@
+import logging
+import os
+import azure.functions as func
+from compact_snapshots import run_compaction
+from sentiment_utils import get_container_client
+
+CONTAINER_NAME = os.environ.get("AZURE_CONTAINER_NAME", "datos-facebook")
+COMPACTION_DRY_RUN = os.environ.get("COMPACTION_DRY_RUN", "false").lower() == "true"
+
+
+def main(myTimer: func.TimerRequest) -> None:
+    """Compactación y retención diaria de los snapshots (ver compact_snapshots.py)."""
+    logging.info("🗜️ Compactación de snapshots iniciada")
+    container_client = get_container_client(CONTAINER_NAME)
+    if container_client is None:
+        logging.error("⚠️ Variables de entorno no configuradas correctamente.")
+        return
+    try:
+        run_compaction(container_client, dry_run=COMPACTION_DRY_RUN)
+    except Exception as ex:
+        # Idempotente: lo que quedó a medias se retoma en la siguiente ejecución
+        logging.error(f"⚠️ Error durante la compactación: {ex}")
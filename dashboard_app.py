@@ -1,19 +1,16 @@
 # dashboard_app.py
 import os
-import re
-import glob
-import itertools
-import collections
 import pandas as pd
 import dash
 from dash import dcc, html, dash_table
-from dash.dependencies import Input, Output
-import plotly.express as px
+from dash.dependencies import Input, Output, State
 import plotly.graph_objects as go
-import dash_cytoscape as cyto
-import networkx as nx
-from prophet import Prophet
+from forecasting import build_forecast_figure, forecast_pending
+from word_graph import TokenIndex
+from table_pages import TablePager
+from snapshot_format import is_snapshot_name, read_snapshot_file
 import datetime
+import json
 import secrets
 import urllib.parse
 import requests
@@ -23,168 +20,226 @@ from flask import Flask, redirect, url_for, request, session, jsonify
 # Config
 # -----------------------------
 CSV_FOLDER = os.getenv("CSV_FOLDER", "datos")
+# Si se define, el dashboard lee el último snapshot de ese contenedor de Blob Storage en vez de CSV_FOLDER
+DATA_CONTAINER = os.getenv("DATA_CONTAINER")
+# Histograma, grafo y pronóstico desde el artefacto de agregados del timer, si existe
+USE_AGGREGATES = os.getenv("USE_AGGREGATES", "true").lower() == "true"
 TOP_WORDS = int(os.getenv("TOP_WORDS", 25))
+GRAPH_MIN_WEIGHT = int(os.getenv("GRAPH_MIN_WEIGHT", 1))
+GRAPH_TOP_K_EDGES = int(os.getenv("GRAPH_TOP_K_EDGES", 0)) or None
+TOKEN_INDEX_MAX_POSTS = int(os.getenv("TOKEN_INDEX_MAX_POSTS", 50000))
 FORECAST_HOURS = int(os.getenv("FORECAST_HOURS", 8))
+FORECAST_POLL_MS = int(os.getenv("FORECAST_POLL_MS", 3000))
+REFRESH_INTERVAL_MS = int(os.getenv("REFRESH_INTERVAL_MS", 60000))
 RESAMPLE_FREQ = os.getenv("RESAMPLE_FREQ", "1H")
 
 # Habilitar/Deshabilitar login vía variable de entorno
 ENABLE_FB_LOGIN = os.environ.get("ENABLE_FB_LOGIN", "true").lower() == "true"
 
 # -----------------------------
-# Stopwords español
+# Cargar último CSV disponible (con caché por path, mtime y tamaño)
 # -----------------------------
-stopwords_es = {
-    "a","ante","bajo","cabe","con","contra","de","del","desde","durante","en","entre",
-    "hacia","hasta","mediante","para","por","según","sin","so","sobre","tras","versus","vía",
-    "el","la","los","las","un","una","unos","unas","lo","al","su","sus","mi","mis","tu","tus",
-    "nuestro","nuestra","nuestros","nuestras","vosotros","vosotras","vuestro","vuestra","vuestros",
-    "vuestras","ellos","ellas","nosotros","nosotras","yo","tú","usted","ustedes","él","ella",
-    "me","te","se","nos","os","les","le","y","o","que","qué","como","cómo","para","porque","pero",
-    "si","ya","tan","muy","más","menos","también","cuando","donde","dónde","ser","estar","haber"
-}
-
-_punct_re = re.compile(r'^[\W_]+|[\W_]+$')
-def clean_token(tok: str) -> str:
-    return _punct_re.sub("", tok.lower())
+# El timer escribe un snapshot nuevo cada 5 minutos y la carpeta crece sin límite.
+# Si el mtime de la carpeta no cambió, el conjunto de archivos es el mismo y basta
+# con volver a hacer stat() sobre el último CSV conocido; sólo se re-parsea cuando
+# cambia la clave (path, mtime, size).
+_dataset_cache = {"folder": None, "folder_mtime": None, "latest": None, "key": None, "df": None}
+_dataset_cache_stats = {"hits": 0, "misses": 0}
+
+def _find_latest_csv(folder: str):
+    """Devuelve el snapshot (Parquet, CSV o CSV.gz) con mayor mtime de la carpeta (una sola pasada con scandir)."""
+    latest, latest_mtime = None, None
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not is_snapshot_name(entry.name) or not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+                if latest_mtime is None or mtime > latest_mtime:
+                    latest, latest_mtime = entry.path, mtime
+    except FileNotFoundError:
+        return None
+    return latest
+
+def _read_typed_csv(path: str) -> pd.DataFrame:
+    """Lee el snapshot con el esquema fijo (Fecha UTC, Likes int, Sentimiento categórico)."""
+    return read_snapshot_file(path)
+
+def get_dataset_cache_stats() -> dict:
+    """Contadores de aciertos/fallos de la caché de datos."""
+    stats = dict(_dataset_cache_stats)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
+
+def _read_local_pointer(folder: str):
+    """(puntero, (mtime, tamaño)) de _estado/latest.json en la carpeta, o (None, None)."""
+    from sentiment_utils import LATEST_POINTER_BLOB
+    path = os.path.join(folder, *LATEST_POINTER_BLOB.split("/"))
+    try:
+        st = os.stat(path)
+        with open(path, encoding="utf-8") as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    return pointer, (st.st_mtime, st.st_size)
+
+def _load_folder_with_deltas(folder: str, pointer: dict, pointer_stat):
+    """
+    Base + deltas (_deltas/<base>/) de la carpeta, con el mismo lector que el
+    contenedor de Blob Storage. Los deltas se escriben en subcarpetas y no
+    cambian el mtime de la carpeta: la clave es el mtime/tamaño del puntero.
+    """
+    from local_blob_storage import LocalContainerClient
+    from sentiment_utils import read_latest_blob
+    latest = os.path.join(folder, pointer["blob"])
+    key = (latest, *pointer_stat)
+    if _dataset_cache["key"] == key and _dataset_cache["df"] is not None:
+        _dataset_cache_stats["hits"] += 1
+        return _dataset_cache["df"], latest
+
+    _dataset_cache_stats["misses"] += 1
+    root, name = os.path.split(os.path.abspath(folder))
+    df_folder = read_latest_blob(name, container_client=LocalContainerClient(root, name))
+    if df_folder.empty:
+        return pd.DataFrame(), None
+    _dataset_cache.update(key=key, df=df_folder)
+    print(f"✅ Snapshot cargado correctamente: {latest} (+{len(pointer['deltas'])} deltas)")
+    return df_folder, latest
 
-# -----------------------------
-# Cargar último CSV disponible
-# -----------------------------
 def load_latest_csv(folder: str):
-    csv_files = glob.glob(os.path.join(folder, "*.csv"))
-    if not csv_files:
+    # Con deltas pendientes el último archivo de la carpeta no es el estado completo
+    pointer, pointer_stat = _read_local_pointer(folder)
+    if pointer and pointer.get("blob") and pointer.get("deltas"):
+        return _load_folder_with_deltas(folder, pointer, pointer_stat)
+
+    try:
+        folder_mtime = os.stat(folder).st_mtime
+    except FileNotFoundError:
+        folder_mtime = None
+
+    if _dataset_cache["folder"] == folder and folder_mtime is not None and _dataset_cache["folder_mtime"] == folder_mtime:
+        latest = _dataset_cache["latest"]
+    else:
+        latest = _find_latest_csv(folder) if folder_mtime is not None else None
+        _dataset_cache.update(folder=folder, folder_mtime=folder_mtime, latest=latest)
+
+    if not latest:
         print("⚠️ No hay CSV en", folder)
         return pd.DataFrame(), None
-    latest = max(csv_files, key=os.path.getmtime)
+
+    try:
+        st = os.stat(latest)
+    except FileNotFoundError:
+        # El archivo desapareció entre el listado y la lectura: forzar re-escaneo
+        _dataset_cache["folder_mtime"] = None
+        return load_latest_csv(folder)
+    key = (latest, st.st_mtime, st.st_size)
+
+    if _dataset_cache["key"] == key and _dataset_cache["df"] is not None:
+        _dataset_cache_stats["hits"] += 1
+        return _dataset_cache["df"], latest
+
+    _dataset_cache_stats["misses"] += 1
     try:
-        df = pd.read_csv(latest)
+        df = _read_typed_csv(latest)
+        _dataset_cache.update(key=key, df=df)
         print("✅ CSV cargado correctamente:", latest)
         return df, latest
     except Exception as e:
         print("⚠️ Error cargando CSV:", e)
         return pd.DataFrame(), None
 
-df, csv_path = load_latest_csv(CSV_FOLDER)
-
-# -----------------------------
-# Grafo de palabras
-# -----------------------------
-def generar_grafo_palabras(df: pd.DataFrame, top_n: int = TOP_WORDS):
-    if df.empty or "Post" not in df.columns:
-        return []
-
-    word_counts = collections.Counter()
-    word_sent_map = collections.defaultdict(list)
-    posts_tokens = []
-
-    for _, row in df.iterrows():
-        text = str(row.get("Post", ""))
-        tokens = [clean_token(t) for t in re.split(r"\s+", text) if t and len(t) > 0]
-        tokens = [t for t in tokens if t not in stopwords_es and len(t) > 2]
-        unique_tokens = list(dict.fromkeys(tokens))
-        posts_tokens.append(unique_tokens)
-        for t in unique_tokens:
-            word_counts[t] += 1
-            word_sent_map[t].append(str(row.get("Sentimiento", "")).lower())
-
-    if not word_counts:
-        return []
-
-    top_words = [w for w, _ in word_counts.most_common(top_n)]
-    G = nx.Graph()
-    color_map = {"positivo":"#2ca02c", "positivo.":"#2ca02c", "positive":"#2ca02c",
-                 "negativo":"#d62728", "negative":"#d62728",
-                 "neutro":"#7f7f7f", "neutral":"#7f7f7f"}
-
-    for w in top_words:
-        freq = word_counts[w]
-        sents = [s for s in word_sent_map.get(w, []) if s]
-        sent_mode = collections.Counter(sents).most_common(1)[0][0] if sents else None
-        color = color_map.get(sent_mode, "#7f7f7f")
-        size = max(20, 8 + freq * 7)
-        G.add_node(w, size=size, color=color, freq=int(freq), sentiment=sent_mode)
-
-    edge_counts = collections.Counter()
-    for tokens in posts_tokens:
-        present = [t for t in tokens if t in top_words]
-        for a, b in itertools.combinations(sorted(set(present)), 2):
-            edge_counts[(a,b)] += 1
-
-    for (a,b), w in edge_counts.items():
-        if a in G.nodes and b in G.nodes:
-            G.add_edge(a, b, weight=int(w))
-
-    elements = []
-    for node, attrs in G.nodes(data=True):
-        elements.append({
-            "data": {"id": node, "label": node, "freq": attrs.get("freq", 1), "sentiment": attrs.get("sentiment")},
-            "style": {"width": attrs["size"], "height": attrs["size"], "background-color": attrs["color"]}
-        })
-    for source, target, attrs in G.edges(data=True):
-        elements.append({
-            "data": {"id": f"e-{source}-{target}", "source": source, "target": target, "weight": attrs.get("weight", 1)}
-        })
-
-    return elements
+def load_latest_blob(container_name: str):
+    """
+    Último snapshot del contenedor con los helpers compartidos de sentiment_utils
+    (cliente reutilizado, puntero al último blob y descarga condicional por ETag).
+    """
+    from sentiment_utils import read_latest_blob
+    df_blob, last_modified = read_latest_blob(container_name, return_last_modified=True)
+    if df_blob.empty or last_modified is None:
+        return pd.DataFrame(), None
+    key = (container_name, last_modified.timestamp(), len(df_blob))
+    if _dataset_cache["key"] == key and _dataset_cache["df"] is not None:
+        _dataset_cache_stats["hits"] += 1
+        return _dataset_cache["df"], container_name
+    _dataset_cache_stats["misses"] += 1
+    _dataset_cache.update(key=key, df=df_blob)
+    return df_blob, container_name
+
+# Se carga en el primer callback, no al importar: cada worker de gunicorn arranca sin leer datos
+df, csv_path = pd.DataFrame(), None
+
+def current_dataset() -> pd.DataFrame:
+    """Último dataset (de la caché); conserva el anterior si la carpeta queda vacía."""
+    global df, csv_path
+    df_new, path = load_latest_blob(DATA_CONTAINER) if DATA_CONTAINER else load_latest_csv(CSV_FOLDER)
+    if not df_new.empty:
+        df, csv_path = df_new, path
+    return df
 
 # -----------------------------
-# Forecast con Prophet
+# Agregados de ingesta (aggregates.py)
 # -----------------------------
-def build_forecast_figure(df: pd.DataFrame, hours_ahead: int = FORECAST_HOURS, resample_freq: str = RESAMPLE_FREQ):
-    fig = go.Figure()
-    fig.update_layout(title="Sin datos para pronóstico")
-
-    if df.empty or "Fecha" not in df.columns or "Sentimiento" not in df.columns:
-        return fig
-
-    def strip_tz_str(s):
-        if pd.isna(s):
-            return s
-        s = str(s).strip()
-        s = re.sub(r'([+-]\d{2}:?\d{2}|Z|[+-]\d{4})$', '', s).strip()
-        return s
-
-    dfc = df.copy()
-    dfc["Fecha_clean"] = dfc["Fecha"].apply(strip_tz_str)
-    dfc["Fecha_parsed"] = pd.to_datetime(dfc["Fecha_clean"], errors="coerce")
-    dfc = dfc.dropna(subset=["Fecha_parsed","Sentimiento"]).copy()
-    if dfc.empty:
-        return fig
-
-    sent_map = {"Positivo": 1, "Negativo": -1, "Neutro": 0,
-                "positivo": 1, "negativo": -1, "neutro": 0,
-                "positive": 1, "negative": -1, "neutral": 0}
-    dfc["sent_score"] = dfc["Sentimiento"].map(sent_map).fillna(0).astype(float)
-    dfc = dfc.set_index("Fecha_parsed").sort_index()
-    df_hour = dfc["sent_score"].resample(resample_freq).mean().to_frame()
-    df_hour["y"] = df_hour["sent_score"].fillna(0)
-    df_hour = df_hour.reset_index().rename(columns={"Fecha_parsed": "ds"})
-
-    if df_hour.empty or df_hour["y"].nunique() <= 1:
-        fig.update_layout(title="No hay suficiente variación de datos para pronóstico")
-        return fig
-
-    df_prophet = df_hour[["ds","y"]].copy()
-    if pd.api.types.is_datetime64_any_dtype(df_prophet["ds"]):
-        df_prophet["ds"] = pd.to_datetime(df_prophet["ds"]).dt.tz_localize(None)
-
+# El timer los mantiene incrementalmente; con ellos el costo de histograma,
+# grafo y pronóstico no depende de cuánto historial haya. Se releen sólo si
+# cambió el archivo (mtime/tamaño) o el blob (ETag).
+_aggregates_cache = {"key": None, "data": None}
+
+def load_aggregates():
+    """Artefacto de agregados (dict) o None si no existe o está deshabilitado."""
+    if not USE_AGGREGATES:
+        return None
+    from aggregates import AGGREGATES_BLOB
     try:
-        model = Prophet()
-        model.fit(df_prophet)
-        future = model.make_future_dataframe(periods=hours_ahead, freq=resample_freq)
-        forecast = model.predict(future)
+        if DATA_CONTAINER:
+            from sentiment_utils import get_container_client
+            from snapshot_cache import download_if_modified
+            container_client = get_container_client(DATA_CONTAINER)
+            if container_client is None:
+                return None
+            blob_client = container_client.get_blob_client(AGGREGATES_BLOB)
+            downloaded = download_if_modified(blob_client, _aggregates_cache["key"])
+            if downloaded is not None:
+                data, properties = downloaded
+                _aggregates_cache.update(key=properties.etag, data=json.loads(data))
+        else:
+            path = os.path.join(CSV_FOLDER, *AGGREGATES_BLOB.split("/"))
+            st = os.stat(path)
+            key = (st.st_mtime, st.st_size)
+            if key != _aggregates_cache["key"]:
+                with open(path, encoding="utf-8") as f:
+                    _aggregates_cache.update(key=key, data=json.load(f))
+    except FileNotFoundError:
+        _aggregates_cache.update(key=None, data=None)
     except Exception as e:
-        fig.update_layout(title=f"Error entrenando Prophet: {e}")
-        return fig
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df_prophet["ds"], y=df_prophet["y"], mode="markers", name="Histórico", marker=dict(color="blue", size=6)))
-    fig.add_trace(go.Scatter(x=forecast["ds"], y=forecast["yhat"], mode="lines", name=f"Pronóstico ({hours_ahead}h)", line=dict(color="orange")))
-    fig.add_trace(go.Scatter(x=forecast["ds"], y=forecast["yhat_upper"], mode="lines", line=dict(width=0), showlegend=False))
-    fig.add_trace(go.Scatter(x=forecast["ds"], y=forecast["yhat_lower"], mode="lines", fill="tonexty", fillcolor="rgba(255,165,0,0.2)", name="Confianza 95%"))
-
-    fig.update_layout(title=f"Pronóstico de sentimiento ({hours_ahead}h)", xaxis_title="Hora", yaxis_title="Sentimiento promedio", legend=dict(orientation="v"))
-    return fig
+        if getattr(e, "status_code", None) == 404:
+            _aggregates_cache.update(key=None, data=None)
+        else:
+            print("⚠️ Error cargando agregados:", e)
+    return _aggregates_cache["data"]
+
+def current_aggregates():
+    """Últimos agregados cargados (sin E/S; los refresca update_dataset_version)."""
+    return _aggregates_cache["data"] if USE_AGGREGATES else None
+
+def get_dataset_version() -> str:
+    """Token que identifica el dataset cargado (cambia sólo con un snapshot nuevo o agregados nuevos)."""
+    key = _dataset_cache["key"]
+    if df.empty or key is None:
+        return "sin-datos"
+    path, mtime, size = key
+    version = f"{os.path.basename(path)}:{mtime}:{size}"
+    agg = current_aggregates()
+    if agg:
+        version += f":agg-{agg.get('updated_at', agg.get('posts'))}"
+    return version
+
+# Índice de tokens por post compartido entre refrescos: sólo se tokenizan posts nuevos
+token_index = TokenIndex(max_posts=TOKEN_INDEX_MAX_POSTS)
+
+# Vistas ordenadas/filtradas de la tabla (sólo se envía la página pedida)
+table_pager = TablePager()
 
 # -----------------------------
 # Facebook + servidor Flask
@@ -288,90 +343,221 @@ if ENABLE_FB_LOGIN:
         html.A("Cerrar sesión", href="/logout")
     ]
 
-app.layout = html.Div([
-    html.Div(header_children, style={"textAlign": "right", "margin": "10px"}),
-    html.H1("📊 Dashboard de Opiniones", style={"textAlign": "center"}),
-
-    html.Div([
-        dash_table.DataTable(
-            id="tabla-posts",
-            columns=[{"name": i, "id": i} for i in df.columns] if not df.empty else [],
-            data=df.to_dict("records"),
-            page_size=10,
-            style_table={"overflowX": "auto"},
-            style_cell={"textAlign": "left", "whiteSpace": "normal"}
-        )
-    ], style={"margin": "10px"}),
-
-    html.Div([
-        dcc.Graph(id="grafico-sentimientos"),
-        dcc.Graph(id="forecast-sentimiento"),
-    ], style={"display": "grid", "gridTemplateColumns": "1fr 1fr", "gap": "20px", "padding": "10px"}),
-
-    html.Div([
-        html.H2("🔗 Grafo de palabras"),
-        cyto.Cytoscape(
-            id="grafo-palabras",
-            layout={"name": "cose"},
-            style={"width": "100%", "height": "520px"},
-            elements=[]
-        )
-    ], style={"padding": "10px"}),
-
-    html.Div(id="last-update", style={"marginTop": "10px", "textAlign": "center"})
-])
+def serve_layout():
+    # dash_cytoscape se importa al construir el layout (primera petición, antes de
+    # que Dash genere la lista de scripts), no al importar el módulo.
+    import dash_cytoscape as cyto
+
+    return html.Div([
+        html.Div(header_children, style={"textAlign": "right", "margin": "10px"}),
+        html.H1("📊 Dashboard de Opiniones", style={"textAlign": "center"}),
+
+        html.Div([
+            dash_table.DataTable(
+                id="tabla-posts",
+                columns=[],
+                data=[],
+                page_current=0,
+                page_size=10,
+                page_action="custom",
+                sort_action="custom",
+                sort_mode="multi",
+                sort_by=[],
+                filter_action="custom",
+                filter_query="",
+                style_table={"overflowX": "auto"},
+                style_cell={"textAlign": "left", "whiteSpace": "normal"}
+            )
+        ], style={"margin": "10px"}),
+
+        html.Div([
+            dcc.Graph(id="grafico-sentimientos"),
+            dcc.Graph(id="forecast-sentimiento"),
+            # Sondeo mientras un pronóstico nuevo se entrena en segundo plano
+            dcc.Interval(id="forecast-poll", interval=FORECAST_POLL_MS, disabled=True),
+        ], style={"display": "grid", "gridTemplateColumns": "1fr 1fr", "gap": "20px", "padding": "10px"}),
+
+        html.Div([
+            html.H2("🔗 Grafo de palabras"),
+            cyto.Cytoscape(
+                id="grafo-palabras",
+                layout={"name": "cose"},
+                style={"width": "100%", "height": "520px"},
+                elements=[]
+            )
+        ], style={"padding": "10px"}),
+
+        html.Div(id="last-update", style={"marginTop": "10px", "textAlign": "center"}),
+
+        # Refresco periódico: dataset-version sólo cambia cuando hay un snapshot nuevo
+        # y cada panel guarda la versión que ya dibujó para no recalcular.
+        dcc.Interval(id="refresh-interval", interval=REFRESH_INTERVAL_MS),
+        dcc.Store(id="dataset-version"),
+        dcc.Store(id="tabla-version"),
+        dcc.Store(id="histograma-version"),
+        dcc.Store(id="grafo-version"),
+        dcc.Store(id="forecast-version"),
+    ])
+
+app.layout = serve_layout
 
 # -----------------------------
-# Callback principal
+# Versión del dataset
 # -----------------------------
 @app.callback(
     [
-        Output("tabla-posts", "columns"),
-        Output("tabla-posts", "data"),
-        Output("grafico-sentimientos", "figure"),
-        Output("forecast-sentimiento", "figure"),
-        Output("grafo-palabras", "elements"),
+        Output("dataset-version", "data"),
         Output("last-update", "children")
     ],
-    [Input("tabla-posts", "id")]
+    [Input("refresh-interval", "n_intervals")],
+    [State("dataset-version", "data")]
 )
-def update_dashboard(_):
-    global df
-    df_new, path = load_latest_csv(CSV_FOLDER)
-    if not df_new.empty:
-        df = df_new
-
-    if df.empty:
-        empty_fig = go.Figure()
-        empty_fig.update_layout(title="Sin datos")
-        return [], [], empty_fig, empty_fig, [], "Sin datos (ningún CSV disponible)"
+def update_dataset_version(_, current_version):
+    current_dataset()
+    load_aggregates()
+    version = get_dataset_version()
+
+    if version == "sin-datos":
+        last_update_text = "Sin datos (ningún CSV disponible)"
+    else:
+        last_update_text = f"Última actualización local: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        if csv_path:
+            last_update_text += f"  ·  CSV: {os.path.basename(csv_path)}"
+        stats = get_dataset_cache_stats()
+        last_update_text += f"  ·  Caché: {stats['hits']} aciertos / {stats['misses']} lecturas"
+
+    # Sin cambios: no se dispara ningún panel
+    return (dash.no_update if version == current_version else version), last_update_text
+
+def _empty_figure(title: str = "Sin datos"):
+    fig = go.Figure()
+    fig.update_layout(title=title)
+    return fig
 
-    columns = [{"name": i, "id": i} for i in df.columns]
-    data = df.to_dict("records")
+# -----------------------------
+# Histograma de sentimientos
+# -----------------------------
+@app.callback(
+    [
+        Output("grafico-sentimientos", "figure"),
+        Output("histograma-version", "data")
+    ],
+    [Input("dataset-version", "data")],
+    [State("histograma-version", "data")]
+)
+def update_histogram(version, rendered_version):
+    if version is None or version == rendered_version:
+        return dash.no_update, dash.no_update
+    agg = current_aggregates()
+    df_cur = current_dataset() if agg is None else None
+    if agg is None and df_cur.empty:
+        return _empty_figure(), version
 
     try:
-        fig_sent = px.histogram(df, x="Sentimiento", color="Sentimiento", title="Distribución de sentimientos")
+        import plotly.express as px  # diferido: sólo se necesita para el histograma
+        if agg is not None:
+            from aggregates import label_counts
+            fig_sent = px.bar(label_counts(agg), x="Sentimiento", y="Posts", color="Sentimiento",
+                              title="Distribución de sentimientos")
+        else:
+            fig_sent = px.histogram(df_cur, x="Sentimiento", color="Sentimiento", title="Distribución de sentimientos")
     except Exception:
-        fig_sent = go.Figure()
-        fig_sent.update_layout(title="No es posible mostrar histograma")
+        fig_sent = _empty_figure("No es posible mostrar histograma")
+    return fig_sent, version
 
-    try:
-        fig_forecast = build_forecast_figure(df, hours_ahead=FORECAST_HOURS, resample_freq=RESAMPLE_FREQ)
-    except Exception as e:
-        fig_forecast = go.Figure()
-        fig_forecast.update_layout(title=f"Error generando forecast: {e}")
+# -----------------------------
+# Grafo de palabras
+# -----------------------------
+@app.callback(
+    [
+        Output("grafo-palabras", "elements"),
+        Output("grafo-version", "data")
+    ],
+    [Input("dataset-version", "data")],
+    [State("grafo-version", "data")]
+)
+def update_word_graph(version, rendered_version):
+    if version is None or version == rendered_version:
+        return dash.no_update, dash.no_update
+    agg = current_aggregates()
 
     try:
-        elements = generar_grafo_palabras(df, top_n=TOP_WORDS)
+        if agg is not None:
+            from aggregates import graph_elements
+            elements = graph_elements(agg, top_n=TOP_WORDS, min_weight=GRAPH_MIN_WEIGHT, top_k_edges=GRAPH_TOP_K_EDGES)
+        else:
+            token_index.update(current_dataset())
+            elements = token_index.elements(top_n=TOP_WORDS, min_weight=GRAPH_MIN_WEIGHT, top_k_edges=GRAPH_TOP_K_EDGES)
     except Exception as e:
         elements = []
         print("Error generando grafo:", e)
+    return elements, version
 
-    last_update_text = f"Última actualización local: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    if csv_path:
-        last_update_text += f"  ·  CSV: {os.path.basename(csv_path)}"
+# -----------------------------
+# Tabla paginada en servidor
+# -----------------------------
+@app.callback(
+    [
+        Output("tabla-posts", "columns"),
+        Output("tabla-posts", "data"),
+        Output("tabla-posts", "page_count"),
+        Output("tabla-version", "data")
+    ],
+    [
+        Input("tabla-posts", "page_current"),
+        Input("tabla-posts", "page_size"),
+        Input("tabla-posts", "sort_by"),
+        Input("tabla-posts", "filter_query"),
+        Input("dataset-version", "data")
+    ],
+    [State("tabla-version", "data")]
+)
+def update_table_page(page_current, page_size, sort_by, filter_query, version, rendered_version):
+    # Paginar/ordenar/filtrar siempre responde; un refresco sin dataset nuevo no
+    refreshed = dash.callback_context.triggered_id == "dataset-version"
+    if version is None or (refreshed and version == rendered_version):
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    df_cur = current_dataset()
+    columns = [{"name": i, "id": i} for i in df_cur.columns]
+    records, page_count, _ = table_pager.page(df_cur, page_current, page_size, sort_by, filter_query)
+    return columns, records, page_count, version
+
+# -----------------------------
+# Pronóstico
+# -----------------------------
+# El entrenamiento corre en un proceso aparte y este callback devuelve el
+# último pronóstico bueno mientras tanto. El intervalo forecast-poll sólo
+# queda activo mientras hay un entrenamiento pendiente.
+@app.callback(
+    [
+        Output("forecast-sentimiento", "figure"),
+        Output("forecast-poll", "disabled"),
+        Output("forecast-version", "data")
+    ],
+    [Input("dataset-version", "data"), Input("forecast-poll", "n_intervals")],
+    [State("forecast-version", "data")]
+)
+def update_forecast(version, _, rendered_version):
+    polling = dash.callback_context.triggered_id == "forecast-poll"
+    if version is None or (version == rendered_version and not polling):
+        return dash.no_update, dash.no_update, dash.no_update
+    agg = current_aggregates()
+    df_cur = current_dataset()
+
+    if agg is None and df_cur.empty:
+        return _empty_figure(), True, version
+
+    try:
+        series = None
+        if agg is not None:
+            from aggregates import hourly_series
+            series = hourly_series(agg, RESAMPLE_FREQ)
+        fig_forecast = build_forecast_figure(df_cur, hours_ahead=FORECAST_HOURS, resample_freq=RESAMPLE_FREQ,
+                                             series=series)
+    except Exception as e:
+        fig_forecast = _empty_figure(f"Error generando forecast: {e}")
 
-    return columns, data, fig_sent, fig_forecast, elements, last_update_text
+    return fig_forecast, not forecast_pending(), version
 
 # -----------------------------
 # Ejecutar servidor
@@ -0,0 +1,120 @@
+# facebook_feed.py
+"""
+Lectura paginada e incremental del feed de una página (Graph API).
+
+- iter_feed_pages: sigue paging.next y entrega cada página a medida que llega.
+- iter_new_posts: usa un estado persistente con la marca de agua (el
+  created_time más reciente ya procesado) para pedir sólo posts nuevos, y
+  completa el histórico hacia atrás (backfill) en tramos acotados por
+  páginas y por tiempo para terminar dentro del timeout de la función.
+  Con refresh_s vuelve a pedir además los posts de esa ventana reciente,
+  para que los likes de posts ya vistos se actualicen.
+"""
+
+import time
+import logging
+from datetime import datetime
+import requests
+
+GRAPH_URL = "https://graph.facebook.com/v19.0"
+FEED_FIELDS = "id,message,likes.summary(true),created_time"
+FEED_LIMIT = 100  # máximo de posts por página que acepta /feed
+
+
+def parse_created_time(value: str) -> int:
+    """'2025-09-29T06:13:58+0000' -> timestamp unix (segundos)."""
+    return int(datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z").timestamp())
+
+
+def iter_feed_pages(page_id: str, access_token: str, since: int = None, until: int = None,
+                    limit: int = FEED_LIMIT, max_pages: int = None, deadline: float = None,
+                    session: requests.Session = None):
+    """
+    Genera (posts, hay_mas) por cada página de /{page_id}/feed, del post más
+    nuevo al más viejo. Se detiene al agotar paging.next, al llegar a
+    max_pages o al pasar deadline (time.monotonic()).
+    """
+    session = session or requests.Session()
+    url = f"{GRAPH_URL}/{page_id}/feed"
+    params = {"fields": FEED_FIELDS, "limit": limit, "access_token": access_token}
+    if since:
+        params["since"] = since
+    if until:
+        params["until"] = until
+
+    pages = 0
+    while url:
+        if deadline is not None and time.monotonic() >= deadline:
+            logging.warning("⏱️ Presupuesto de tiempo agotado; se continúa en la próxima ejecución.")
+            return
+        response = session.get(url, params=params, timeout=30)
+        if response.status_code != 200:
+            try:
+                logging.error(f"⚠️ Error de Graph API: {response.json().get('error', {})}")
+            except ValueError:
+                logging.error(f"⚠️ Error de Graph API, status {response.status_code}")
+            response.raise_for_status()
+
+        body = response.json()
+        posts = body.get("data", [])
+        # paging.next ya incluye todos los parámetros (cursor, fields, token)
+        url, params = body.get("paging", {}).get("next"), None
+        pages += 1
+        yield posts, bool(url and posts)
+        if not posts or (max_pages and pages >= max_pages):
+            return
+
+
+def iter_new_posts(page_id: str, access_token: str, state: dict, backfill_pages: int = 10,
+                   deadline: float = None, session: requests.Session = None, refresh_s: float = 0):
+    """
+    Genera listas de posts nuevos (más los publicados en los últimos
+    refresh_s segundos, aunque ya se hayan visto) y luego de backfill,
+    actualizando state en el lugar:
+      - since: created_time (unix) más reciente ya procesado (marca de agua)
+      - backfill_until: created_time más viejo alcanzado hacia atrás
+      - backfill_done: True cuando ya no quedan páginas más viejas
+    El llamador debe persistir state sólo si procesó y guardó todo lo generado.
+    """
+    session = session or requests.Session()
+
+    # 1) Posts más nuevos que la marca de agua (en la primera ejecución, las
+    #    páginas más recientes hasta backfill_pages)
+    since = state.get("since")
+    newest, oldest, complete = since, state.get("backfill_until"), False
+    fetch_since = since + 1 if since else None
+    if fetch_since and refresh_s:
+        fetch_since = min(fetch_since, int(time.time() - refresh_s))
+    for posts, has_more in iter_feed_pages(page_id, access_token, since=fetch_since,
+                                           max_pages=None if since else backfill_pages,
+                                           deadline=deadline, session=session):
+        if posts:
+            times = [parse_created_time(p["created_time"]) for p in posts if p.get("created_time")]
+            if times:
+                newest = max(newest or 0, max(times))
+                if not since:
+                    oldest = min(oldest or times[0], min(times))
+            yield posts
+        complete = not has_more
+    if since is None:
+        state["backfill_done"] = complete
+        state["backfill_until"] = oldest
+    # Si el tramo incremental se cortó por tiempo no se avanza la marca de agua:
+    # la próxima ejecución vuelve a pedir ese rango (los posts se deduplican por id).
+    if complete or since is None:
+        state["since"] = newest
+
+    # 2) Backfill hacia atrás por tramos
+    if since is None or state.get("backfill_done") or not state.get("backfill_until"):
+        return
+    oldest, exhausted = state["backfill_until"], False
+    for posts, has_more in iter_feed_pages(page_id, access_token, until=oldest - 1,
+                                           max_pages=backfill_pages, deadline=deadline, session=session):
+        times = [parse_created_time(p["created_time"]) for p in posts if p.get("created_time")]
+        if times:
+            oldest = min(oldest, min(times))
+        if posts:
+            yield posts
+        exhausted = not has_more
+    state["backfill_until"] = oldest
+    state["backfill_done"] = exhausted
@@ -0,0 +1,414 @@
+# forecasting.py
+"""
+Pronóstico de sentimiento para el dashboard.
+
+- prepare_series: serie remuestreada ds/y a partir de los posts.
+- FORECAST_ENGINE elige el motor: "prophet" (por defecto) o "holtwinters",
+  un Holt-Winters aditivo vectorizado en NumPy con intervalos analíticos
+  que devuelve el mismo frame ds/yhat/yhat_lower/yhat_upper.
+- ForecastCache: memoiza el frame de pronóstico por hash de la serie,
+  horizonte y frecuencia, con límite de entradas/memoria (LRU) y
+  persistencia opcional en disco (FORECAST_CACHE_DIR).
+- request_forecast: entrena en un ProcessPoolExecutor (Prophet/Stan es
+  CPU-bound y no debe competir por el GIL con las peticiones) y mientras
+  tanto devuelve el último pronóstico bueno.
+- build_forecast_figure: arma la figura usando la caché.
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+import collections
+import multiprocessing
+from statistics import NormalDist
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+import plotly.graph_objects as go
+
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", 32))
+FORECAST_CACHE_MAX_MB = float(os.getenv("FORECAST_CACHE_MAX_MB", 64))
+FORECAST_CACHE_DIR = os.getenv("FORECAST_CACHE_DIR")  # vacío = sólo memoria
+FORECAST_BACKGROUND = os.getenv("FORECAST_BACKGROUND", "true").lower() == "true"
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", 1))
+FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "prophet").lower()
+FORECAST_INTERVAL_WIDTH = float(os.getenv("FORECAST_INTERVAL_WIDTH", 0.8))  # igual que Prophet
+# Tras un fallo en segundo plano se reintenta la misma serie a los FORECAST_RETRY_S
+# segundos, el doble cada vez, hasta FORECAST_MAX_ATTEMPTS intentos
+FORECAST_RETRY_S = float(os.getenv("FORECAST_RETRY_S", 30))
+FORECAST_MAX_ATTEMPTS = int(os.getenv("FORECAST_MAX_ATTEMPTS", 4))
+
+FORECAST_COLUMNS = ["ds", "yhat", "yhat_lower", "yhat_upper"]
+
+# -----------------------------
+# Serie remuestreada
+# -----------------------------
+def _strip_tz_str(s):
+    if pd.isna(s):
+        return s
+    s = str(s).strip()
+    s = re.sub(r'([+-]\d{2}:?\d{2}|Z|[+-]\d{4})$', '', s).strip()
+    return s
+
+sent_map = {"Positivo": 1, "Negativo": -1, "Neutro": 0,
+            "positivo": 1, "negativo": -1, "neutro": 0,
+            "positive": 1, "negative": -1, "neutral": 0}
+
+def prepare_series(df: pd.DataFrame, resample_freq: str):
+    """Serie ds/y (sentimiento promedio por periodo). None si no hay fechas válidas."""
+    dfc = df.copy()
+    if isinstance(dfc["Fecha"].dtype, pd.DatetimeTZDtype):
+        # Snapshots tipados (snapshot_format): la fecha ya viene parseada en UTC
+        dfc["Fecha_parsed"] = dfc["Fecha"].dt.tz_convert("UTC").dt.tz_localize(None)
+    else:
+        dfc["Fecha_clean"] = dfc["Fecha"].apply(_strip_tz_str)
+        dfc["Fecha_parsed"] = pd.to_datetime(dfc["Fecha_clean"], errors="coerce")
+    dfc = dfc.dropna(subset=["Fecha_parsed","Sentimiento"]).copy()
+    if dfc.empty:
+        return None
+
+    dfc["sent_score"] = dfc["Sentimiento"].astype(object).map(sent_map).fillna(0).astype(float)
+    dfc = dfc.set_index("Fecha_parsed").sort_index()
+    df_hour = dfc["sent_score"].resample(resample_freq).mean().to_frame()
+    df_hour["y"] = df_hour["sent_score"].fillna(0)
+    df_hour = df_hour.reset_index().rename(columns={"Fecha_parsed": "ds"})
+
+    series = df_hour[["ds","y"]].copy()
+    if pd.api.types.is_datetime64_any_dtype(series["ds"]):
+        series["ds"] = pd.to_datetime(series["ds"]).dt.tz_localize(None)
+    return series
+
+# -----------------------------
+# Motores de pronóstico
+# -----------------------------
+def fit_prophet(series: pd.DataFrame, hours_ahead: int, resample_freq: str) -> pd.DataFrame:
+    from prophet import Prophet  # import diferido: cuesta ~1 s y sólo lo usa este motor
+
+    model = Prophet(interval_width=FORECAST_INTERVAL_WIDTH)
+    model.fit(series)
+    future = model.make_future_dataframe(periods=hours_ahead, freq=resample_freq)
+    return model.predict(future)[FORECAST_COLUMNS]
+
+def _season_length(resample_freq: str) -> int:
+    """Periodos por día (estacionalidad diaria); 1 si la frecuencia es de un día o más."""
+    step = pd.Timedelta(pd.tseries.frequencies.to_offset(resample_freq.replace("H", "h")))
+    return max(1, int(round(pd.Timedelta(days=1) / step)))
+
+def _holt_winters_grid(y: np.ndarray, m: int, alpha, beta, gamma):
+    """
+    Corre ETS(A,A,A) (o ETS(A,A,N) con m=1) para todos los parámetros a la vez.
+    alpha/beta/gamma son arrays de la misma forma (P,). Devuelve (fitted[P,n], estados finales).
+    """
+    n, P = len(y), len(alpha)
+    if m > 1:
+        level = np.full(P, y[:m].mean())
+        trend = np.full(P, (y[m:2 * m].mean() - y[:m].mean()) / m)
+        season = np.tile(y[:m] - y[:m].mean(), (P, 1))
+    else:
+        level = np.full(P, y[0])
+        trend = np.full(P, y[1] - y[0] if n > 1 else 0.0)
+        season = np.zeros((P, 1))
+
+    fitted = np.empty((P, n))
+    for t in range(n):
+        k = t % m
+        fitted[:, t] = level + trend + season[:, k]
+        err = y[t] - fitted[:, t]
+        level = level + trend + alpha * err
+        trend = trend + beta * err
+        season[:, k] += gamma * err
+    return fitted, level, trend, season
+
+def fit_holt_winters(series: pd.DataFrame, hours_ahead: int, resample_freq: str) -> pd.DataFrame:
+    """
+    Holt-Winters aditivo (ETS A,A,A; sin estacionalidad si hay menos de dos días).
+    Los parámetros se eligen por SSE sobre una grilla evaluada en paralelo con
+    NumPy; los intervalos usan la varianza analítica del error a h pasos:
+    σ²·(1 + Σ c_j²), c_j = α + jβ + γ·[j ≡ 0 mod m].
+    """
+    y = series["y"].to_numpy(dtype=float)
+    n = len(y)
+    m = _season_length(resample_freq)
+    if n < 2 * m:
+        m = 1
+
+    a, bf, gf = np.meshgrid(np.linspace(0.05, 0.95, 10), [0.0, 0.05, 0.1, 0.2, 0.4],
+                            [0.0, 0.05, 0.1, 0.2, 0.4] if m > 1 else [0.0], indexing="ij")
+    alpha, beta, gamma = a.ravel(), (a * bf).ravel(), ((1 - a) * gf).ravel()
+
+    fitted, level, trend, season = _holt_winters_grid(y, m, alpha, beta, gamma)
+    sse = ((y - fitted) ** 2).sum(axis=1)
+    best = int(np.argmin(sse))
+    n_params = 4 if m == 1 else 4 + m  # α, β, l0, b0 (+ γ y m-1 estacionales)
+    sigma2 = sse[best] / max(n - n_params, 1)
+
+    h = np.arange(1, hours_ahead + 1)
+    future = level[best] + h * trend[best] + season[best, (n + h - 1) % m]
+    j = np.arange(1, hours_ahead)
+    c = alpha[best] + j * beta[best] + gamma[best] * (j % m == 0)
+    var_h = sigma2 * (1 + np.concatenate([[0.0], np.cumsum(c ** 2)]))
+
+    z = NormalDist().inv_cdf(0.5 + FORECAST_INTERVAL_WIDTH / 2)
+    yhat = np.concatenate([fitted[best], future])
+    spread = z * np.sqrt(np.concatenate([np.full(n, sigma2), var_h]))
+
+    step = pd.tseries.frequencies.to_offset(resample_freq.replace("H", "h"))
+    last = pd.Timestamp(series["ds"].iloc[-1])
+    ds = pd.concat([series["ds"].reset_index(drop=True),
+                    pd.Series(pd.date_range(last + step, periods=hours_ahead, freq=step))], ignore_index=True)
+    return pd.DataFrame({"ds": ds, "yhat": yhat, "yhat_lower": yhat - spread, "yhat_upper": yhat + spread})
+
+# motor -> (función, entrenar en segundo plano)
+FORECAST_ENGINES = {
+    "prophet": (fit_prophet, True),
+    "holtwinters": (fit_holt_winters, False),
+}
+
+def get_engine(name: str = None):
+    name = (name or FORECAST_ENGINE).lower()
+    if name not in FORECAST_ENGINES:
+        raise ValueError(f"Motor de pronóstico desconocido: {name} (opciones: {', '.join(FORECAST_ENGINES)})")
+    return name, FORECAST_ENGINES[name]
+
+# -----------------------------
+# Caché de pronósticos
+# -----------------------------
+def forecast_key(series: pd.DataFrame, hours_ahead: int, resample_freq: str, engine: str = None) -> str:
+    """Hash estable de la serie ds/y más los parámetros y el motor del pronóstico."""
+    engine, _ = get_engine(engine)
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(series[["ds", "y"]], index=False).to_numpy().tobytes())
+    h.update(f"|{hours_ahead}|{resample_freq}|{engine}".encode())
+    return h.hexdigest()
+
+class ForecastCache:
+    """
+    Caché LRU de frames de pronóstico (ds, yhat, yhat_lower, yhat_upper).
+    Se desaloja por número de entradas y por memoria total; si cache_dir está
+    definido, cada entrada también se guarda como Parquet para sobrevivir a
+    reinicios (el directorio se poda al mismo número de entradas).
+    """
+
+    def __init__(self, max_entries: int = FORECAST_CACHE_MAX_ENTRIES,
+                 max_bytes: int = int(FORECAST_CACHE_MAX_MB * 1024 * 1024), cache_dir: str = FORECAST_CACHE_DIR):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # clave -> (frame, bytes)
+        self._bytes = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evicted": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _remember(self, key: str, frame: pd.DataFrame):
+        size = int(frame.memory_usage(deep=True).sum())
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (frame, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.stats["evicted"] += 1
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._entries[key][0]
+            if self.cache_dir and os.path.exists(self._path(key)):
+                try:
+                    frame = pd.read_parquet(self._path(key))
+                    os.utime(self._path(key))
+                    self._remember(key, frame)
+                    self.stats["disk_hits"] += 1
+                    return frame
+                except Exception as e:
+                    logging.warning(f"⚠️ Pronóstico en disco ilegible ({key}): {e}")
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, frame: pd.DataFrame):
+        with self._lock:
+            self._remember(key, frame)
+            if self.cache_dir:
+                self._persist(key, frame)
+
+    def _persist(self, key: str, frame: pd.DataFrame):
+        try:
+            tmp = self._path(key) + ".tmp"
+            frame.to_parquet(tmp, index=False)
+            os.replace(tmp, self._path(key))
+            files = sorted(
+                (e for e in os.scandir(self.cache_dir) if e.name.endswith(".parquet")),
+                key=lambda e: e.stat().st_mtime,
+            )
+            for entry in files[:max(0, len(files) - self.max_entries)]:
+                os.remove(entry.path)
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo persistir el pronóstico {key}: {e}")
+
+forecast_cache = ForecastCache()
+
+def cached_forecast(series: pd.DataFrame, hours_ahead: int, resample_freq: str, engine: str = None) -> pd.DataFrame:
+    """Devuelve el pronóstico de la caché o entrena el motor y lo guarda."""
+    engine, (fit, _) = get_engine(engine)
+    key = forecast_key(series, hours_ahead, resample_freq, engine)
+    forecast = forecast_cache.get(key)
+    if forecast is None:
+        forecast = fit(series, hours_ahead, resample_freq)
+        forecast_cache.put(key, forecast)
+    return forecast
+
+# -----------------------------
+# Entrenamiento en segundo plano
+# -----------------------------
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}      # clave -> Future
+_last_good = {}    # (hours_ahead, resample_freq, motor) -> forecast
+_failures = {}     # clave -> (intentos fallidos, time.monotonic() del último, mensaje)
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: el proceso del dashboard tiene hilos (Flask), fork no es seguro
+        _executor = ProcessPoolExecutor(max_workers=FORECAST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+def _record_failure(key: str, message: str):
+    """Anota un intento fallido de key (se llama con _executor_lock tomado)."""
+    attempts = _failures.get(key, (0, 0.0, ""))[0] + 1
+    # Sólo interesa la serie actual: los fallos de series anteriores se olvidan
+    _failures.clear()
+    _failures[key] = (attempts, time.monotonic(), message)
+    if attempts >= FORECAST_MAX_ATTEMPTS:
+        logging.error(f"⚠️ El pronóstico falló {attempts} veces; no se reintenta hasta que cambie la serie.")
+
+def _retry_blocked(key: str):
+    """Mensaje del último fallo si todavía no toca reintentar la clave, o None."""
+    failure = _failures.get(key)
+    if failure is None:
+        return None
+    attempts, failed_at, message = failure
+    if attempts >= FORECAST_MAX_ATTEMPTS:
+        return message
+    if time.monotonic() - failed_at < FORECAST_RETRY_S * 2 ** (attempts - 1):
+        return message
+    return None
+
+def _on_forecast_done(key: str, params: tuple, future):
+    global _executor
+    try:
+        forecast = future.result()
+    except BrokenProcessPool as e:
+        # Se recrea el pool; la clave cuenta como un intento fallido más
+        logging.error(f"⚠️ El worker de pronóstico murió: {e}")
+        with _executor_lock:
+            _executor = None
+            _record_failure(key, f"el worker de pronóstico murió: {e}")
+            _pending.pop(key, None)
+        return
+    except Exception as e:
+        logging.error(f"⚠️ Error entrenando el pronóstico en segundo plano: {e}")
+        with _executor_lock:
+            _record_failure(key, str(e))
+            _pending.pop(key, None)
+        return
+    forecast_cache.put(key, forecast)
+    _last_good[params] = forecast
+    with _executor_lock:
+        _failures.pop(key, None)
+        _pending.pop(key, None)
+    logging.info(f"✅ Pronóstico nuevo listo ({key[:12]})")
+
+def forecast_pending() -> bool:
+    """True si hay un entrenamiento en curso."""
+    return bool(_pending)
+
+def request_forecast(series: pd.DataFrame, hours_ahead: int, resample_freq: str):
+    """
+    Devuelve (forecast, pending). Si la serie ya tiene pronóstico en caché lo
+    devuelve al instante; si no, encola el entrenamiento (una sola vez por
+    clave) y devuelve el último pronóstico bueno (o None) con pending=True.
+    Con FORECAST_BACKGROUND=false, o con motores rápidos como holtwinters,
+    entrena en el mismo hilo.
+
+    Si el último entrenamiento de la serie falló lanza RuntimeError hasta que
+    toque reintentar (FORECAST_RETRY_S, con espera exponencial) o, pasados
+    FORECAST_MAX_ATTEMPTS intentos, hasta que cambie la serie.
+    """
+    engine, (fit, background) = get_engine()
+    if not FORECAST_BACKGROUND or not background:
+        return cached_forecast(series, hours_ahead, resample_freq, engine), False
+
+    params = (hours_ahead, resample_freq, engine)
+    key = forecast_key(series, hours_ahead, resample_freq, engine)
+    forecast = forecast_cache.get(key)
+    if forecast is not None:
+        _last_good[params] = forecast
+        return forecast, False
+    error = _retry_blocked(key)
+    if error is not None:
+        raise RuntimeError(error)
+
+    with _executor_lock:
+        future = None
+        if key not in _pending:
+            future = _pending[key] = _get_executor().submit(fit, series, hours_ahead, resample_freq)
+    # Fuera del lock: si el futuro ya terminó, el callback corre en este mismo hilo
+    if future is not None:
+        future.add_done_callback(lambda f: _on_forecast_done(key, params, f))
+    return _last_good.get(params), True
+
+# -----------------------------
+# Figura
+# -----------------------------
+def build_forecast_figure(df: pd.DataFrame, hours_ahead: int, resample_freq: str, series: pd.DataFrame = None):
+    """Figura de pronóstico; con series (ds/y ya remuestreada, p. ej. de los agregados) no se usa df."""
+    fig = go.Figure()
+    fig.update_layout(title="Sin datos para pronóstico")
+
+    if series is None:
+        if df.empty or "Fecha" not in df.columns or "Sentimiento" not in df.columns:
+            return fig
+        series = prepare_series(df, resample_freq)
+
+    df_prophet = series
+    if df_prophet is None:
+        return fig
+
+    if df_prophet.empty or df_prophet["y"].nunique() <= 1:
+        fig.update_layout(title="No hay suficiente variación de datos para pronóstico")
+        return fig
+
+    try:
+        forecast, pending = request_forecast(df_prophet, hours_ahead, resample_freq)
+    except Exception as e:
+        fig.update_layout(title=f"Error entrenando {FORECAST_ENGINE}: {e}")
+        return fig
+
+    if forecast is None:
+        fig.update_layout(title="Entrenando pronóstico…")
+        return fig
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df_prophet["ds"], y=df_prophet["y"], mode="markers", name="Histórico", marker=dict(color="blue", size=6)))
+    fig.add_trace(go.Scatter(x=forecast["ds"], y=forecast["yhat"], mode="lines", name=f"Pronóstico ({hours_ahead}h)", line=dict(color="orange")))
+    fig.add_trace(go.Scatter(x=forecast["ds"], y=forecast["yhat_upper"], mode="lines", line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=forecast["ds"], y=forecast["yhat_lower"], mode="lines", fill="tonexty", fillcolor="rgba(255,165,0,0.2)", name=f"Confianza {FORECAST_INTERVAL_WIDTH:.0%}"))
+
+    title = f"Pronóstico de sentimiento ({hours_ahead}h)"
+    if pending:
+        title += " · actualizando con datos nuevos…"
+    fig.update_layout(title=title, xaxis_title="Hora", yaxis_title="Sentimiento promedio", legend=dict(orientation="v"))
+    return fig
@@ -0,0 +1,163 @@
+# ingest_metrics.py
+"""
+Tiempos por etapa de una ejecución de la ingesta.
+
+    with ingest_run("timer_trigger"):
+        with stage("snapshot_read") as s:
+            df = ...
+            s.items = len(df)
+
+Cada etapa acumula llamadas, segundos, elementos y bytes. Las peticiones
+HTTP (Graph, sentimiento) se registran con http_hook, que cuenta status y
+reintentos de urllib3 y usa response.elapsed como duración. Al terminar la
+ejecución se emite un registro JSON por etapa y una línea de resumen, con
+los mismos datos en extra["custom_dimensions"] para Application Insights.
+
+Fuera de una ejecución (p. ej. en el dashboard) o con INGEST_METRICS=false
+stage() devuelve un contexto vacío y los hooks no hacen nada.
+
+La ejecución en curso vive en un ContextVar, así que dos invocaciones
+concurrentes en el mismo proceso no se mezclan. Los hilos de un
+ThreadPoolExecutor no heredan el contexto: las funciones que se envían a un
+pool se envuelven con in_current_context().
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+INGEST_METRICS = os.environ.get("INGEST_METRICS", "true").lower() == "true"
+
+
+class _Stage:
+    __slots__ = ("items", "bytes")
+
+    def __init__(self):
+        self.items = 0
+        self.bytes = 0
+
+
+_NULL_STAGE = _Stage()
+
+
+class RunMetrics:
+    """Acumulados de una ejecución; seguro entre hilos."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.status = Counter()
+        self.info = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float = 0.0, items: int = 0, nbytes: int = 0, retries: int = 0) -> None:
+        with self._lock:
+            record = self.stages.get(name)
+            if record is None:
+                record = self.stages[name] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                              "items": 0, "bytes": 0, "retries": 0}
+            record["calls"] += 1
+            record["seconds"] += seconds
+            record["max_seconds"] = max(record["max_seconds"], seconds)
+            record["items"] += items
+            record["bytes"] += nbytes
+            record["retries"] += retries
+
+    def observe_http(self, name: str, response) -> None:
+        retries = getattr(response.raw, "retries", None)
+        retries = len(retries.history) if retries is not None and retries.history else 0
+        length = response.headers.get("Content-Length")
+        self.add(name, seconds=response.elapsed.total_seconds(),
+                 nbytes=int(length) if length and length.isdigit() else len(response.content), retries=retries)
+        with self._lock:
+            self.status[f"{name}:{response.status_code}"] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "run": self.run_id,
+                "function": self.name,
+                "seconds": round(time.perf_counter() - self.started, 3),
+                "stages": {k: round(v["seconds"], 3) for k, v in self.stages.items()},
+                "http": dict(self.status),
+                "retries": sum(v["retries"] for v in self.stages.values()),
+                **self.info,
+            }
+
+    def emit(self) -> None:
+        for name, record in self.stages.items():
+            data = {"run": self.run_id, "function": self.name, "stage": name,
+                    **{k: round(v, 4) if isinstance(v, float) else v for k, v in record.items()}}
+            logging.info(f"📏 {json.dumps(data)}", extra={"custom_dimensions": data})
+        summary = self.summary()
+        logging.info(f"📏 Resumen de ingesta: {json.dumps(summary)}",
+                     extra={"custom_dimensions": {k: v for k, v in summary.items() if not isinstance(v, dict)}})
+
+
+_current = contextvars.ContextVar("ingest_run", default=None)
+
+
+def current_run():
+    """Métricas de la ejecución en curso, o None."""
+    return _current.get()
+
+
+def in_current_context(fn):
+    """
+    Envuelve fn para que corra en otro hilo con el contexto del que la
+    envuelve (y por lo tanto con su ejecución en curso). Cada llamada usa su
+    propia copia, porque un mismo Context no se puede activar en dos hilos a la vez.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+@contextmanager
+def ingest_run(name: str):
+    """Abre una ejecución (si INGEST_METRICS) y emite sus métricas al cerrarla."""
+    if not INGEST_METRICS:
+        yield None
+        return
+    metrics = RunMetrics(name)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+        metrics.emit()
+
+
+@contextmanager
+def stage(name: str):
+    """Mide una etapa; el objeto entregado acepta items y bytes."""
+    metrics = _current.get()
+    if metrics is None:
+        yield _NULL_STAGE
+        return
+    record = _Stage()
+    t0 = time.perf_counter()
+    try:
+        yield record
+    finally:
+        metrics.add(name, seconds=time.perf_counter() - t0, items=record.items, nbytes=record.bytes)
+
+
+def http_hook(name: str):
+    """Hook de requests (session.hooks['response']) que registra cada respuesta como etapa name."""
+    def hook(response, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.observe_http(name, response)
+        return response
+    return hook
@@ -0,0 +1,148 @@
+# local_blob_storage.py
+"""
+Sustituto en proceso de ContainerClient/BlobClient de azure-storage-blob
+respaldado por una carpeta local (un subdirectorio por contenedor).
+
+Implementa sólo lo que usa este proyecto: exists/create_container,
+list_blobs, get_blob_client, upload_blob, download_blob (con lecturas
+condicionales por ETag), get_blob_properties y delete_blob, con las mismas
+excepciones de azure.core que el SDK. Sirve para pruebas y benchmarks sin
+Azure ni Azurite.
+"""
+
+import os
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+    ResourceNotModifiedError,
+)
+
+_write_lock = threading.Lock()
+
+
+def _properties(path: str, name: str):
+    stat = os.stat(path)
+    return SimpleNamespace(
+        name=name,
+        size=stat.st_size,
+        etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        last_modified=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+    )
+
+
+class _LocalDownloader:
+    def __init__(self, data: bytes, properties):
+        self._data = data
+        self.properties = properties
+        self.size = properties.size
+
+    def readall(self) -> bytes:
+        return self._data
+
+
+class LocalBlobClient:
+    def __init__(self, container_path: str, blob_name: str):
+        self.blob_name = blob_name
+        self._path = os.path.join(container_path, *blob_name.split("/"))
+
+    def exists(self) -> bool:
+        return os.path.isfile(self._path)
+
+    def get_blob_properties(self):
+        try:
+            return _properties(self._path, self.blob_name)
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"El blob {self.blob_name} no existe")
+
+    def _check_conditions(self, etag, match_condition):
+        if etag is None or match_condition is None:
+            return
+        current = self.get_blob_properties().etag
+        if match_condition == MatchConditions.IfModified and current == etag:
+            error = ResourceNotModifiedError(f"El blob {self.blob_name} no cambió")
+            error.status_code = 304
+            raise error
+        if match_condition == MatchConditions.IfNotModified and current != etag:
+            error = ResourceModifiedError(f"El blob {self.blob_name} cambió")
+            error.status_code = 412
+            raise error
+
+    def download_blob(self, etag=None, match_condition=None, **kwargs) -> _LocalDownloader:
+        self._check_conditions(etag, match_condition)
+        try:
+            with open(self._path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"El blob {self.blob_name} no existe")
+        return _LocalDownloader(data, _properties(self._path, self.blob_name))
+
+    def upload_blob(self, data, overwrite: bool = False, etag=None, match_condition=None, **kwargs):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        elif not isinstance(data, (bytes, bytearray)):
+            data = data.read()
+        with _write_lock:
+            if os.path.exists(self._path):
+                if not overwrite:
+                    raise ResourceExistsError(f"El blob {self.blob_name} ya existe")
+                self._check_conditions(etag, match_condition)
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            # Escritura atómica: un lector nunca ve un blob a medias
+            tmp_path = f"{self._path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path)
+        props = _properties(self._path, self.blob_name)
+        return {"etag": props.etag, "last_modified": props.last_modified}
+
+    def delete_blob(self, **kwargs) -> None:
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"El blob {self.blob_name} no existe")
+
+
+class LocalContainerClient:
+    def __init__(self, root: str, container_name: str):
+        self.container_name = container_name
+        self._path = os.path.join(root, container_name)
+
+    def exists(self) -> bool:
+        return os.path.isdir(self._path)
+
+    def create_container(self) -> None:
+        if self.exists():
+            raise ResourceExistsError(f"El contenedor {self.container_name} ya existe")
+        os.makedirs(self._path)
+
+    def get_blob_client(self, blob: str) -> LocalBlobClient:
+        return LocalBlobClient(self._path, blob)
+
+    def list_blobs(self, name_starts_with: str = None):
+        if not self.exists():
+            raise ResourceNotFoundError(f"El contenedor {self.container_name} no existe")
+        for dirpath, _, filenames in os.walk(self._path):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, self._path).replace(os.sep, "/")
+                if name_starts_with and not name.startswith(name_starts_with):
+                    continue
+                try:
+                    yield _properties(path, name)
+                except FileNotFoundError:
+                    continue  # borrado mientras se listaba
+
+    def upload_blob(self, name: str, data, overwrite: bool = False, **kwargs) -> LocalBlobClient:
+        blob_client = self.get_blob_client(name)
+        blob_client.upload_blob(data, overwrite=overwrite, **kwargs)
+        return blob_client
+
+    def delete_blob(self, blob: str, **kwargs) -> None:
+        self.get_blob_client(blob).delete_blob()
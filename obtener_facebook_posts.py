@@ -1,92 +1,124 @@
 # obtener_facebook_posts.py
 import os
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import pandas as pd
-from datetime import datetime
-from azure.ai.textanalytics import TextAnalyticsClient
-from azure.core.credentials import AzureKeyCredential
+from azure_sentiment import SENTIMENT_CONCURRENCY, make_batches
+from sentiment_cache import analyze_with_cache, get_sentiment_cache
 
-# -------------------------
-# Variables de entorno
-# -------------------------
-access_token = os.getenv("FACEBOOK_ACCESS_TOKEN")
-page_id = os.getenv("META_PAGE_ID")
-azure_key = os.getenv("AZURE_TEXT_KEY")
-azure_endpoint = os.getenv("AZURE_TEXT_ENDPOINT")
-
-# Validar que existan las variables
-if not all([access_token, page_id, azure_key, azure_endpoint]):
-    print("❌ Faltan variables de entorno. Asegúrate de definir FACEBOOK_ACCESS_TOKEN, META_PAGE_ID, AZURE_TEXT_KEY y AZURE_TEXT_ENDPOINT")
-    exit()
+SENTIMENT_LABELS = {"positive": "Positivo", "negative": "Negativo"}
 
-print("✅ Variables de entorno cargadas correctamente")
-
-# -------------------------
-# Configurar cliente Azure
-# -------------------------
-client = TextAnalyticsClient(
-    endpoint=azure_endpoint,
-    credential=AzureKeyCredential(azure_key)
-)
 
 # -------------------------
 # Obtener posts de Facebook
 # -------------------------
-url = f"https://graph.facebook.com/v17.0/{page_id}/posts"
-params = {
-    "fields": "message,created_time,likes.summary(true)",
-    "limit": 50,
-    "access_token": access_token
-}
-
-try:
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    data = response.json().get("data", [])
-    if not data:
-        print("⚠️ No se encontraron posts")
-except requests.exceptions.RequestException as e:
-    print(f"⚠️ Error obteniendo posts de Meta: {e}")
-    data = []
+def fetch_posts(page_id: str, access_token: str, limit: int = 50) -> list:
+    url = f"https://graph.facebook.com/v17.0/{page_id}/posts"
+    params = {
+        "fields": "message,created_time,likes.summary(true)",
+        "limit": limit,
+        "access_token": access_token
+    }
+    try:
+        response = requests.get(url, params=params)
+        response.raise_for_status()
+        data = response.json().get("data", [])
+        if not data:
+            print("⚠️ No se encontraron posts")
+        return data
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️ Error obteniendo posts de Meta: {e}")
+        return []
+
 
 # -------------------------
-# Preparar DataFrame
+# Analizar sentimiento por lotes
 # -------------------------
-posts_list = []
-for post in data:
-    text = post.get("message", "")
-    created_time = post.get("created_time")
-    likes = post.get("likes", {}).get("summary", {}).get("total_count", 0)
-
-    # Analizar sentimiento con Azure
-    if text.strip():
+def analyze_documents(client, documents, max_workers: int = SENTIMENT_CONCURRENCY) -> dict:
+    """
+    Analiza [{'id', 'text'}] con el SDK en lotes del tamaño máximo del
+    servicio, varios en paralelo, y devuelve {id: {'sentiment': ...}}.
+    Un lote que falla deja sus documentos sin resultado.
+    """
+    def analyze_batch(batch):
         try:
-            sentiment_result = client.analyze_sentiment([text])[0]
-            if sentiment_result.sentiment == "positive":
-                sentiment = "Positivo"
-            elif sentiment_result.sentiment == "negative":
-                sentiment = "Negativo"
-            else:
-                sentiment = "Neutro"
+            results = client.analyze_sentiment(batch)
         except Exception as e:
-            sentiment = "Neutro"
             print(f"⚠️ Error analizando sentimiento: {e}")
-    else:
-        sentiment = "Neutro"
+            return {}
+        return {
+            doc["id"]: {"sentiment": result.sentiment}
+            for doc, result in zip(batch, results) if not result.is_error
+        }
+
+    batches = make_batches(documents)
+    sentiments = {}
+    if len(batches) <= 1 or max_workers <= 1:
+        for batch in batches:
+            sentiments.update(analyze_batch(batch))
+        return sentiments
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+        for result in pool.map(analyze_batch, batches):
+            sentiments.update(result)
+    return sentiments
 
-    posts_list.append({
-        "Fecha": created_time,
-        "Post": text,
-        "Likes": likes,
-        "Sentimiento": sentiment
-    })
 
 # -------------------------
-# Guardar CSV
+# Preparar DataFrame
 # -------------------------
-if posts_list:
-    df = pd.DataFrame(posts_list)
-    df.to_csv("facebook_posts.csv", index=False)
-    print(f"✅ CSV generado en facebook_posts.csv con {len(df)} posts")
-else:
-    print("⚠️ Sin datos para generar CSV")
+def obtener_posts(page_id: str, access_token: str, azure_key: str = None, azure_endpoint: str = None,
+                  limit: int = 50, client=None, max_workers: int = SENTIMENT_CONCURRENCY) -> pd.DataFrame:
+    """Descarga los posts de la página y devuelve Fecha, Post, Likes y Sentimiento."""
+    if client is None:
+        from azure.ai.textanalytics import TextAnalyticsClient
+        from azure.core.credentials import AzureKeyCredential
+        client = TextAnalyticsClient(endpoint=azure_endpoint, credential=AzureKeyCredential(azure_key))
+
+    data = fetch_posts(page_id, access_token, limit)
+
+    # Sólo los textos no vacíos van a Azure; el índice del post es el id del documento
+    documents = [
+        {"id": str(i), "text": post.get("message", "")}
+        for i, post in enumerate(data) if post.get("message", "").strip()
+    ]
+    sentiments = analyze_with_cache(documents, lambda docs: analyze_documents(client, docs, max_workers))
+    get_sentiment_cache().log_stats()
+
+    posts_list = [
+        {
+            "Fecha": post.get("created_time"),
+            "Post": post.get("message", ""),
+            "Likes": post.get("likes", {}).get("summary", {}).get("total_count", 0),
+            "Sentimiento": SENTIMENT_LABELS.get(sentiments.get(str(i), {}).get("sentiment"), "Neutro")
+        }
+        for i, post in enumerate(data)
+    ]
+    return pd.DataFrame(posts_list, columns=["Fecha", "Post", "Likes", "Sentimiento"])
+
+
+if __name__ == "__main__":
+    # -------------------------
+    # Variables de entorno
+    # -------------------------
+    access_token = os.getenv("FACEBOOK_ACCESS_TOKEN")
+    page_id = os.getenv("META_PAGE_ID")
+    azure_key = os.getenv("AZURE_TEXT_KEY")
+    azure_endpoint = os.getenv("AZURE_TEXT_ENDPOINT")
+
+    # Validar que existan las variables
+    if not all([access_token, page_id, azure_key, azure_endpoint]):
+        print("❌ Faltan variables de entorno. Asegúrate de definir FACEBOOK_ACCESS_TOKEN, META_PAGE_ID, AZURE_TEXT_KEY y AZURE_TEXT_ENDPOINT")
+        exit()
+
+    print("✅ Variables de entorno cargadas correctamente")
+
+    df = obtener_posts(page_id, access_token, azure_key, azure_endpoint)
+
+    # -------------------------
+    # Guardar CSV
+    # -------------------------
+    if not df.empty:
+        df.to_csv("facebook_posts.csv", index=False)
+        print(f"✅ CSV generado en facebook_posts.csv con {len(df)} posts")
+    else:
+        print("⚠️ Sin datos para generar CSV")
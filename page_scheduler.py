@@ -0,0 +1,169 @@
+# page_scheduler.py
+"""
+Ingesta de varias páginas en paralelo sin pasarse de la cuota de Graph API.
+
+- GraphUsage lee las cabeceras de uso que devuelve Graph en cada respuesta
+  (X-App-Usage y X-Business-Use-Case-Usage, porcentajes 0-100) como hook de
+  requests, y de ahí sale cuántas páginas se pueden pedir a la vez: todas las
+  del pool con uso bajo, una sola al pasar INGEST_USAGE_SLOWDOWN_PCT y
+  ninguna al pasar INGEST_USAGE_STOP_PCT o mientras Graph indique
+  estimated_time_to_regain_access.
+- Cada página lleva su propia frecuencia en su estado de ingesta: una página
+  con posts nuevos se vuelve a pedir en la siguiente ejecución, una sin
+  novedades espacia sus lecturas (el doble cada vez, hasta
+  PAGE_MAX_INTERVAL_S), y con uso alto todos los intervalos se estiran.
+- run_pages reparte las páginas pendientes (las más atrasadas primero) en un
+  pool acotado, recalculando la concurrencia permitida cada vez que termina
+  una; lo que no alcanza a correr queda para la próxima ejecución.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from ingest_metrics import in_current_context
+
+INGEST_MAX_WORKERS = int(os.environ.get("INGEST_MAX_WORKERS", 4))
+INGEST_USAGE_SLOWDOWN_PCT = float(os.environ.get("INGEST_USAGE_SLOWDOWN_PCT", 75))
+INGEST_USAGE_STOP_PCT = float(os.environ.get("INGEST_USAGE_STOP_PCT", 95))
+# La ejecución del timer es cada 5 minutos: es la frecuencia máxima por página
+PAGE_MIN_INTERVAL_S = float(os.environ.get("PAGE_MIN_INTERVAL_S", 300))
+PAGE_MAX_INTERVAL_S = float(os.environ.get("PAGE_MAX_INTERVAL_S", 3600))
+# Holgura para que el desfase del timer no salte una página que vence justo ahora
+_DUE_SLACK_S = 30
+
+USAGE_HEADERS = ("X-App-Usage", "X-Business-Use-Case-Usage")
+
+
+def page_ids_from_env() -> list:
+    """META_PAGE_IDS (separadas por coma) o, si no está, META_PAGE_ID."""
+    raw = os.environ.get("META_PAGE_IDS") or os.environ.get("META_PAGE_ID") or ""
+    return list(dict.fromkeys(p.strip() for p in raw.split(",") if p.strip()))
+
+
+def parse_usage(headers) -> tuple:
+    """
+    (porcentaje de uso más alto, minutos hasta recuperar acceso) según las
+    cabeceras de una respuesta de Graph; (None, 0) si no trae ninguna.
+    """
+    usage, regain_minutes = None, 0
+    for header in USAGE_HEADERS:
+        raw = headers.get(header)
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        # X-App-Usage es un objeto; X-Business-Use-Case-Usage, {business_id: [objeto por tipo]}
+        entries = [data] if header == "X-App-Usage" else [e for v in data.values() for e in v]
+        for entry in entries:
+            for key in ("call_count", "total_cputime", "total_time"):
+                if isinstance(entry.get(key), (int, float)):
+                    usage = max(usage or 0, float(entry[key]))
+            regain_minutes = max(regain_minutes, entry.get("estimated_time_to_regain_access") or 0)
+    return usage, regain_minutes
+
+
+class GraphUsage:
+    """Último uso de cuota reportado por Graph, compartido entre los hilos de la ejecución."""
+
+    def __init__(self, slowdown_pct: float = INGEST_USAGE_SLOWDOWN_PCT, stop_pct: float = INGEST_USAGE_STOP_PCT):
+        self.slowdown_pct = slowdown_pct
+        self.stop_pct = stop_pct
+        self.usage = 0.0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, response, *args, **kwargs):
+        """Hook de requests (session.hooks['response']): actualiza el uso con cada respuesta."""
+        usage, regain_minutes = parse_usage(response.headers)
+        if usage is None and not regain_minutes:
+            return response
+        with self._lock:
+            if usage is not None:
+                # Las respuestas llegan desordenadas entre hilos: nos quedamos con el valor más reciente
+                self.usage = usage
+            if regain_minutes:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + regain_minutes * 60)
+        if usage is not None and usage >= self.slowdown_pct:
+            logging.warning(f"🚦 Uso de Graph API al {usage:.0f}%")
+        return response
+
+    def allowed_workers(self, max_workers: int) -> int:
+        """Páginas que pueden estar en vuelo ahora mismo (0 = no pedir más)."""
+        with self._lock:
+            usage, blocked = self.usage, time.monotonic() < self.blocked_until
+        if blocked or usage >= self.stop_pct:
+            return 0
+        if usage >= self.slowdown_pct:
+            return 1
+        return max(1, min(max_workers, round(max_workers * (1 - usage / 100))))
+
+    def interval_factor(self) -> float:
+        """Cuánto se estiran los intervalos por página: 1 con uso bajo, hasta 4 al llegar al tope."""
+        with self._lock:
+            usage = self.usage
+        if usage <= self.slowdown_pct:
+            return 1.0
+        span = max(self.stop_pct - self.slowdown_pct, 1)
+        return 1.0 + 3.0 * min((usage - self.slowdown_pct) / span, 1.0)
+
+
+def is_due(state: dict, now: float = None) -> bool:
+    """True si a la página ya le toca (o nunca se leyó)."""
+    now = time.time() if now is None else now
+    return now + _DUE_SLACK_S >= state.get("next_run", 0)
+
+
+def schedule_next(state: dict, new_posts: int, usage: GraphUsage = None, now: float = None) -> None:
+    """Fija interval_s y next_run en el estado de la página según si trajo novedades."""
+    now = time.time() if now is None else now
+    if new_posts:
+        interval = PAGE_MIN_INTERVAL_S
+    else:
+        interval = min(max(state.get("interval_s", PAGE_MIN_INTERVAL_S) * 2, PAGE_MIN_INTERVAL_S),
+                       PAGE_MAX_INTERVAL_S)
+    state["interval_s"] = interval
+    state["next_run"] = int(now + interval * (usage.interval_factor() if usage else 1.0))
+
+
+def due_pages(states: dict, now: float = None) -> list:
+    """Páginas que toca leer, de la más atrasada a la menos."""
+    now = time.time() if now is None else now
+    return sorted((p for p, s in states.items() if is_due(s, now)), key=lambda p: states[p].get("next_run", 0))
+
+
+def run_pages(page_ids, work, usage: GraphUsage, max_workers: int = INGEST_MAX_WORKERS,
+              deadline: float = None) -> tuple:
+    """
+    Ejecuta work(page_id) para cada página en un pool de hasta max_workers
+    hilos, sin superar la concurrencia que permite usage en cada momento.
+    Devuelve ({page_id: resultado}, [páginas que no se alcanzaron a correr]).
+    Una página cuyo work lanza una excepción se registra y no aparece en ninguna.
+    """
+    queue, results, futures = list(page_ids), {}, {}
+    if not queue:
+        return results, []
+    work = in_current_context(work)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queue)))) as pool:
+        while queue or futures:
+            allowed = usage.allowed_workers(max_workers)
+            out_of_time = deadline is not None and time.monotonic() >= deadline
+            while queue and not out_of_time and len(futures) < allowed:
+                page_id = queue.pop(0)
+                futures[pool.submit(work, page_id)] = page_id
+            if not futures:
+                break
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_id = futures.pop(future)
+                try:
+                    results[page_id] = future.result()
+                except Exception as ex:
+                    logging.error(f"⚠️ Falló la ingesta de la página {page_id}: {ex}")
+    if queue:
+        logging.warning(f"🚦 {len(queue)} páginas quedan para la próxima ejecución (cuota o tiempo).")
+    return results, queue
@@ -0,0 +1,157 @@
+# sentiment_cache.py
+"""
+Caché de resultados de sentimiento direccionada por contenido.
+
+La clave es el SHA-256 del texto normalizado (NFC, espacios colapsados), así
+que un post que se vuelve a leer en la siguiente ejecución no vuelve a
+Azure. Se persiste en un archivo SQLite (SENTIMENT_CACHE_PATH) con
+vencimiento por TTL y un máximo de entradas (se desalojan las menos usadas
+recientemente).
+
+La caché es por instancia: el archivo debe estar en disco local (por
+defecto el directorio temporal), no en /home de Azure Functions/App
+Service, que es un recurso compartido SMB donde SQLite no garantiza el
+bloqueo entre instancias. Una instancia nueva o reiniciada empieza vacía.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+import unicodedata
+
+SENTIMENT_CACHE_PATH = os.environ.get("SENTIMENT_CACHE_PATH",
+                                      os.path.join(tempfile.gettempdir(), "sentiment_cache.sqlite3"))
+SENTIMENT_CACHE_TTL_DAYS = float(os.environ.get("SENTIMENT_CACHE_TTL_DAYS", 30))
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.environ.get("SENTIMENT_CACHE_MAX_ENTRIES", 200_000))
+# Cambiar el namespace invalida la caché (p. ej. al cambiar de modelo/versión de API)
+SENTIMENT_CACHE_NAMESPACE = os.environ.get("SENTIMENT_CACHE_NAMESPACE", "textanalytics-v3.0")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+def text_key(text: str, namespace: str = SENTIMENT_CACHE_NAMESPACE) -> str:
+    return hashlib.sha256(f"{namespace}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """Caché SQLite clave -> resultado (dict JSON, p. ej. {'sentiment': 'positive', ...})."""
+
+    def __init__(self, path: str = SENTIMENT_CACHE_PATH, ttl_days: float = SENTIMENT_CACHE_TTL_DAYS,
+                 max_entries: int = SENTIMENT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_s = ttl_days * 86400
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.environ.get("WEBSITE_INSTANCE_ID") and os.path.abspath(path).startswith("/home/"):
+            logging.warning(f"⚠️ La caché de sentimiento ({path}) está en /home, un recurso de red compartido; "
+                            "conviene un disco local (p. ej. el directorio temporal).")
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # Diario por defecto (rollback): WAL no es seguro fuera de un disco local
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment ("
+            " key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sentiment_last_used ON sentiment(last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys) -> dict:
+        """Resultados vigentes para las claves dadas (las ausentes o vencidas no aparecen)."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, result FROM sentiment WHERE created >= ? AND key IN ({','.join('?' * len(chunk))})",
+                    [now - self.ttl_s, *chunk],
+                ).fetchall()
+                found.update((k, json.loads(r)) for k, r in rows)
+            if found:
+                self._conn.executemany("UPDATE sentiment SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, results: dict) -> None:
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sentiment (key, result, created, last_used) VALUES (?, ?, ?, ?)",
+                [(k, json.dumps(v), now, now) for k, v in results.items()],
+            )
+            self.stats["stored"] += len(results)
+            self._prune(now)
+            self._conn.commit()
+
+    def _prune(self, now: float) -> None:
+        evicted = self._conn.execute("DELETE FROM sentiment WHERE created < ?", (now - self.ttl_s,)).rowcount
+        total = self._conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+        if total > self.max_entries:
+            evicted += self._conn.execute(
+                "DELETE FROM sentiment WHERE key IN (SELECT key FROM sentiment ORDER BY last_used LIMIT ?)",
+                (total - self.max_entries,),
+            ).rowcount
+        self.stats["evicted"] += evicted
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def log_stats(self) -> None:
+        logging.info(
+            f"🗃️ Caché de sentimiento: {self.stats['hits']} aciertos, {self.stats['misses']} fallos "
+            f"({self.hit_rate():.0%}), {self.stats['stored']} guardados, {self.stats['evicted']} desalojados"
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_sentiment_cache() -> SentimentCache:
+    """Instancia compartida por proceso (se reutiliza entre invocaciones en caliente)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SentimentCache()
+        return _cache
+
+
+def analyze_with_cache(documents, analyze, cache: SentimentCache = None) -> dict:
+    """
+    documents: [{'id', 'text'}]; analyze: función que recibe documentos y
+    devuelve {id: resultado}. Sólo los textos que no están en caché (uno por
+    texto distinto) se envían a analyze. Devuelve {id: resultado} para todos
+    los documentos con resultado.
+    """
+    cache = cache or get_sentiment_cache()
+    keys = {str(doc["id"]): text_key(doc["text"]) for doc in documents}
+    cached = cache.get_many(keys.values())
+
+    pending = {}
+    for doc in documents:
+        key = keys[str(doc["id"])]
+        if key not in cached and key not in pending:
+            pending[key] = {"id": key, "text": doc["text"]}
+
+    fresh = analyze(list(pending.values())) if pending else {}
+    new_results = {key: {k: v for k, v in result.items() if k != "id"} for key, result in fresh.items()}
+    cache.put_many(new_results)
+
+    cached.update(new_results)
+    return {doc_id: cached[key] for doc_id, key in keys.items() if key in cached}
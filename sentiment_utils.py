@@ -1,56 +1,367 @@
 # sentiment_utils.py
 import os
-import io
+import json
 import logging
+import threading
+from datetime import datetime, timezone
 import pandas as pd
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient
+from ingest_metrics import stage
+from local_blob_storage import LocalContainerClient
+from snapshot_cache import SNAPSHOT_MAX_DELTAS, load_snapshot, snapshot_cache
+from snapshot_deltas import apply_deltas, changed_rows, merge_with_previous
+from snapshot_format import (SNAPSHOT_EXTENSIONS, apply_schema, deserialize_snapshot, is_snapshot_name,
+                             serialize_snapshot, snapshot_extension)
 
-def read_latest_blob(container_name: str, return_last_modified: bool = False):
+# Puntero al último snapshot, mantenido por save_dataframe_to_blob
+LATEST_POINTER_BLOB = "_estado/latest.json"
+# Deltas de cada base: _deltas/<base sin extensión>/<timestamp>.<ext>
+DELTAS_PREFIX = "_deltas/"
+# Cada cuántos deltas se vuelve a escribir un snapshot completo: SNAPSHOT_MAX_DELTAS
+# (definido en snapshot_cache, que dimensiona la caché en disco con él)
+# Si se define, los contenedores son carpetas locales (pruebas/benchmarks sin Azure)
+LOCAL_BLOB_ROOT = os.getenv("LOCAL_BLOB_ROOT")
+
+def get_connection_string():
+    """Cadena de conexión de Blob Storage desde las variables de entorno (o None)."""
+    return (
+        os.getenv("AzureWebJobsStorage")
+        or os.getenv("AZUREWEBJOBSSTORAGE")
+        or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    )
+
+# -----------------------------
+# Clientes compartidos por proceso
+# -----------------------------
+# Un host de Functions en caliente o el dashboard reutilizan el mismo
+# BlobServiceClient (y su pool de conexiones) entre invocaciones, y sólo se
+# comprueba/crea cada contenedor una vez.
+_service_clients = {}      # cadena de conexión -> BlobServiceClient
+_container_clients = {}    # (cadena de conexión o raíz local, contenedor) -> ContainerClient
+_known_containers = set()  # claves de _container_clients que ya sabemos que existen
+_clients_lock = threading.Lock()
+
+def get_blob_service_client(connect_str: str = None):
+    """BlobServiceClient compartido para la cadena de conexión (o None si no hay)."""
+    connect_str = connect_str or get_connection_string()
+    if not connect_str:
+        return None
+    with _clients_lock:
+        client = _service_clients.get(connect_str)
+        if client is None:
+            client = _service_clients[connect_str] = BlobServiceClient.from_connection_string(connect_str)
+        return client
+
+def get_container_client(container_name: str, create: bool = False):
     """
-    Lee el archivo más reciente de un contenedor de Azure Blob Storage y devuelve un DataFrame.
-    Si return_last_modified=True, también devuelve la fecha de última modificación del blob.
+    ContainerClient compartido (LocalContainerClient si LOCAL_BLOB_ROOT está
+    definido), o None si no hay configuración. Con create=True se asegura que
+    el contenedor exista, sólo la primera vez por proceso.
+    """
+    if LOCAL_BLOB_ROOT:
+        key = (LOCAL_BLOB_ROOT, container_name)
+    else:
+        connect_str = get_connection_string()
+        if not connect_str:
+            return None
+        key = (connect_str, container_name)
+
+    with _clients_lock:
+        client = _container_clients.get(key)
+    if client is None:
+        if LOCAL_BLOB_ROOT:
+            client = LocalContainerClient(LOCAL_BLOB_ROOT, container_name)
+        else:
+            client = get_blob_service_client(key[0]).get_container_client(container_name)
+        with _clients_lock:
+            client = _container_clients.setdefault(key, client)
+
+    if create and key not in _known_containers:
+        try:
+            client.create_container()
+        except ResourceExistsError:
+            pass
+        _known_containers.add(key)
+    return client
+
+def _forget_container(container_name: str) -> None:
+    """Olvida que el contenedor existe (p. ej. lo borraron desde fuera)."""
+    for key in list(_known_containers):
+        if key[1] == container_name:
+            _known_containers.discard(key)
+
+def upload_blob(container_name: str, blob_name: str, data) -> None:
+    """Sube (sobrescribe) un blob creando el contenedor si hace falta."""
+    container_client = get_container_client(container_name, create=True)
+    if container_client is None:
+        raise RuntimeError("No se encontró ninguna cadena de conexión para Blob Storage.")
+    with stage("blob_upload") as s:
+        s.items, s.bytes = 1, len(data)
+        try:
+            container_client.get_blob_client(blob_name).upload_blob(data, overwrite=True)
+        except ResourceNotFoundError:
+            _forget_container(container_name)
+            get_container_client(container_name, create=True).get_blob_client(blob_name).upload_blob(data, overwrite=True)
+
+def _upload_base(df_to_save, container_name: str) -> dict:
+    """Sube df_to_save como snapshot completo y devuelve el puntero que lo referencia."""
+    now = datetime.now(timezone.utc)
+    file_name = f"sentimiento_{now.strftime('%Y-%m-%d_%H-%M-%S')}{snapshot_extension()}"
+    with stage("serialize") as s:
+        data = serialize_snapshot(df_to_save)
+        s.items, s.bytes = len(df_to_save), len(data)
+
+    upload_blob(container_name, file_name, data)
+    logging.info(f"✅ DataFrame guardado en {container_name}/{file_name}")
+    return {"blob": file_name, "deltas": [], "rows": len(df_to_save), "written_at": now.isoformat()}
+
+def save_dataframe_to_blob(df_to_save, container_name: str):
+    """
+    Guarda un DataFrame en Azure Blob Storage (Parquet o CSV con gzip según
+    SNAPSHOT_FORMAT, con el esquema de snapshot_format) y actualiza el
+    puntero al último snapshot (LATEST_POINTER_BLOB).
     """
     try:
-        # Buscar la cadena de conexión en variables de entorno
-        connect_str = (
-            os.getenv("AzureWebJobsStorage")
-            or os.getenv("AZUREWEBJOBSSTORAGE")
-            or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        )
+        if not LOCAL_BLOB_ROOT and not get_connection_string():
+            logging.error("La variable AzureWebJobsStorage no está configurada.")
+            return False
+
+        # El puntero se escribe después del snapshot: quien lo lea siempre encuentra el blob
+        pointer = _upload_base(df_to_save, container_name)
+        upload_blob(container_name, LATEST_POINTER_BLOB, json.dumps(pointer))
+        return True
+
+    except Exception as e:
+        logging.error(f"⚠️ Error al guardar datos en Blob Storage: {e}")
+        return False
+
+
+def save_changes_to_blob(df_new: pd.DataFrame, df_current: pd.DataFrame, container_name: str) -> bool:
+    """
+    Guarda sólo las filas de df_new que son nuevas o cambiaron respecto de
+    df_current (el estado que devolvió read_latest_blob) como un delta de la
+    base actual. Cada SNAPSHOT_MAX_DELTAS deltas, o si no hay base, se escribe
+    en su lugar un snapshot completo. Devuelve True si no había nada que
+    guardar o si se guardó.
+
+    El puntero se reescribe sólo si nadie lo cambió desde que se leyó (ETag):
+    si otra ejecución ganó la carrera se devuelve False y estas filas se
+    vuelven a leer en la próxima ejecución.
+    """
+    with stage("diff") as s:
+        delta = changed_rows(df_new, df_current)
+        s.items = len(delta)
+    if delta.empty:
+        logging.info("Sin cambios respecto del último snapshot; no se escribe nada.")
+        return True
+
+    try:
+        container_client = get_container_client(container_name, create=True)
+        if container_client is None:
+            logging.error("La variable AzureWebJobsStorage no está configurada.")
+            return False
+        pointer, etag = read_pointer(container_client, with_etag=True)
+        if not pointer.get("blob"):
+            write_pointer(container_client, _upload_base(merge_with_previous(delta, df_current), container_name), etag)
+            return True
+        if len(pointer["deltas"]) >= SNAPSHOT_MAX_DELTAS:
+            if df_current.empty:
+                # Con puntero y sin estado previo, una base nueva perdería todo el histórico
+                logging.warning("⚠️ Estado previo vacío con un snapshot existente; se escribe un delta en vez de una base.")
+            else:
+                write_pointer(container_client, _upload_base(merge_with_previous(delta, df_current), container_name),
+                              etag)
+                return True
+
+        now = datetime.now(timezone.utc)
+        name = f"{DELTAS_PREFIX}{_base_stem(pointer['blob'])}/{now.strftime('%Y-%m-%d_%H-%M-%S-%f')}{snapshot_extension()}"
+        with stage("serialize") as s:
+            data = serialize_snapshot(delta)
+            s.items, s.bytes = len(delta), len(data)
+        upload_blob(container_name, name, data)
+        logging.info(f"✅ Delta con {len(delta)} filas guardado en {container_name}/{name}")
+
+        pointer["deltas"].append(name)
+        pointer["written_at"] = now.isoformat()
+        write_pointer(container_client, pointer, etag)
+        return True
+
+    except (ResourceModifiedError, ResourceExistsError):
+        logging.warning("⚠️ Otra ejecución actualizó el puntero al mismo tiempo; estos cambios se guardarán en la próxima.")
+        return False
+    except Exception as e:
+        logging.error(f"⚠️ Error al guardar el delta en Blob Storage: {e}")
+        return False
 
-        if not connect_str:
-            logging.error("❌ No se encontró ninguna cadena de conexión en las variables de entorno.")
-            return (pd.DataFrame(), None) if return_last_modified else pd.DataFrame()
 
-        logging.info("✅ Usando cadena de conexión para Blob Storage.")
+def read_pointer(container_client, with_etag: bool = False):
+    """
+    Contenido del puntero ({'blob', 'deltas', ...}), o {} si no hay puntero.
+    Con with_etag=True devuelve (puntero, ETag), con ETag None si no existe.
+    """
+    try:
+        downloader = container_client.get_blob_client(LATEST_POINTER_BLOB).download_blob()
+    except ResourceNotFoundError:
+        return ({}, None) if with_etag else {}
+    pointer = json.loads(downloader.readall())
+    pointer.setdefault("deltas", [])
+    return (pointer, downloader.properties.etag) if with_etag else pointer
+
+
+def write_pointer(container_client, pointer: dict, etag: str = None) -> None:
+    """
+    Escribe el puntero sólo si sigue con el ETag leído (o, con etag=None, si
+    todavía no existe). Si no, ResourceModifiedError / ResourceExistsError.
+    """
+    blob_client = container_client.get_blob_client(LATEST_POINTER_BLOB)
+    if etag is None:
+        blob_client.upload_blob(json.dumps(pointer), overwrite=False)
+    else:
+        blob_client.upload_blob(json.dumps(pointer), overwrite=True, etag=etag,
+                                match_condition=MatchConditions.IfNotModified)
+
+
+def _base_stem(base_name: str) -> str:
+    for ext in SNAPSHOT_EXTENSIONS:
+        if base_name.endswith(ext):
+            return base_name[:-len(ext)]
+    return base_name
+
+
+def find_latest_snapshot(container_client):
+    """
+    (base, deltas) recorriendo todo el contenedor (camino lento, sólo sin
+    puntero). La base es el snapshot completo más reciente y los deltas los
+    que cuelgan de ella, en orden de escritura.
+    """
+    bases, deltas = [], []
+    for b in container_client.list_blobs():
+        if not is_snapshot_name(b.name):
+            continue
+        if b.name.startswith(DELTAS_PREFIX):
+            deltas.append(b.name)
+        elif not b.name.startswith("_"):  # _estado/ y demás metadatos
+            bases.append(b)
+    if not bases:
+        return None, []
+    base = max(bases, key=lambda b: b.last_modified).name
+    prefix = f"{DELTAS_PREFIX}{_base_stem(base)}/"
+    return base, sorted(d for d in deltas if d.startswith(prefix))
+
+
+def _read_with_deltas(container_client, container_name: str, base: str, deltas):
+    """
+    (DataFrame, last_modified) de la base con sus deltas aplicados.
+
+    Si el último estado reconstruido es de la misma base (mismo ETag) y sus
+    deltas son un prefijo de los actuales, sólo se leen y aplican los nuevos.
+    """
+    def load(name, immutable=False):
+        return load_snapshot(container_client, container_name, name,
+                             lambda data: deserialize_snapshot(data, name), cache=snapshot_cache,
+                             immutable=immutable)
+
+    base_df, last_modified, etag = load(base)
+    deltas = tuple(deltas)
+    known = snapshot_cache.state(container_name, (base, etag))
+    if known is not None and deltas[:len(known[0])] == known[0]:
+        done, df, known_modified = known
+        snapshot_cache.stats["state_hits"] += 1
+        last_modified = max(filter(None, (last_modified, known_modified)), default=None)
+    else:
+        done, df = (), base_df
+
+    delta_frames = []
+    for name in deltas[len(done):]:
+        delta_df, delta_modified, _ = load(name, immutable=True)
+        delta_frames.append(delta_df)
+        if delta_modified and (last_modified is None or delta_modified > last_modified):
+            last_modified = delta_modified
+    if delta_frames:
+        df = apply_schema(apply_deltas(df, delta_frames))
+    snapshot_cache.remember_state(container_name, (base, etag), deltas, df, last_modified)
+    return df.copy(), last_modified
+
+
+def read_latest_blob(container_name: str, return_last_modified: bool = False, container_client=None,
+                     raise_errors: bool = False):
+    """
+    Lee el archivo más reciente de un contenedor de Azure Blob Storage y devuelve un DataFrame.
+    Si return_last_modified=True, también devuelve la fecha de última modificación del blob.
+
+    El snapshot se localiza con el puntero LATEST_POINTER_BLOB que mantiene
+    save_dataframe_to_blob; sólo si falta (o apunta a un blob borrado) se
+    lista el contenedor completo. Si la base tiene deltas (save_changes_to_blob)
+    se aplican en orden. Las descargas pasan por la caché de snapshots
+    (snapshot_cache): un blob que no cambió desde la última lectura sólo
+    cuesta una petición condicional.
 
-        # Cliente de Blob Storage
-        blob_service_client = BlobServiceClient.from_connection_string(connect_str)
-        container_client = blob_service_client.get_container_client(container_name)
+    container_client permite inyectar otro cliente (p. ej. LocalContainerClient).
 
-        # Listar blobs
-        blobs = list(container_client.list_blobs())
-        if not blobs:
-            logging.info(f"No se encontraron blobs en {container_name}.")
+    Por defecto cualquier error se registra y devuelve un DataFrame vacío (lo
+    que necesita el dashboard). Con raise_errors=True (ingesta) sólo un
+    contenedor inexistente o sin snapshots devuelve vacío; un error de
+    lectura se propaga, para no confundirlo con "no hay estado previo".
+    """
+    try:
+        # Cliente de Blob Storage (compartido entre llamadas)
+        container_client = container_client or get_container_client(container_name)
+        if container_client is None:
+            if raise_errors:
+                raise RuntimeError("No se encontró ninguna cadena de conexión para Blob Storage.")
+            logging.error("❌ No se encontró ninguna cadena de conexión en las variables de entorno.")
             return (pd.DataFrame(), None) if return_last_modified else pd.DataFrame()
 
-        # Blob más reciente (por fecha de última modificación)
-        latest_blob = max(blobs, key=lambda b: b.last_modified)
-        blob_client = container_client.get_blob_client(latest_blob.name)
-        stream = blob_client.download_blob().readall()
+        snapshot = None
+        pointer = read_pointer(container_client)
+        latest_name, deltas = pointer.get("blob"), pointer.get("deltas", [])
+        if latest_name:
+            try:
+                snapshot = _read_with_deltas(container_client, container_name, latest_name, deltas)
+            except ResourceNotFoundError:
+                logging.warning(f"⚠️ El puntero apunta a {latest_name}, que ya no existe; se listará el contenedor.")
+        if snapshot is None:
+            latest_name, deltas = find_latest_snapshot(container_client)
+            if latest_name is None:
+                logging.info(f"No se encontraron blobs en {container_name}.")
+                return (pd.DataFrame(), None) if return_last_modified else pd.DataFrame()
+            snapshot = _read_with_deltas(container_client, container_name, latest_name, deltas)
 
-        # Leer CSV
-        df = pd.read_csv(io.BytesIO(stream))
-        logging.info(f"📂 Archivo cargado: {latest_blob.name}")
+        df, last_modified = snapshot
+        logging.info(f"📂 Archivo cargado: {latest_name} (+{len(deltas)} deltas)")
         logging.info(f"📊 Columnas detectadas: {df.columns.tolist()}")
-        print("📂 Columnas en el CSV:", df.columns.tolist())
+        print("📂 Columnas en el snapshot:", df.columns.tolist())
 
         # Devolver resultados
         if return_last_modified:
-            return df, latest_blob.last_modified
+            return df, last_modified
         else:
             return df
 
     except Exception as e:
+        if raise_errors:
+            if isinstance(e, ResourceNotFoundError) and container_client is not None and not container_client.exists():
+                logging.info(f"El contenedor {container_name} no existe todavía.")
+                return (pd.DataFrame(), None) if return_last_modified else pd.DataFrame()
+            raise
         logging.error(f"Error al leer datos desde Blob Storage: {e}")
         return (pd.DataFrame(), None) if return_last_modified else pd.DataFrame()
+
+
+def read_json_blob(container_name: str, blob_name: str) -> dict:
+    """Lee un blob JSON pequeño (p. ej. estado de ingesta). Devuelve {} si no existe."""
+    container_client = get_container_client(container_name)
+    if container_client is None:
+        logging.error("❌ No se encontró ninguna cadena de conexión en las variables de entorno.")
+        return {}
+    try:
+        return json.loads(container_client.get_blob_client(blob_name).download_blob().readall())
+    except ResourceNotFoundError:
+        return {}
+
+
+def write_json_blob(container_name: str, blob_name: str, data: dict) -> None:
+    """Escribe (sobrescribe) un blob JSON pequeño."""
+    upload_blob(container_name, blob_name, json.dumps(data))
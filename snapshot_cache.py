@@ -0,0 +1,196 @@
+# snapshot_cache.py
+"""
+Caché local de snapshots descargados de Blob Storage, por nombre de blob y ETag.
+
+Los bytes se guardan en disco (SNAPSHOT_CACHE_DIR, como mucho
+SNAPSHOT_CACHE_MAX_FILES snapshots; se desalojan los menos usados) y los
+DataFrames ya parseados en memoria. Con una entrada en caché la descarga se
+hace condicional (If-None-Match): si el blob no cambió el servicio responde
+304 sin cuerpo y no se descarga ni se vuelve a parsear nada.
+
+Los deltas nunca se reescriben (immutable=True): con la copia en disco no se
+hace ninguna petición. El disco alcanza por defecto para una base, sus
+SNAPSHOT_MAX_DELTAS deltas y algo de margen. Además se recuerda el último
+estado reconstruido de cada contenedor (state/remember_state), por base,
+ETag y lista de deltas, para aplicar sólo los deltas nuevos en cada lectura.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError
+
+SNAPSHOT_CACHE_DIR = os.environ.get("SNAPSHOT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "snapshot_cache"))
+SNAPSHOT_MAX_DELTAS = int(os.environ.get("SNAPSHOT_MAX_DELTAS", 48))
+SNAPSHOT_CACHE_MAX_FILES = int(os.environ.get("SNAPSHOT_CACHE_MAX_FILES", SNAPSHOT_MAX_DELTAS + 4))
+SNAPSHOT_CACHE_MAX_FRAMES = int(os.environ.get("SNAPSHOT_CACHE_MAX_FRAMES", 2))
+
+
+class SnapshotCache:
+    def __init__(self, directory: str = SNAPSHOT_CACHE_DIR, max_files: int = SNAPSHOT_CACHE_MAX_FILES,
+                 max_frames: int = SNAPSHOT_CACHE_MAX_FRAMES):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+        self.max_frames = max_frames
+        self.stats = {"not_modified": 0, "immutable_hits": 0, "downloads": 0, "frame_hits": 0,
+                      "state_hits": 0, "evicted": 0}
+        self._frames = OrderedDict()  # (container, blob, etag) -> DataFrame
+        self._states = {}  # container -> ((base, etag), deltas, DataFrame, last_modified)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, container_name: str, blob_name: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(f"{container_name}/{blob_name}".encode()).hexdigest())
+
+    def lookup(self, container_name: str, blob_name: str):
+        """(metadatos, bytes) del blob en disco, o None."""
+        path = self._path(container_name, blob_name)
+        try:
+            with open(path + ".json") as f:
+                meta = json.load(f)
+            with open(path + ".bin", "rb") as f:
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+        os.utime(path + ".bin")  # marca de uso para el desalojo
+        return meta, data
+
+    def store(self, container_name: str, blob_name: str, data: bytes, properties) -> None:
+        path = self._path(container_name, blob_name)
+        meta = {"blob": blob_name, "etag": properties.etag,
+                "last_modified": properties.last_modified.isoformat() if properties.last_modified else None}
+        # Primero los bytes y luego los metadatos: un .json siempre tiene su .bin completo
+        for suffix, content, mode in ((".bin", data, "wb"), (".json", json.dumps(meta), "w")):
+            tmp_path = f"{path}{suffix}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(content)
+            os.replace(tmp_path, path + suffix)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path[:-len(".bin")]))
+                except FileNotFoundError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_files)]:
+            for suffix in (".json", ".bin"):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+            self.stats["evicted"] += 1
+
+    def frame(self, key):
+        with self._lock:
+            df = self._frames.get(key)
+            if df is not None:
+                self._frames.move_to_end(key)
+                self.stats["frame_hits"] += 1
+            return df
+
+    def remember_frame(self, key, df) -> None:
+        if self.max_frames <= 0:
+            return
+        with self._lock:
+            self._frames[key] = df
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+
+    def state(self, container_name: str, base_key):
+        """(deltas, DataFrame, last_modified) del último estado reconstruido sobre base_key, o None."""
+        with self._lock:
+            entry = self._states.get(container_name)
+        if entry is None or entry[0] != base_key:
+            return None
+        return entry[1:]
+
+    def remember_state(self, container_name: str, base_key, deltas, df, last_modified) -> None:
+        with self._lock:
+            self._states[container_name] = (base_key, tuple(deltas), df, last_modified)
+
+
+snapshot_cache = SnapshotCache()
+
+
+def download_if_modified(blob_client, etag: str = None):
+    """
+    Descarga condicional: (bytes, propiedades) o None si el blob sigue con
+    ese ETag (304). Sin etag descarga siempre.
+    """
+    if etag is None:
+        downloader = blob_client.download_blob()
+    else:
+        try:
+            downloader = blob_client.download_blob(etag=etag, match_condition=MatchConditions.IfModified)
+        except HttpResponseError as e:
+            # El SDK no siempre traduce el 304 a ResourceNotModifiedError
+            if e.status_code != 304:
+                raise
+            return None
+    return downloader.readall(), downloader.properties
+
+
+def load_snapshot(container_client, container_name: str, blob_name: str, parse,
+                  cache: SnapshotCache = None, immutable: bool = False):
+    """
+    (DataFrame, last_modified, etag) del blob usando la caché, sin copiar: el
+    DataFrame puede ser el de la caché y no debe modificarse.
+
+    Con immutable=True (deltas) y el blob en disco no se hace ninguna
+    petición, y el DataFrame no ocupa lugar en la caché en memoria: se lee
+    una vez para reconstruir el estado. ResourceNotFoundError se propaga.
+    """
+    cache = cache or snapshot_cache
+    cached = cache.lookup(container_name, blob_name)
+    meta, data = cached if cached is not None else ({}, None)
+    if cached is not None and immutable:
+        cache.stats["immutable_hits"] += 1
+        return parse(data), _parse_timestamp(meta.get("last_modified")), meta.get("etag")
+
+    blob_client = container_client.get_blob_client(blob_name)
+    downloaded = download_if_modified(blob_client, meta.get("etag"))
+    if downloaded is None:
+        cache.stats["not_modified"] += 1
+        logging.info(f"📦 {blob_name} sin cambios (ETag {meta['etag']}); se usa la copia local.")
+        key = (container_name, blob_name, meta["etag"])
+        df = cache.frame(key)
+        if df is None:
+            df = parse(data)
+            cache.remember_frame(key, df)
+        return df, _parse_timestamp(meta.get("last_modified")), meta["etag"]
+
+    data, properties = downloaded
+    cache.stats["downloads"] += 1
+    cache.store(container_name, blob_name, data, properties)
+    df = parse(data)
+    if not immutable:
+        cache.remember_frame((container_name, blob_name, properties.etag), df)
+    return df, properties.last_modified, properties.etag
+
+
+def read_snapshot(container_client, container_name: str, blob_name: str, parse, cache: SnapshotCache = None):
+    """
+    Devuelve (DataFrame, last_modified) del blob usando la caché.
+
+    parse(bytes) -> DataFrame. El DataFrame devuelto es una copia, así que el
+    llamador puede modificarlo. ResourceNotFoundError se propaga.
+    """
+    df, last_modified, _ = load_snapshot(container_client, container_name, blob_name, parse, cache)
+    return df.copy(), last_modified
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
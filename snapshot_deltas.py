@@ -0,0 +1,107 @@
+# snapshot_deltas.py
+"""
+Snapshots incrementales: un snapshot base completo más deltas append-only.
+
+Cada ejecución del timer escribe sólo las filas nuevas o que cambiaron
+(p. ej. los likes de un post ya visto), con la fila completa. El estado
+actual se reconstruye aplicando los deltas sobre la base en orden; el
+resultado es el mismo DataFrame que habría dado escribir un snapshot
+completo en cada ejecución.
+"""
+
+import pandas as pd
+
+
+def merge_with_previous(df_new: pd.DataFrame, df_prev: pd.DataFrame) -> pd.DataFrame:
+    """Une los posts nuevos con el snapshot anterior; ante ids repetidos gana la versión nueva."""
+    return apply_deltas(df_prev, [df_new])
+
+
+def _with_id(df: pd.DataFrame) -> pd.DataFrame:
+    # Los snapshots anteriores a la ingesta incremental no tienen columna Id
+    return df if "Id" in df.columns else df.assign(Id=None)
+
+
+def content_key(df: pd.DataFrame) -> pd.Series:
+    """
+    Hash de (Fecha, Post) por fila: identifica un post sin Id (snapshots
+    legados). Sin esas columnas cada fila es distinta.
+    """
+    if "Fecha" not in df.columns or "Post" not in df.columns:
+        return pd.Series(range(len(df)), index=df.index, dtype="uint64")
+    fechas = df["Fecha"]
+    if not isinstance(fechas.dtype, pd.DatetimeTZDtype):
+        fechas = pd.to_datetime(fechas, utc=True, errors="coerce", format="ISO8601")
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({"f": fechas.astype(str), "p": df["Post"].astype(object).astype(str)}, index=df.index),
+        index=False)
+
+
+def apply_deltas(base: pd.DataFrame, deltas) -> pd.DataFrame:
+    """
+    Estado actual a partir de la base y los deltas (del más antiguo al más
+    reciente). Equivale a aplicar merge_with_previous delta por delta, pero
+    con una sola concatenación y un solo ordenamiento.
+
+    Las filas con Id se deduplican por Id; las que no tienen (snapshots
+    legados) por (Fecha, Post). En ambos casos gana la versión más reciente,
+    y una fila legada desaparece en cuanto el mismo (Fecha, Post) llega con Id.
+    """
+    frames = [_with_id(d) for d in reversed(list(deltas)) if not d.empty]
+    if not frames:
+        return base
+    if not base.empty:
+        frames.append(_with_id(base))
+    merged = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    with_id = merged["Id"].notna()
+    merged_with_id = merged[with_id].drop_duplicates("Id", keep="first")
+    without_id = merged[~with_id]
+    if not without_id.empty:
+        keys = content_key(without_id)
+        keep = ~keys.duplicated(keep="first") & ~keys.isin(content_key(merged_with_id))
+        without_id = without_id[keep]
+    merged = pd.concat([merged_with_id, without_id])
+    # Id desempata las fechas iguales: el orden no depende de qué filas vinieron en qué delta
+    return merged.sort_values(["Fecha", "Id"], ascending=False, kind="stable",
+                              na_position="last").reset_index(drop=True)
+
+
+def superseded_rows(df_new: pd.DataFrame, df_prev: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filas de df_prev que apply_deltas(df_prev, [df_new]) reemplaza: las de
+    mismo Id que una fila de df_new y las legadas (sin Id) cuyo (Fecha, Post)
+    llega ahora con Id.
+    """
+    if df_new.empty or df_prev.empty or "Id" not in df_new.columns:
+        return df_prev.iloc[0:0]
+    new = df_new[df_new["Id"].notna()]
+    if "Id" not in df_prev.columns:
+        return df_prev[content_key(df_prev).isin(content_key(new))]
+    replaced = df_prev["Id"].isin(new["Id"]).to_numpy()
+    legacy = df_prev["Id"].isna().to_numpy()
+    if legacy.any():
+        replaced[legacy] = content_key(df_prev[legacy]).isin(content_key(new)).to_numpy()
+    removed = df_prev[replaced]
+    return removed[~removed["Id"].duplicated() | removed["Id"].isna()]
+
+
+def changed_rows(df_new: pd.DataFrame, df_prev: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filas de df_new que no están en df_prev (por Id) o cuyo contenido cambió.
+    Las filas sin Id siempre se consideran nuevas.
+    """
+    if df_new.empty or df_prev.empty or "Id" not in df_prev.columns:
+        return df_new
+    prev = df_prev[df_prev["Id"].notna()].drop_duplicates("Id").set_index("Id")
+    matched = df_new["Id"].isin(prev.index).to_numpy()
+    if not matched.any():
+        return df_new
+
+    cols = [c for c in df_new.columns if c != "Id" and c in prev.columns]
+    old = prev.reindex(df_new.loc[matched, "Id"])[cols].reset_index(drop=True).astype(object)
+    cur = df_new.loc[matched, cols].reset_index(drop=True).astype(object)
+    same = ((old == cur) | (old.isna() & cur.isna())).all(axis=1).to_numpy()
+
+    keep = ~matched
+    keep[matched] = ~same
+    return df_new[keep]
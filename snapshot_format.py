@@ -0,0 +1,90 @@
+# snapshot_format.py
+"""
+Formato de los snapshots de posts (Fecha, Post, Likes, Sentimiento, Id).
+
+Se escriben en Parquet (pyarrow) o, como alternativa, en CSV comprimido con
+gzip; los CSV planos antiguos se siguen leyendo. Al leer cualquier formato se
+aplica el mismo esquema, así que el resto del código recibe siempre:
+
+- Fecha: datetime64[ns, UTC] (se parsea una vez aquí, no en cada callback)
+- Likes: int64
+- Sentimiento, Pagina: category
+- Post, Id: texto (sin cambios)
+"""
+
+import io
+import os
+import gzip
+import numpy as np
+import pandas as pd
+
+# Orden de preferencia al buscar snapshots; .csv.gz antes que .csv
+SNAPSHOT_EXTENSIONS = (".parquet", ".csv.gz", ".csv")
+SNAPSHOT_FORMAT = os.getenv("SNAPSHOT_FORMAT", "parquet").lower()
+
+_FORMAT_EXTENSIONS = {"parquet": ".parquet", "csv.gz": ".csv.gz", "csv": ".csv"}
+
+
+def is_snapshot_name(name: str) -> bool:
+    return name.endswith(SNAPSHOT_EXTENSIONS)
+
+
+def snapshot_extension(fmt: str = None) -> str:
+    fmt = (fmt or SNAPSHOT_FORMAT).lower()
+    if fmt not in _FORMAT_EXTENSIONS:
+        raise ValueError(f"Formato de snapshot desconocido: {fmt} (usa parquet, csv.gz o csv)")
+    return _FORMAT_EXTENSIONS[fmt]
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte las columnas conocidas a su tipo; las que falten se ignoran."""
+    df = df.copy()
+    if "Fecha" in df.columns and not isinstance(df["Fecha"].dtype, pd.DatetimeTZDtype):
+        if pd.api.types.is_datetime64_dtype(df["Fecha"]):
+            df["Fecha"] = df["Fecha"].dt.tz_localize("UTC")
+        else:
+            df["Fecha"] = pd.to_datetime(df["Fecha"], utc=True, errors="coerce", format="ISO8601")
+    if "Likes" in df.columns:
+        df["Likes"] = pd.to_numeric(df["Likes"], errors="coerce").fillna(0).astype("int64")
+    for col in ("Sentimiento", "Pagina"):
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _iso_utc(fechas: pd.Series) -> np.ndarray:
+    """Fechas UTC como '2025-09-29T06:13:58+0000' (mismo texto que Graph); vacío si falta."""
+    values = fechas.dt.tz_convert(None).to_numpy()
+    text = np.char.add(np.datetime_as_string(values, unit="s"), "+0000").astype(object)
+    text[np.isnat(values)] = ""
+    return text
+
+
+def serialize_snapshot(df: pd.DataFrame, fmt: str = None) -> bytes:
+    """Bytes del snapshot en el formato pedido (por defecto SNAPSHOT_FORMAT)."""
+    ext = snapshot_extension(fmt)
+    df = apply_schema(df)
+    if ext == ".parquet":
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False, compression="zstd")
+        return buffer.getvalue()
+    if "Fecha" in df.columns:
+        df["Fecha"] = _iso_utc(df["Fecha"])
+    data = df.to_csv(index=False).encode("utf-8")
+    return gzip.compress(data, compresslevel=6) if ext == ".csv.gz" else data
+
+
+def deserialize_snapshot(data: bytes, name: str) -> pd.DataFrame:
+    """DataFrame tipado a partir de los bytes; el formato sale de la extensión de name."""
+    if name.endswith(".parquet"):
+        df = pd.read_parquet(io.BytesIO(data))
+    else:
+        if name.endswith(".gz"):
+            data = gzip.decompress(data)
+        df = pd.read_csv(io.BytesIO(data), dtype={"Id": str, "Post": str, "Sentimiento": str, "Pagina": str})
+    return apply_schema(df)
+
+
+def read_snapshot_file(path: str) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        return deserialize_snapshot(f.read(), path)
@@ -0,0 +1,146 @@
+# table_pages.py
+"""
+Paginación, orden y filtrado en servidor para la tabla de posts
+(DataTable con page_action/sort_action/filter_action="custom").
+
+El navegador sólo recibe la página pedida. Las vistas ordenadas/filtradas
+se guardan como arrays de posiciones (LRU por filtro y orden) sobre el
+DataFrame cacheado, así que cambiar de página cuesta un iloc.
+"""
+
+import math
+import threading
+import collections
+import numpy as np
+import pandas as pd
+
+# Las fechas tipadas se muestran y filtran con el mismo texto que tenían en el CSV
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+_OPERATORS = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "],
+]
+
+_COMPARISONS = ("eq", "ne", "lt", "le", "gt", "ge")
+
+def split_filter_part(filter_part: str):
+    """
+    Separa '{col} op valor' en (columna, operador, valor); mismo formato que filter_query de Dash.
+    Sólo las comparaciones convierten un valor sin comillas a número: contains y
+    datestartswith buscan el texto tal como se escribió ('14', no '14.0').
+    """
+    for operator_type in _OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find("{") + 1: name_part.rfind("}")]
+                # El operador se devuelve en su forma textual (ge, le, ...)
+                op = operator_type[0].strip()
+
+                value_part = value_part.strip()
+                v0 = value_part[0] if value_part else ""
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', "`"):
+                    value = value_part[1:-1].replace("\\" + v0, v0)
+                elif op in _COMPARISONS:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+                else:
+                    value = value_part
+
+                return name, op, value
+    return None, None, None
+
+def _as_text(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.strftime(DATE_FORMAT)
+    return s.astype(str)
+
+def filter_mask(df: pd.DataFrame, filter_query: str) -> np.ndarray:
+    """Máscara booleana para un filter_query de Dash (condiciones unidas con &&)."""
+    mask = np.ones(len(df), dtype=bool)
+    if not filter_query:
+        return mask
+    for part in filter_query.split(" && "):
+        col, op, value = split_filter_part(part)
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if op in _COMPARISONS:
+            if isinstance(value, float) and not pd.api.types.is_numeric_dtype(s):
+                s = pd.to_numeric(s, errors="coerce")
+            elif not isinstance(value, float) and (pd.api.types.is_numeric_dtype(s)
+                                                   or pd.api.types.is_datetime64_any_dtype(s)):
+                s = _as_text(s)
+            cond = {"eq": s.eq, "ne": s.ne, "lt": s.lt, "le": s.le, "gt": s.gt, "ge": s.ge}[op](value)
+        elif op == "contains":
+            cond = _as_text(s).str.contains(str(value), case=False, regex=False, na=False)
+        elif op == "datestartswith":
+            cond = _as_text(s).str.startswith(str(value), na=False)
+        else:
+            continue
+        mask &= cond.fillna(False).to_numpy(dtype=bool)
+    return mask
+
+class TablePager:
+    """
+    Sirve páginas de un DataFrame con orden y filtro calculados en servidor.
+    Las posiciones de cada vista (filtro, orden) se cachean hasta que cambia el
+    DataFrame (se compara la identidad del objeto que devuelve load_latest_csv).
+    """
+
+    def __init__(self, max_views: int = 16):
+        self.max_views = max_views
+        self._lock = threading.Lock()
+        self._df = None
+        self._views = collections.OrderedDict()
+
+    def _view(self, df: pd.DataFrame, sort_by, filter_query) -> np.ndarray:
+        sort_key = tuple((s["column_id"], s["direction"]) for s in (sort_by or []) if s["column_id"] in df.columns)
+        key = (filter_query or "", sort_key)
+        with self._lock:
+            if df is not self._df:
+                self._df = df
+                self._views.clear()
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+
+        positions = np.flatnonzero(filter_mask(df, filter_query))
+        if sort_key:
+            sub = df.iloc[positions]
+            order = sub.reset_index(drop=True).sort_values(
+                [c for c, _ in sort_key], ascending=[d == "asc" for _, d in sort_key], kind="stable"
+            ).index.to_numpy()
+            positions = positions[order]
+
+        with self._lock:
+            if df is self._df:
+                self._views[key] = positions
+                while len(self._views) > self.max_views:
+                    self._views.popitem(last=False)
+        return positions
+
+    def page(self, df: pd.DataFrame, page_current: int, page_size: int, sort_by=None, filter_query: str = ""):
+        """Devuelve (registros de la página, page_count, total de filas de la vista)."""
+        if df.empty:
+            return [], 1, 0
+        page_size = max(int(page_size or 10), 1)
+        positions = self._view(df, sort_by, filter_query)
+        page_count = max(math.ceil(len(positions) / page_size), 1)
+        page_current = min(max(int(page_current or 0), 0), page_count - 1)
+        start = page_current * page_size
+        page_df = df.iloc[positions[start:start + page_size]]
+        dates = [c for c in page_df.columns if pd.api.types.is_datetime64_any_dtype(page_df[c])]
+        if dates:
+            page_df = page_df.assign(**{c: page_df[c].dt.strftime(DATE_FORMAT) for c in dates})
+        records = page_df.to_dict("records")
+        return records, page_count, len(positions)
@@ -0,0 +1,108 @@
+# test/test_azure_sentiment.py
+"""Cliente de sentimiento: lotes válidos para el servicio y peticiones en vuelo."""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azure_sentiment import (MAX_CHARS_PER_DOCUMENT, MAX_DOCUMENTS_PER_REQUEST, MAX_REQUEST_BYTES,
+                             SentimentClient, make_batches)
+
+
+class _Response:
+    def __init__(self, documents):
+        self._documents = documents
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"documents": self._documents, "errors": []}
+
+
+def _request_bytes(batch):
+    return len(json.dumps({"documents": batch}, ensure_ascii=False).encode("utf-8"))
+
+
+def test_batches_hold_at_most_ten_documents():
+    batches = make_batches([{"id": i, "text": f"post {i}"} for i in range(25)])
+
+    assert [len(b) for b in batches] == [MAX_DOCUMENTS_PER_REQUEST, MAX_DOCUMENTS_PER_REQUEST, 5]
+    assert [d["id"] for b in batches for d in b] == [str(i) for i in range(25)]
+
+
+def test_long_documents_are_truncated():
+    (batch,) = make_batches([{"id": 1, "text": "á" * (MAX_CHARS_PER_DOCUMENT + 100)}])
+
+    assert len(batch[0]["text"]) == MAX_CHARS_PER_DOCUMENT
+
+
+@pytest.mark.parametrize("max_bytes", [MAX_REQUEST_BYTES, 100_000])
+def test_batches_stay_under_the_request_size(max_bytes):
+    # 5.120 caracteres de 4 bytes en UTF-8: 20 KB por documento
+    documents = [{"id": i, "text": "😀" * MAX_CHARS_PER_DOCUMENT} for i in range(60)]
+    batches = make_batches(documents, max_bytes=max_bytes)
+
+    assert sum(len(b) for b in batches) == 60
+    assert all(_request_bytes(b) <= max_bytes for b in batches)
+    if max_bytes < MAX_REQUEST_BYTES:
+        assert max(len(b) for b in batches) < MAX_DOCUMENTS_PER_REQUEST
+
+
+def test_request_body_is_the_size_that_was_measured():
+    client = SentimentClient("http://localhost", "clave")
+    sent = []
+
+    def post(url, data=None, timeout=None):
+        sent.append(data)
+        return _Response([])
+
+    client.session.post = post
+    (batch,) = make_batches([{"id": 1, "text": "canción 😀"}])
+    client._post_batch(batch)
+
+    assert len(sent[0]) == _request_bytes(batch)
+
+
+def test_language_is_sent_only_when_known():
+    (batch,) = make_batches([{"id": 1, "text": "hola", "language": "es"}, {"id": 2, "text": "hi", "language": None}])
+
+    assert batch[0]["language"] == "es"
+    assert "language" not in batch[1]
+
+
+def test_in_flight_limit_is_shared_between_threads():
+    client = SentimentClient("http://localhost", "clave", max_in_flight=3)
+    lock, state = threading.Lock(), {"now": 0, "peak": 0}
+
+    def post(url, data=None, timeout=None):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.02)
+        with lock:
+            state["now"] -= 1
+        docs = json.loads(data)["documents"]
+        return _Response([{"id": d["id"], "sentiment": "neutral"} for d in docs])
+
+    client.session.post = post
+    results = {}
+
+    def page(p):
+        documents = [{"id": f"{p}_{i}", "text": f"post {i}"} for i in range(60)]
+        results.update(client.analyze(documents))
+
+    threads = [threading.Thread(target=page, args=(p,)) for p in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 4 * 60
+    assert state["peak"] == 3
@@ -0,0 +1,91 @@
+# test/test_compact_snapshots.py
+"""Compactación sobre snapshots legados (sin Id) y bases Parquet con Id."""
+
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact_snapshots import HOURLY_PREFIX, run_compaction
+from local_blob_storage import LocalContainerClient
+from snapshot_format import deserialize_snapshot, serialize_snapshot
+from sentiment_utils import LATEST_POINTER_BLOB
+
+NOW = datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+LEGACY = pd.DataFrame({
+    "Fecha": ["2025-10-01T07:50:00+0000", "2025-10-01T07:40:00+0000", "2025-10-01T07:30:00+0000"],
+    "Post": ["incendio en la carretera", "rescate de familias", "alerta por lluvias"],
+    "Likes": [1, 2, 3],
+    "Sentimiento": ["negative", "neutral", "positive"],
+})
+
+
+def _with_ids(df, likes_offset=0):
+    return df.assign(Id=[f"pagina_{i}" for i in range(len(df))], Likes=df["Likes"] + likes_offset)
+
+
+def _upload(container, name, df, fmt):
+    container.get_blob_client(name).upload_blob(serialize_snapshot(df, fmt), overwrite=True)
+
+
+def _read(container, name):
+    return deserialize_snapshot(container.get_blob_client(name).download_blob().readall(), name)
+
+
+def _partitions(container, prefix):
+    return sorted(b.name for b in container.list_blobs(name_starts_with=prefix))
+
+
+@pytest.fixture
+def container(tmp_path):
+    container = LocalContainerClient(str(tmp_path), "datos-facebook")
+    container.create_container()
+    # Tres volcados completos legados (CSV sin Id) de la misma hora
+    for minute in ("00", "05", "10"):
+        _upload(container, f"sentimiento_2025-10-01_08-{minute}-00.csv", LEGACY, "csv")
+    # Dos bases Parquet con Id una hora después
+    _upload(container, "sentimiento_2025-10-01_09-00-00.parquet", _with_ids(LEGACY), "parquet")
+    _upload(container, "sentimiento_2025-10-01_09-05-00.parquet", _with_ids(LEGACY, likes_offset=10), "parquet")
+    # Snapshot actual (protegido por el puntero)
+    _upload(container, "sentimiento_2025-10-01_11-55-00.parquet", _with_ids(LEGACY, likes_offset=20), "parquet")
+    container.get_blob_client(LATEST_POINTER_BLOB).upload_blob(
+        json.dumps({"blob": "sentimiento_2025-10-01_11-55-00.parquet", "deltas": []}), overwrite=True)
+    return container
+
+
+def test_compacts_legacy_snapshots_without_duplicates(container):
+    run_compaction(container, now=NOW)
+
+    hourly = _partitions(container, HOURLY_PREFIX)
+    assert [os.path.basename(n).split(".")[0] for n in hourly] == ["08", "09"]
+
+    legacy_hour = _read(container, hourly[0])
+    assert len(legacy_hour) == len(LEGACY)
+    assert sorted(legacy_hour["Post"]) == sorted(LEGACY["Post"])
+
+    id_hour = _read(container, hourly[1])
+    assert sorted(id_hour["Id"]) == ["pagina_0", "pagina_1", "pagina_2"]
+    assert sorted(id_hour["Likes"]) == [11, 12, 13]  # gana la base más reciente
+
+    remaining = {b.name for b in container.list_blobs()}
+    assert "sentimiento_2025-10-01_11-55-00.parquet" in remaining
+    assert not any(n.startswith("sentimiento_2025-10-01_08") for n in remaining)
+
+
+def test_rerun_after_crash_is_idempotent(container):
+    run_compaction(container, now=NOW)
+    # Una ejecución que murió tras escribir la partición pero antes de borrar los originales
+    for minute in ("00", "05", "10"):
+        _upload(container, f"sentimiento_2025-10-01_08-{minute}-00.csv", LEGACY, "csv")
+
+    run_compaction(container, now=NOW)
+
+    hourly = _partitions(container, HOURLY_PREFIX)
+    assert len(_read(container, hourly[0])) == len(LEGACY)
+    assert len(_read(container, hourly[1])) == len(LEGACY)
@@ -0,0 +1,60 @@
+# test/test_dashboard_folder.py
+"""Dashboard en modo carpeta (CSV_FOLDER) sobre una carpeta con base + deltas."""
+
+import json
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard_app
+from sentiment_utils import DELTAS_PREFIX, LATEST_POINTER_BLOB
+from snapshot_format import apply_schema, serialize_snapshot
+
+
+def _posts(ids, likes=0):
+    return apply_schema(pd.DataFrame({
+        "Id": [f"pagina_{i}" for i in ids],
+        "Pagina": "pagina",
+        "Fecha": [f"2025-10-01T08:{i:02d}:00+0000" for i in ids],
+        "Post": [f"post {i}" for i in ids],
+        "Likes": likes,
+        "Sentimiento": "neutral",
+    }))
+
+
+def _write(folder, name, data):
+    path = os.path.join(folder, *name.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _set_pointer(folder, base, deltas):
+    _write(folder, LATEST_POINTER_BLOB, json.dumps({"blob": base, "deltas": deltas}).encode())
+
+
+def test_folder_mode_applies_pointer_deltas(tmp_path):
+    folder = str(tmp_path / "datos")
+    base = "sentimiento_2025-10-01_08-00-00.parquet"
+    _write(folder, base, serialize_snapshot(_posts(range(5)), "parquet"))
+    delta = f"{DELTAS_PREFIX}sentimiento_2025-10-01_08-00-00/0001.parquet"
+    _write(folder, delta, serialize_snapshot(_posts([0, 5], likes=9), "parquet"))
+    _set_pointer(folder, base, [delta])
+
+    df, path = dashboard_app.load_latest_csv(folder)
+
+    assert os.path.basename(path) == base
+    assert len(df) == 6
+    assert df.set_index("Id").loc["pagina_0", "Likes"] == 9
+
+    # Un delta nuevo no cambia el mtime de la carpeta, pero sí se ve en la siguiente lectura
+    second = f"{DELTAS_PREFIX}sentimiento_2025-10-01_08-00-00/0002.parquet"
+    _write(folder, second, serialize_snapshot(_posts([6]), "parquet"))
+    _set_pointer(folder, base, [delta, second])
+
+    df, _ = dashboard_app.load_latest_csv(folder)
+
+    assert len(df) == 7
@@ -0,0 +1,66 @@
+# test/test_facebook_feed.py
+"""iter_new_posts: ventana de posts recientes que se releen para actualizar los likes."""
+
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from facebook_feed import iter_new_posts
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _Session:
+    """Un feed de una sola página que devuelve los posts con created_time >= since."""
+
+    def __init__(self, posts):
+        self.posts = posts
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(params)
+        since = (params or {}).get("since", 0)
+        return _Response({"data": [p for p in self.posts if p["ts"] >= since]})
+
+
+def _post(i, ts, likes):
+    created = datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+0000")
+    return {"id": f"pagina_{i}", "created_time": created, "ts": ts, "likes": {"summary": {"total_count": likes}}}
+
+
+def test_recent_posts_are_read_again():
+    now = int(time.time())
+    seen = _post(1, now - 3 * 3600, likes=40)  # ya procesado, con likes nuevos
+    old = _post(0, now - 48 * 3600, likes=1)   # fuera de la ventana
+    new = _post(2, now - 60, likes=0)
+    session = _Session([new, seen, old])
+    state = {"since": seen["ts"], "backfill_done": True}
+
+    posts = [p for page in iter_new_posts("pagina", "token", state, session=session, refresh_s=24 * 3600)
+             for p in page]
+
+    assert [p["id"] for p in posts] == ["pagina_2", "pagina_1"]
+    assert state["since"] == new["ts"]
+
+
+def test_without_refresh_only_new_posts():
+    now = int(time.time())
+    seen, new = _post(1, now - 3 * 3600, likes=40), _post(2, now - 60, likes=0)
+    session = _Session([new, seen])
+    state = {"since": seen["ts"], "backfill_done": True}
+
+    posts = [p for page in iter_new_posts("pagina", "token", state, session=session) for p in page]
+
+    assert [p["id"] for p in posts] == ["pagina_2"]
+    assert session.calls[0]["since"] == seen["ts"] + 1
@@ -0,0 +1,180 @@
+# test/test_forecasting.py
+"""Pronósticos: caché, motores y reintentos del entrenamiento en segundo plano."""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import forecasting
+from forecasting import ForecastCache, fit_holt_winters, forecast_key, request_forecast
+
+SERIES = pd.DataFrame({"ds": pd.date_range("2025-10-01", periods=48, freq="h"),
+                       "y": np.sin(np.arange(48) / 4)})
+
+
+def _frame(value, n=8):
+    return pd.DataFrame({"ds": pd.date_range("2025-10-01", periods=n, freq="h"), "yhat": float(value),
+                         "yhat_lower": value - 1.0, "yhat_upper": value + 1.0})
+
+
+def test_forecast_key_depends_on_series_and_parameters():
+    key = forecast_key(SERIES, 8, "1h", "holtwinters")
+
+    assert key == forecast_key(SERIES.copy(), 8, "1h", "holtwinters")
+    assert key != forecast_key(SERIES.assign(y=SERIES["y"] + 0.1), 8, "1h", "holtwinters")
+    assert key != forecast_key(SERIES, 12, "1h", "holtwinters")
+    assert key != forecast_key(SERIES, 8, "1h", "prophet")
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ForecastCache(max_entries=2, cache_dir=None)
+    cache.put("a", _frame(1))
+    cache.put("b", _frame(2))
+    assert cache.get("a") is not None  # "b" pasa a ser la menos usada
+    cache.put("c", _frame(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a")["yhat"].iloc[0] == 1.0
+    assert cache.get("c")["yhat"].iloc[0] == 3.0
+    assert cache.stats["evicted"] == 1
+
+
+def test_cache_evicts_by_memory():
+    one = _frame(1, n=1000)
+    size = int(one.memory_usage(deep=True).sum())
+    cache = ForecastCache(max_entries=10, max_bytes=int(size * 1.5), cache_dir=None)
+    cache.put("a", one)
+    cache.put("b", _frame(2, n=1000))
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_cache_round_trips_through_disk(tmp_path):
+    cache = ForecastCache(max_entries=2, cache_dir=str(tmp_path))
+    for i, key in enumerate("abc"):
+        cache.put(key, _frame(i))
+
+    # Otro proceso con la misma carpeta: sólo quedan las dos más recientes
+    fresh = ForecastCache(max_entries=2, cache_dir=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["b.parquet", "c.parquet"]
+    pd.testing.assert_frame_equal(fresh.get("c"), _frame(2), check_freq=False)
+    assert fresh.get("a") is None
+    assert fresh.stats["disk_hits"] == 1
+
+
+def _seasonal(days=7, noise=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    n = days * 24
+    y = 0.5 * np.sin(2 * np.pi * np.arange(n) / 24) + 0.001 * np.arange(n) + rng.normal(0, noise, n)
+    return pd.DataFrame({"ds": pd.date_range("2025-10-01", periods=n, freq="h"), "y": y})
+
+
+def test_holt_winters_follows_daily_season():
+    series = _seasonal()
+    forecast = fit_holt_winters(series, 24, "1H")
+
+    assert list(forecast.columns) == ["ds", "yhat", "yhat_lower", "yhat_upper"]
+    assert len(forecast) == len(series) + 24
+    future = forecast.iloc[len(series):]
+    expected = pd.date_range(series["ds"].iloc[-1] + pd.Timedelta(hours=1), periods=24, freq="h")
+    assert (future["ds"].to_numpy() == expected.to_numpy()).all()
+    assert ((future["yhat_lower"] <= future["yhat"]) & (future["yhat"] <= future["yhat_upper"])).all()
+    # El intervalo se ensancha con el horizonte
+    width = (future["yhat_upper"] - future["yhat_lower"]).to_numpy()
+    assert width[-1] >= width[0]
+    # Repite la forma del último día
+    truth = 0.5 * np.sin(2 * np.pi * np.arange(len(series), len(series) + 24) / 24) + 0.001 * np.arange(
+        len(series), len(series) + 24)
+    assert np.abs(future["yhat"].to_numpy() - truth).max() < 0.2
+
+
+def test_holt_winters_short_series_without_season():
+    series = _seasonal(days=2).iloc[:30]  # menos de dos días
+    forecast = fit_holt_winters(series, 8, "1H")
+
+    assert len(forecast) == 38
+    assert forecast[["yhat", "yhat_lower", "yhat_upper"]].notna().all().all()
+
+
+def _wait(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "el entrenamiento en segundo plano no terminó"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Motor en segundo plano (en hilos) que falla las primeras engine.failures veces."""
+    class Engine:
+        failures = 1
+        calls = 0
+
+        def fit(self, series, hours_ahead, resample_freq):
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise ValueError("fallo transitorio")
+            return pd.DataFrame({"ds": series["ds"], "yhat": series["y"],
+                                 "yhat_lower": series["y"] - 1, "yhat_upper": series["y"] + 1})
+
+    engine = Engine()
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(forecasting, "get_engine", lambda name=None: ("prueba", (engine.fit, True)))
+    monkeypatch.setattr(forecasting, "_get_executor", lambda: executor)
+    monkeypatch.setattr(forecasting, "forecast_cache", ForecastCache(max_entries=4))
+    monkeypatch.setattr(forecasting, "FORECAST_BACKGROUND", True)
+    for name in ("_pending", "_failures", "_last_good"):
+        monkeypatch.setattr(forecasting, name, {})
+    yield engine
+    executor.shutdown(wait=True)
+
+
+def _failed(attempts):
+    return lambda: not forecasting._pending and any(f[0] >= attempts for f in forecasting._failures.values())
+
+
+def test_transient_failure_recovers_after_backoff(engine, monkeypatch):
+    monkeypatch.setattr(forecasting, "FORECAST_RETRY_S", 60)
+    assert request_forecast(SERIES, 8, "1h") == (None, True)
+    _wait(_failed(1))
+
+    # Dentro de la espera no se vuelve a encolar
+    with pytest.raises(RuntimeError, match="fallo transitorio"):
+        request_forecast(SERIES, 8, "1h")
+    assert engine.calls == 1
+
+    monkeypatch.setattr(forecasting, "FORECAST_RETRY_S", 0)
+    forecast, pending = request_forecast(SERIES, 8, "1h")
+    assert pending
+    _wait(lambda: not forecasting._pending and not forecasting._failures)
+
+    forecast, pending = request_forecast(SERIES, 8, "1h")
+    assert not pending and len(forecast) == len(SERIES)
+    assert engine.calls == 2
+
+
+def test_attempts_are_capped_per_series(engine, monkeypatch):
+    engine.failures = 100
+    monkeypatch.setattr(forecasting, "FORECAST_RETRY_S", 0)
+    monkeypatch.setattr(forecasting, "FORECAST_MAX_ATTEMPTS", 2)
+
+    request_forecast(SERIES, 8, "1h")
+    _wait(_failed(1))
+    request_forecast(SERIES, 8, "1h")
+    _wait(_failed(2))
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            request_forecast(SERIES, 8, "1h")
+    assert engine.calls == 2
+
+    # Una serie nueva vuelve a intentarse
+    assert request_forecast(SERIES.assign(y=SERIES["y"] + 1), 8, "1h") == (None, True)
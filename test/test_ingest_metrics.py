@@ -0,0 +1,47 @@
+# test/test_ingest_metrics.py
+"""Ejecución en curso por contexto: invocaciones concurrentes e hilos del pool de páginas."""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest_metrics import current_run, ingest_run, stage
+from page_scheduler import GraphUsage, run_pages
+
+
+def test_concurrent_runs_do_not_share_metrics():
+    barrier = threading.Barrier(2)
+    seen = {}
+
+    def invocation(name):
+        with ingest_run(name) as metrics:
+            barrier.wait()  # las dos ejecuciones quedan abiertas a la vez
+            with stage(f"etapa_{name}") as s:
+                s.items = 1
+            barrier.wait()
+            seen[name] = (current_run() is metrics, set(metrics.stages))
+        assert current_run() is None
+
+    threads = [threading.Thread(target=invocation, args=(name,)) for name in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert seen == {"a": (True, {"etapa_a"}), "b": (True, {"etapa_b"})}
+
+
+def test_page_workers_record_into_the_callers_run():
+    def work(page_id):
+        with stage("graph_page") as s:
+            s.items = 1
+        return current_run()
+
+    with ingest_run("prueba") as metrics:
+        results, _ = run_pages(["a", "b", "c"], work, GraphUsage(), max_workers=3)
+
+    assert set(results.values()) == {metrics}
+    assert metrics.stages["graph_page"]["calls"] == 3
+    assert current_run() is None
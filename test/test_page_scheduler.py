@@ -0,0 +1,120 @@
+# test/test_page_scheduler.py
+"""Cuota de Graph API: lectura de cabeceras de uso, frecuencia por página y pool de páginas."""
+
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_scheduler import (PAGE_MAX_INTERVAL_S, PAGE_MIN_INTERVAL_S, GraphUsage, due_pages, parse_usage,
+                            run_pages, schedule_next)
+
+NOW = 1_750_000_000.0
+
+
+def _usage(pct):
+    usage = GraphUsage(slowdown_pct=75, stop_pct=95)
+    usage.observe(SimpleNamespace(headers={"X-App-Usage": json.dumps({"call_count": pct})}))
+    return usage
+
+
+def test_parse_app_usage():
+    headers = {"X-App-Usage": json.dumps({"call_count": 12, "total_cputime": 40, "total_time": 7})}
+
+    assert parse_usage(headers) == (40.0, 0)
+
+
+def test_parse_business_use_case_usage():
+    headers = {"X-Business-Use-Case-Usage": json.dumps({
+        "123": [{"type": "pages", "call_count": 20, "total_cputime": 5, "total_time": 88,
+                 "estimated_time_to_regain_access": 0}],
+        "456": [{"type": "pages", "call_count": 3, "estimated_time_to_regain_access": 15}],
+    })}
+
+    assert parse_usage(headers) == (88.0, 15)
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-App-Usage": "no es json"}, {"X-App-Usage": "{}"}])
+def test_parse_usage_without_data(headers):
+    assert parse_usage(headers) == (None, 0)
+
+
+def test_allowed_workers_by_usage():
+    assert _usage(0).allowed_workers(4) == 4
+    assert _usage(50).allowed_workers(4) == 2
+    assert _usage(80).allowed_workers(4) == 1
+    assert _usage(96).allowed_workers(4) == 0
+
+    blocked = GraphUsage()
+    blocked.observe(SimpleNamespace(headers={"X-Business-Use-Case-Usage": json.dumps(
+        {"1": [{"call_count": 10, "estimated_time_to_regain_access": 5}]})}))
+    assert blocked.allowed_workers(4) == 0
+
+
+def test_schedule_next_backs_off_without_news():
+    state = {}
+    schedule_next(state, new_posts=3, now=NOW)
+    assert state == {"interval_s": PAGE_MIN_INTERVAL_S, "next_run": int(NOW + PAGE_MIN_INTERVAL_S)}
+
+    intervals = []
+    for _ in range(10):
+        schedule_next(state, new_posts=0, now=NOW)
+        intervals.append(state["interval_s"])
+    assert intervals[:2] == [2 * PAGE_MIN_INTERVAL_S, 4 * PAGE_MIN_INTERVAL_S]
+    assert intervals[-1] == PAGE_MAX_INTERVAL_S
+
+    schedule_next(state, new_posts=1, now=NOW)
+    assert state["interval_s"] == PAGE_MIN_INTERVAL_S
+
+
+def test_schedule_next_stretches_above_the_usage_threshold():
+    low, mid, high = {}, {}, {}
+    schedule_next(low, new_posts=1, usage=_usage(50), now=NOW)
+    schedule_next(mid, new_posts=1, usage=_usage(85), now=NOW)
+    schedule_next(high, new_posts=1, usage=_usage(99), now=NOW)
+
+    assert low["next_run"] == int(NOW + PAGE_MIN_INTERVAL_S)
+    assert mid["next_run"] == int(NOW + PAGE_MIN_INTERVAL_S * 2.5)
+    assert high["next_run"] == int(NOW + PAGE_MIN_INTERVAL_S * 4)
+
+
+def test_due_pages_most_overdue_first():
+    states = {"a": {"next_run": NOW - 10}, "b": {}, "c": {"next_run": NOW + 3600}, "d": {"next_run": NOW - 500}}
+
+    assert due_pages(states, now=NOW) == ["b", "d", "a"]
+
+
+def test_run_pages_respects_allowed_concurrency_and_failures():
+    usage = _usage(80)  # sólo una página a la vez
+    lock, state = threading.Lock(), {"now": 0, "peak": 0}
+
+    def work(page_id):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.01)
+        with lock:
+            state["now"] -= 1
+        if page_id == "rota":
+            raise ValueError("error de Graph")
+        return page_id.upper()
+
+    results, left = run_pages(["a", "rota", "b"], work, usage, max_workers=4)
+
+    assert results == {"a": "A", "b": "B"}
+    assert left == []
+    assert state["peak"] == 1
+
+
+def test_run_pages_stops_at_quota_or_deadline():
+    results, left = run_pages(["a", "b"], lambda p: p, _usage(99), max_workers=4)
+    assert (results, left) == ({}, ["a", "b"])
+
+    results, left = run_pages(["a", "b"], lambda p: p, _usage(0), max_workers=4, deadline=time.monotonic() - 1)
+    assert (results, left) == ({}, ["a", "b"])
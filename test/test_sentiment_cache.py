@@ -0,0 +1,35 @@
+# test/test_sentiment_cache.py
+"""Caché de sentimiento por instancia: SQLite en disco local con el diario por defecto."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sentiment_cache import SentimentCache, analyze_with_cache
+
+
+def test_uses_rollback_journal(tmp_path):
+    cache = SentimentCache(str(tmp_path / "cache.sqlite3"))
+
+    assert cache._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert not os.path.exists(str(tmp_path / "cache.sqlite3-wal"))
+
+
+def test_only_unseen_texts_are_analyzed_across_runs(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    sent = []
+
+    def analyze(documents):
+        sent.extend(d["text"] for d in documents)
+        return {d["id"]: {"id": d["id"], "sentiment": "neutral"} for d in documents}
+
+    first = [{"id": "1", "text": "alerta por lluvias"}, {"id": "2", "text": "alerta  por lluvias "}]
+    assert set(analyze_with_cache(first, analyze, SentimentCache(path))) == {"1", "2"}
+
+    # Otra ejecución en la misma instancia: el archivo sigue ahí
+    second = [{"id": "1", "text": "alerta por lluvias"}, {"id": "3", "text": "corte de luz"}]
+    results = analyze_with_cache(second, analyze, SentimentCache(path))
+
+    assert results["1"] == {"sentiment": "neutral"}
+    assert sent == ["alerta por lluvias", "corte de luz"]
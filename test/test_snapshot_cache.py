@@ -0,0 +1,98 @@
+# test/test_snapshot_cache.py
+"""Lectura de base + deltas: cada delta se descarga una sola vez y el estado se reconstruye por partes."""
+
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sentiment_utils
+from local_blob_storage import LocalContainerClient
+from snapshot_cache import SnapshotCache
+from snapshot_deltas import apply_deltas
+from snapshot_format import apply_schema, serialize_snapshot
+
+BASE = "sentimiento_2025-10-01_08-00-00.parquet"
+
+
+def _posts(ids, likes=0):
+    return apply_schema(pd.DataFrame({
+        "Id": [f"pagina_{i}" for i in ids],
+        "Pagina": "pagina",
+        "Fecha": [f"2025-10-01T{8 + i // 60:02d}:{i % 60:02d}:00+0000" for i in ids],
+        "Post": [f"post {i}" for i in ids],
+        "Likes": likes,
+        "Sentimiento": "neutral",
+    }))
+
+
+@pytest.fixture
+def container(tmp_path, monkeypatch):
+    container = LocalContainerClient(str(tmp_path / "blobs"), "datos-facebook")
+    container.create_container()
+    cache = SnapshotCache(str(tmp_path / "cache"), max_files=60, max_frames=2)
+    monkeypatch.setattr(sentiment_utils, "snapshot_cache", cache)
+    container.cache = cache
+    container.deltas = []
+    _upload(container, BASE, _posts(range(10)))
+    return container
+
+
+def _upload(container, name, df):
+    container.get_blob_client(name).upload_blob(serialize_snapshot(df, "parquet"), overwrite=True)
+
+
+def _add_delta(container, df):
+    name = f"{sentiment_utils.DELTAS_PREFIX}sentimiento_2025-10-01_08-00-00/{len(container.deltas):04d}.parquet"
+    _upload(container, name, df)
+    container.deltas.append((name, df))
+    container.get_blob_client(sentiment_utils.LATEST_POINTER_BLOB).upload_blob(
+        json.dumps({"blob": BASE, "deltas": [n for n, _ in container.deltas]}), overwrite=True)
+
+
+def _read(container):
+    return sentiment_utils.read_latest_blob("datos-facebook", container_client=container, raise_errors=True)
+
+
+def test_each_delta_is_downloaded_once(container):
+    for i in range(5):
+        _add_delta(container, _posts([i, 10 + i], likes=i + 1))
+        _read(container)
+
+    stats = container.cache.stats
+    assert stats["downloads"] == 1 + 5  # la base y cada delta, una vez
+    assert stats["immutable_hits"] == 0
+    assert stats["state_hits"] == 4
+    assert stats["evicted"] == 0
+
+
+def test_incremental_state_matches_full_rebuild(container):
+    _add_delta(container, _posts([1, 10], likes=5))
+    _read(container)
+    _add_delta(container, _posts([1, 11], likes=7))
+
+    df = _read(container)
+
+    expected = apply_schema(apply_deltas(_posts(range(10)), [d for _, d in container.deltas]))
+    pd.testing.assert_frame_equal(df, expected)
+    assert df.set_index("Id").loc["pagina_1", "Likes"] == 7
+
+
+def test_new_process_reuses_deltas_on_disk_without_requests(container, monkeypatch):
+    for i in range(3):
+        _add_delta(container, _posts([20 + i]))
+    _read(container)
+
+    # Otro proceso: misma carpeta de caché, nada en memoria
+    fresh = SnapshotCache(container.cache.directory, max_files=60, max_frames=2)
+    monkeypatch.setattr(sentiment_utils, "snapshot_cache", fresh)
+    df = _read(container)
+
+    assert len(df) == 13
+    assert fresh.stats["downloads"] == 0
+    assert fresh.stats["not_modified"] == 1  # sólo la base se revalida
+    assert fresh.stats["immutable_hits"] == 3
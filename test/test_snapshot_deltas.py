@@ -0,0 +1,55 @@
+# test/test_snapshot_deltas.py
+"""Primera ejecución tras el despliegue: el estado previo es un snapshot legado sin Id."""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregates import compute_aggregates, update_aggregates
+from snapshot_deltas import apply_deltas, changed_rows, merge_with_previous
+from snapshot_format import apply_schema
+
+LEGACY = apply_schema(pd.DataFrame({
+    "Fecha": ["2025-10-01T07:50:00+0000", "2025-10-01T07:40:00+0000", "2025-10-01T07:30:00+0000"],
+    "Post": ["incendio en la carretera", "rescate de familias", "alerta por lluvias"],
+    "Likes": [1, 2, 3],
+    "Sentimiento": ["negative", "neutral", "positive"],
+}))
+
+# Lo que devuelve Graph en la primera ejecución: los mismos posts (likes al día) más uno nuevo
+NEW = apply_schema(pd.DataFrame({
+    "Id": ["pagina_3", "pagina_0", "pagina_1", "pagina_2"],
+    "Pagina": "pagina",
+    "Fecha": ["2025-10-01T08:10:00+0000", "2025-10-01T07:50:00+0000",
+              "2025-10-01T07:40:00+0000", "2025-10-01T07:30:00+0000"],
+    "Post": ["corte de luz", "incendio en la carretera", "rescate de familias", "alerta por lluvias"],
+    "Likes": [0, 5, 6, 7],
+    "Sentimiento": ["negative", "negative", "neutral", "positive"],
+}))
+
+
+def test_legacy_rows_are_replaced_by_their_id_version():
+    merged = merge_with_previous(changed_rows(NEW, LEGACY), LEGACY)
+
+    assert len(merged) == 4
+    assert merged["Id"].notna().all()
+    assert merged.set_index("Id")["Likes"].to_dict() == {"pagina_0": 5, "pagina_1": 6, "pagina_2": 7, "pagina_3": 0}
+
+
+def test_legacy_rows_without_id_match_are_kept():
+    merged = apply_deltas(LEGACY, [NEW.iloc[:1]])
+
+    assert len(merged) == 4
+    assert merged["Id"].isna().sum() == 3
+
+
+def test_incremental_aggregates_drop_replaced_legacy_rows():
+    previous = compute_aggregates(LEGACY)
+
+    agg = update_aggregates(previous, NEW, LEGACY)
+
+    assert agg["posts"] == 4
+    assert agg == compute_aggregates(merge_with_previous(NEW, LEGACY))
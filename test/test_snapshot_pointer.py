@@ -0,0 +1,76 @@
+# test/test_snapshot_pointer.py
+"""Dos ejecuciones que guardan a la vez: el puntero no pierde la escritura de ninguna."""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sentiment_utils
+from snapshot_cache import SnapshotCache
+from snapshot_format import apply_schema
+from sentiment_utils import read_pointer, write_pointer
+
+CONTAINER = "datos-facebook"
+
+
+def _posts(ids, likes=0):
+    return apply_schema(pd.DataFrame({
+        "Id": [f"pagina_{i}" for i in ids],
+        "Pagina": "pagina",
+        "Fecha": [f"2025-10-01T08:{i:02d}:00+0000" for i in ids],
+        "Post": [f"post {i}" for i in ids],
+        "Likes": likes,
+        "Sentimiento": "neutral",
+    }))
+
+
+@pytest.fixture
+def container(tmp_path, monkeypatch):
+    monkeypatch.setattr(sentiment_utils, "LOCAL_BLOB_ROOT", str(tmp_path / "blobs"))
+    monkeypatch.setattr(sentiment_utils, "snapshot_cache", SnapshotCache(str(tmp_path / "cache")))
+    monkeypatch.setattr(sentiment_utils, "_container_clients", {})
+    monkeypatch.setattr(sentiment_utils, "_known_containers", set())
+    return sentiment_utils.get_container_client(CONTAINER, create=True)
+
+
+def _read():
+    return sentiment_utils.read_latest_blob(CONTAINER, raise_errors=True)
+
+
+def test_write_pointer_requires_the_etag_it_read(container):
+    write_pointer(container, {"blob": "a.parquet", "deltas": []})
+    pointer, etag = read_pointer(container, with_etag=True)
+    write_pointer(container, {**pointer, "deltas": ["otro"]}, etag)
+
+    with pytest.raises(ResourceModifiedError):
+        write_pointer(container, {**pointer, "deltas": ["perdido"]}, etag)
+    with pytest.raises(ResourceExistsError):
+        write_pointer(container, {"blob": "b.parquet", "deltas": []})
+    assert read_pointer(container)["deltas"] == ["otro"]
+
+
+def test_concurrent_save_does_not_drop_the_other_delta(container, monkeypatch):
+    assert sentiment_utils.save_changes_to_blob(_posts(range(3)), pd.DataFrame(), CONTAINER)
+    state = _read()
+
+    # Otra ejecución escribe su delta mientras ésta sube el suyo
+    upload = sentiment_utils.upload_blob
+
+    def racing_upload(container_name, blob_name, data):
+        upload(container_name, blob_name, data)
+        if blob_name.startswith(sentiment_utils.DELTAS_PREFIX):
+            monkeypatch.setattr(sentiment_utils, "upload_blob", upload)
+            assert sentiment_utils.save_changes_to_blob(_posts([5]), state, CONTAINER)
+
+    monkeypatch.setattr(sentiment_utils, "upload_blob", racing_upload)
+    assert not sentiment_utils.save_changes_to_blob(_posts([4]), state, CONTAINER)
+
+    assert sorted(_read()["Id"]) == ["pagina_0", "pagina_1", "pagina_2", "pagina_5"]
+    # La próxima ejecución vuelve a leer el post 4 y lo guarda
+    assert sentiment_utils.save_changes_to_blob(_posts([4]), _read(), CONTAINER)
+    assert len(_read()) == 5
@@ -0,0 +1,52 @@
+# test/test_table_pages.py
+"""filter_query de Dash sobre la tabla de posts: operandos con y sin comillas."""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot_format import apply_schema
+from table_pages import filter_mask, split_filter_part
+
+DF = apply_schema(pd.DataFrame({
+    "Fecha": ["2025-10-01T08:00:00+0000", "2025-10-02T09:30:00+0000", "2025-10-03T10:00:00+0000"],
+    "Post": ["14 familias evacuadas", "alerta por lluvias", "corte de luz en la zona 2"],
+    "Likes": [2, 12, 140],
+    "Sentimiento": ["negative", "neutral", "negative"],
+}))
+
+
+@pytest.mark.parametrize("part, expected", [
+    ("{Post} contains 14", ("Post", "contains", "14")),
+    ("{Likes} contains 2", ("Likes", "contains", "2")),
+    ("{Post} contains 'zona 2'", ("Post", "contains", "zona 2")),
+    ('{Post} contains "dijo \\"hola\\""', ("Post", "contains", 'dijo "hola"')),
+    ("{Fecha} datestartswith 2025-10-02", ("Fecha", "datestartswith", "2025-10-02")),
+    ("{Likes} ge 12", ("Likes", "ge", 12.0)),
+    ("{Likes} > 12", ("Likes", "gt", 12.0)),
+    ("{Likes} eq '12'", ("Likes", "eq", "12")),
+    ("{Sentimiento} = negative", ("Sentimiento", "eq", "negative")),
+    ("sin operador", (None, None, None)),
+])
+def test_split_filter_part(part, expected):
+    assert split_filter_part(part) == expected
+
+
+@pytest.mark.parametrize("query, rows", [
+    ("{Post} contains 14", [0]),
+    ("{Likes} contains 2", [0, 1]),
+    ("{Likes} contains '14'", [2]),
+    ("{Post} contains ZONA", [2]),
+    ("{Fecha} datestartswith 2025-10-02", [1]),
+    ("{Likes} ge 12", [1, 2]),
+    ("{Likes} eq '12'", [1]),
+    ("{Sentimiento} = negative && {Likes} < 100", [0]),
+    ("{NoExiste} contains x", [0, 1, 2]),
+    ("", [0, 1, 2]),
+])
+def test_filter_mask(query, rows):
+    assert list(DF.index[filter_mask(DF, query)]) == rows
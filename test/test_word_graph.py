@@ -0,0 +1,60 @@
+# test/test_word_graph.py
+"""TokenIndex con una ventana que se desplaza: el vocabulario no crece sin límite."""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregates import compute_aggregates, graph_elements
+from word_graph import TokenIndex, generar_grafo_palabras, generar_grafo_palabras_iterrows
+
+
+def _window(start, size=20):
+    # Cada post trae términos propios (que desaparecen al salir de la ventana) y uno común
+    return pd.DataFrame({
+        "Post": [f"incendio palabra{i} otra{i} zona{i % 3}" for i in range(start, start + size)],
+        "Sentimiento": ["negative" if i % 2 else "neutral" for i in range(start, start + size)],
+    })
+
+
+def test_vocabulary_is_compacted_as_the_window_moves():
+    index = TokenIndex(max_posts=40, compact_min_terms=100)
+
+    for start in range(0, 600, 10):
+        window = _window(start)
+        index.update(window)
+        assert index.elements(top_n=10) == generar_grafo_palabras(window, top_n=10)
+
+    assert index.stats["compactions"] > 0
+    # Términos de a lo sumo max_posts posts (2 propios cada uno) más los comunes, con margen de 2x
+    assert len(index._terms) < 2 * (2 * 40 + 4) + 100
+    assert index._cooc.shape == (len(index._terms), len(index._terms))
+
+
+def _tied(order):
+    posts = pd.DataFrame({
+        "Fecha": ["2025-10-01T08:00:00+0000", "2025-10-01T07:00:00+0000"],
+        "Post": ["incendio grave", "incendio controlado"],
+        "Sentimiento": ["positive", "negative"],
+    })
+    return posts.iloc[order].reset_index(drop=True)
+
+
+def _node_sentiments(elements):
+    return {e["data"]["id"]: e["data"].get("sentiment") for e in elements if "source" not in e["data"]}
+
+
+def test_sentiment_ties_do_not_depend_on_post_order():
+    for order in ([0, 1], [1, 0]):
+        df = _tied(order)
+        index = TokenIndex()
+        index.update(df)
+
+        expected = _node_sentiments(generar_grafo_palabras(df, top_n=10))
+        assert expected["incendio"] == "negative"
+        assert _node_sentiments(generar_grafo_palabras_iterrows(df, top_n=10)) == expected
+        assert _node_sentiments(index.elements(top_n=10)) == expected
+        assert _node_sentiments(graph_elements(compute_aggregates(df), top_n=10)) == expected
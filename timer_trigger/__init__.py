@@ -1,119 +1,196 @@
 import logging
 import os
-import io
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import pandas as pd
 import requests
-import json
 import azure.functions as func
-from azure.storage.blob import BlobServiceClient
-
-
-def save_dataframe_to_blob(df_to_save, container_name: str):
-    """Guarda un DataFrame como CSV en Azure Blob Storage."""
+from aggregates import AGGREGATES_BLOB, update_aggregates
+from azure_sentiment import get_sentiment_client
+from facebook_feed import iter_new_posts, parse_created_time
+from ingest_metrics import current_run, http_hook, in_current_context, ingest_run, stage
+from page_scheduler import INGEST_MAX_WORKERS, GraphUsage, due_pages, page_ids_from_env, run_pages, schedule_next
+from sentiment_cache import analyze_with_cache, get_sentiment_cache
+from snapshot_format import apply_schema
+from sentiment_utils import read_latest_blob, read_json_blob, save_changes_to_blob, write_json_blob
+
+CONTAINER_NAME = os.environ.get("AZURE_CONTAINER_NAME", "datos-facebook")
+# Qué función ingesta: timer_trigger (esta, por defecto) o sentiment_dashboard (modelo v2).
+# Las dos comparten horario, estado por página y puntero; nunca deben correr a la vez.
+INGEST_ENTRYPOINT = os.environ.get("INGEST_ENTRYPOINT", "timer_trigger")
+# Presupuesto por ejecución: el timer corre cada 5 minutos y el timeout por defecto es de 5 minutos
+INGEST_TIME_BUDGET_S = float(os.environ.get("INGEST_TIME_BUDGET_S", 200))
+INGEST_BACKFILL_PAGES = int(os.environ.get("INGEST_BACKFILL_PAGES", 10))
+# Ventana de posts recientes que se vuelven a leer en cada ejecución para actualizar sus likes
+INGEST_REFRESH_HOURS = float(os.environ.get("INGEST_REFRESH_HOURS", 24))
+
+
+def analyze_sentiments(posts, azure_endpoint: str, azure_api_key: str) -> dict:
+    """Sentimiento de los posts con mensaje, indexado por id de post."""
+    documents = [
+        {"id": post.get("id", str(i)), "text": post["message"]}
+        for i, post in enumerate(posts) if post.get("message")
+    ]
+    # Sólo los textos que no están en la caché van a Azure
+    return analyze_with_cache(documents, get_sentiment_client(azure_endpoint, azure_api_key).analyze)
+
+
+def build_rows(posts, sentiments: dict, page_id: str = None):
+    # Unión por id: los posts sin mensaje quedan sin sentimiento en vez de desalinear al resto
+    return [
+        {
+            "Id": post.get("id"),
+            "Pagina": page_id,
+            "Fecha": post.get("created_time", "N/A"),
+            "Post": post.get("message", "N/A"),
+            "Likes": post.get("likes", {}).get("summary", {}).get("total_count", 0),
+            "Sentimiento": sentiments.get(post.get("id", str(i)), {}).get("sentiment", "N/A")
+        }
+        for i, post in enumerate(posts)
+    ]
+
+
+def update_aggregates_blob(df_new: pd.DataFrame, df_prev: pd.DataFrame) -> None:
+    """Actualiza el artefacto de agregados del dashboard con los cambios de esta ejecución."""
     try:
-        connect_str = os.environ.get("AzureWebJobsStorage")
-        if not connect_str:
-            logging.error("La variable AzureWebJobsStorage no está configurada.")
+        previous = read_json_blob(CONTAINER_NAME, AGGREGATES_BLOB)
+        aggregates = update_aggregates(previous, df_new, df_prev)
+        if aggregates is previous:
             return
+        aggregates["updated_at"] = datetime.now(timezone.utc).isoformat()
+        write_json_blob(CONTAINER_NAME, AGGREGATES_BLOB, aggregates)
+        logging.info(f"📈 Agregados actualizados ({aggregates['posts']} posts)")
+    except Exception as ex:
+        # Si falla, el conteo de posts no cuadra y la próxima ejecución lo reconstruye
+        logging.warning(f"⚠️ No se pudieron actualizar los agregados: {ex}")
+
+
+def state_blob_name(page_id: str) -> str:
+    return f"_estado/feed_{page_id}.json"
+
+
+def ingest_page(page_id: str, access_token: str, azure_endpoint: str, azure_api_key: str, state: dict,
+                usage: GraphUsage, deadline: float) -> list:
+    """
+    Filas nuevas o releídas (ventana de INGEST_REFRESH_HOURS) de una página;
+    state (marca de agua y frecuencia) se actualiza en el lugar.
+    """
+    rows, new_posts, watermark = [], 0, state.get("since") or 0
+    session = requests.Session()
+    session.hooks["response"].extend([usage.observe, http_hook("graph_http")])
+    # Cada página del feed se analiza en cuanto llega
+    for posts in iter_new_posts(page_id, access_token, state, backfill_pages=INGEST_BACKFILL_PAGES,
+                                deadline=deadline, session=session, refresh_s=INGEST_REFRESH_HOURS * 3600):
+        # Los posts releídos no cuentan como novedad para la frecuencia de la página
+        new_posts += sum(1 for p in posts
+                         if p.get("created_time") and parse_created_time(p["created_time"]) > watermark)
+        with stage("sentiment") as s:
+            sentiments = analyze_sentiments(posts, azure_endpoint, azure_api_key)
+            s.items = len(posts)
+        with stage("build_rows") as s:
+            rows.extend(build_rows(posts, sentiments, page_id))
+            s.items = len(posts)
+    schedule_next(state, new_posts, usage)
+    logging.info(f"📄 Página {page_id}: {len(rows)} posts, {new_posts} nuevos "
+                 f"(próxima lectura en {state['interval_s'] / 60:.0f} min)")
+    return rows
+
+
+def _write_states(states: dict) -> None:
+    with stage("state_write") as s, \
+            ThreadPoolExecutor(max_workers=max(1, min(INGEST_MAX_WORKERS, len(states)))) as pool:
+        write_state = in_current_context(lambda item: write_json_blob(CONTAINER_NAME, state_blob_name(item[0]), item[1]))
+        list(pool.map(write_state, states.items()))
+        s.items = len(states)
+
+
+def run_ingest(page_ids, access_token: str, azure_endpoint: str, azure_api_key: str, deadline: float) -> None:
+    """
+    Lee las páginas que tocan en paralelo (page_scheduler) y guarda sus
+    posts nuevos en un solo delta; la columna Pagina identifica la página de
+    cada post. El estado de cada página sólo se guarda si el delta quedó escrito.
+    """
+    with stage("state_read") as s, \
+            ThreadPoolExecutor(max_workers=max(1, min(INGEST_MAX_WORKERS, len(page_ids)))) as pool:
+        read_state = in_current_context(lambda p: read_json_blob(CONTAINER_NAME, state_blob_name(p)))
+        states = dict(zip(page_ids, pool.map(read_state, page_ids)))
+        s.items = len(states)
+    due = due_pages(states)
+    logging.info(f"📍 {len(due)} de {len(page_ids)} páginas toca leer en esta ejecución")
+
+    usage = GraphUsage()
+    results, skipped = run_pages(
+        due,
+        lambda page_id: ingest_page(page_id, access_token, azure_endpoint, azure_api_key, states[page_id],
+                                    usage, deadline),
+        usage, deadline=deadline,
+    )
+    done_states = {page_id: states[page_id] for page_id in results}
+    rows = [row for page_rows in results.values() for row in page_rows]
+    metrics = current_run()
+    if metrics is not None:
+        metrics.info.update(pages=len(page_ids), pages_due=len(due), pages_done=len(results),
+                            pages_skipped=len(skipped), posts=len(rows), graph_usage_pct=usage.usage)
+
+    if not rows:
+        logging.info("No hay posts nuevos en las páginas.")
+        _write_states(done_states)
+        return
 
-        blob_service_client = BlobServiceClient.from_connection_string(connect_str)
-        container_client = blob_service_client.get_container_client(container_name)
-
-        if not container_client.exists():
-            container_client.create_container()
-
-        now = datetime.now()
-        file_name = f"sentimiento_{now.strftime('%Y-%m-%d_%H-%M-%S')}.csv"
-
-        output = io.StringIO()
-        df_to_save.to_csv(output, index=False)
-        data = output.getvalue()
-
-        blob_client = container_client.get_blob_client(blob=file_name)
-        blob_client.upload_blob(data, overwrite=True)
-        logging.info(f"✅ DataFrame guardado en {container_name}/{file_name}")
-
-    except Exception as e:
-        logging.error(f"⚠️ Error al guardar datos en Blob Storage: {e}")
+    # Sólo se escriben los posts nuevos o con cambios (delta sobre el último snapshot)
+    with stage("dataframe") as s:
+        df_new = apply_schema(pd.DataFrame(rows))
+        s.items = len(df_new)
+    with stage("snapshot_read") as s:
+        try:
+            df_prev = read_latest_blob(CONTAINER_NAME, raise_errors=True)
+        except Exception as ex:
+            # Un estado vacío por error de lectura reescribiría la base sólo con esta ejecución
+            logging.error(f"⚠️ No se pudo leer el último snapshot ({ex}); no se guarda nada en esta ejecución.")
+            return
+        s.items = len(df_prev)
+    logging.info(f"📂 Guardando cambios de {len(rows)} posts leídos ({len(df_prev)} en el snapshot) en Azure Blob Storage...")
+    if save_changes_to_blob(df_new, df_prev, CONTAINER_NAME):
+        # Las marcas de agua sólo avanzan si el snapshot quedó guardado
+        _write_states(done_states)
+        with stage("aggregates"):
+            update_aggregates_blob(df_new, df_prev)
 
 
 def main(myTimer: func.TimerRequest) -> None:
     """Función ejecutada por Timer Trigger"""
     logging.info("⏰ Timer trigger ejecutado")
+    if INGEST_ENTRYPOINT != "timer_trigger":
+        logging.info(f"La ingesta corre en {INGEST_ENTRYPOINT}; este disparador no hace nada.")
+        return
+    deadline = time.monotonic() + INGEST_TIME_BUDGET_S
 
     ACCESS_TOKEN = os.environ.get("FACEBOOK_ACCESS_TOKEN")
-    PAGE_ID = os.environ.get("META_PAGE_ID")
+    PAGE_IDS = page_ids_from_env()
     AZURE_API_KEY = os.environ.get("AZURE_TEXT_KEY")
     AZURE_ENDPOINT = os.environ.get("AZURE_TEXT_ENDPOINT")
 
-    if not all([ACCESS_TOKEN, PAGE_ID, AZURE_API_KEY, AZURE_ENDPOINT]):
+    if not all([ACCESS_TOKEN, PAGE_IDS, AZURE_API_KEY, AZURE_ENDPOINT]):
         logging.error("⚠️ Variables de entorno no configuradas correctamente.")
         return
 
-    logging.info(f"✅ Usando Page ID: {PAGE_ID}")
-
-    url_facebook = f"https://graph.facebook.com/v19.0/{PAGE_ID}/feed"
-    params_facebook = {
-        "fields": "message,likes.summary(true),created_time",
-        "access_token": ACCESS_TOKEN
-    }
-
-    try:
-        response_facebook = requests.get(url_facebook, params=params_facebook)
-        
-        # Logging detallado para depurar errores
-        if response_facebook.status_code != 200:
-            try:
-                error_info = response_facebook.json().get("error", {})
-                logging.error(f"⚠️ Error de Graph API: {error_info}")
-            except json.JSONDecodeError:
-                logging.error(f"⚠️ Error de Graph API, status {response_facebook.status_code}")
-            return
-        
-        posts = response_facebook.json().get("data", [])
-
-        if not posts:
-            logging.info("No se encontraron posts en la página.")
-            return
-
-        documents = [
-            {"id": str(i), "text": post["message"]}
-            for i, post in enumerate(posts) if "message" in post
-        ]
-
-        batch_size = 10
-        document_batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
-
-        all_sentiment_data = []
-        for batch in document_batches:
-            url_azure = f"{AZURE_ENDPOINT}/text/analytics/v3.0/sentiment"
-            headers_azure = {
-                "Ocp-Apim-Subscription-Key": AZURE_API_KEY,
-                "Content-Type": "application/json"
-            }
-            body_azure = {"documents": batch}
-            response_azure = requests.post(url_azure, headers=headers_azure, data=json.dumps(body_azure))
-            response_azure.raise_for_status()
-            all_sentiment_data.extend(response_azure.json().get("documents", []))
-
-        results = []
-        for post, sentiment in zip(posts, all_sentiment_data):
-            results.append({
-                "Fecha": post.get("created_time", "N/A"),
-                "Post": post.get("message", "N/A"),
-                "Likes": post.get("likes", {}).get("summary", {}).get("total_count", 0),
-                "Sentimiento": sentiment.get("sentiment", "N/A")
-            })
-
-        df = pd.DataFrame(results)
-        logging.info("📂 Guardando los datos en Azure Blob Storage...")
-        save_dataframe_to_blob(df, "datos-facebook")
-
-    except requests.exceptions.RequestException as req_ex:
-        logging.error(f"⚠️ Error de solicitud HTTP: {req_ex}")
-    except Exception as ex:
-        logging.error(f"⚠️ Ocurrió un error al procesar posts: {ex}")
+    logging.info(f"✅ Usando {len(PAGE_IDS)} páginas: {', '.join(PAGE_IDS)}")
+
+    with ingest_run("timer_trigger") as metrics:
+        if metrics is not None:
+            metrics.info["past_due"] = bool(myTimer.past_due)
+        try:
+            run_ingest(PAGE_IDS, ACCESS_TOKEN, AZURE_ENDPOINT, AZURE_API_KEY, deadline)
+        except requests.exceptions.RequestException as req_ex:
+            logging.error(f"⚠️ Error de solicitud HTTP: {req_ex}")
+        except Exception as ex:
+            logging.error(f"⚠️ Ocurrió un error al procesar posts: {ex}")
+
+        cache = get_sentiment_cache()
+        cache.log_stats()
+        if metrics is not None:
+            metrics.info["sentiment_cache_hit_rate"] = round(cache.hit_rate(), 3)
 
     if myTimer.past_due:
         logging.warning("⏱️ El timer está retrasado.")
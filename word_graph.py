@@ -0,0 +1,427 @@
+# word_graph.py
+"""
+Grafo de co-ocurrencia de palabras para el dashboard.
+
+- generar_grafo_palabras: ruta vectorizada (pandas) usada por el callback.
+  Los pesos de las aristas salen de un único producto disperso Xᵀ·X sobre
+  la matriz de incidencia post×término, con poda opcional por peso mínimo
+  y por top-k aristas por nodo.
+- generar_grafo_palabras_iterrows: implementación original fila por fila,
+  se conserva como referencia para validar y comparar en benchmarks/.
+- TokenIndex: índice incremental por post (clave = hash del texto) que sólo
+  tokeniza posts nuevos o editados entre refrescos y mantiene los conteos de
+  palabras y de co-ocurrencia acumulados en el lugar.
+Sin poda las tres devuelven los mismos nodos (en el mismo orden) y las mismas
+aristas; la ruta vectorizada emite las aristas en orden canónico (por rango
+del nodo origen y luego del destino).
+"""
+
+import re
+import itertools
+import threading
+import collections
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+TOP_WORDS_DEFAULT = 25
+# TokenIndex compacta su vocabulario al llegar a este tamaño (y luego al doble de lo que quedó)
+VOCAB_COMPACT_MIN_TERMS = 10_000
+
+# -----------------------------
+# Stopwords español
+# -----------------------------
+stopwords_es = {
+    "a","ante","bajo","cabe","con","contra","de","del","desde","durante","en","entre",
+    "hacia","hasta","mediante","para","por","según","sin","so","sobre","tras","versus","vía",
+    "el","la","los","las","un","una","unos","unas","lo","al","su","sus","mi","mis","tu","tus",
+    "nuestro","nuestra","nuestros","nuestras","vosotros","vosotras","vuestro","vuestra","vuestros",
+    "vuestras","ellos","ellas","nosotros","nosotras","yo","tú","usted","ustedes","él","ella",
+    "me","te","se","nos","os","les","le","y","o","que","qué","como","cómo","para","porque","pero",
+    "si","ya","tan","muy","más","menos","también","cuando","donde","dónde","ser","estar","haber"
+}
+
+_punct_re = re.compile(r'^[\W_]+|[\W_]+$')
+def clean_token(tok: str) -> str:
+    return _punct_re.sub("", tok.lower())
+
+color_map = {"positivo":"#2ca02c", "positivo.":"#2ca02c", "positive":"#2ca02c",
+             "negativo":"#d62728", "negative":"#d62728",
+             "neutro":"#7f7f7f", "neutral":"#7f7f7f"}
+
+# -----------------------------
+# Implementación original (referencia)
+# -----------------------------
+def generar_grafo_palabras_iterrows(df: pd.DataFrame, top_n: int = TOP_WORDS_DEFAULT):
+    import networkx as nx  # sólo la ruta de referencia usa networkx
+
+    if df.empty or "Post" not in df.columns:
+        return []
+
+    word_counts = collections.Counter()
+    word_sent_map = collections.defaultdict(list)
+    posts_tokens = []
+
+    for _, row in df.iterrows():
+        text = str(row.get("Post", ""))
+        tokens = [clean_token(t) for t in re.split(r"\s+", text) if t and len(t) > 0]
+        tokens = [t for t in tokens if t not in stopwords_es and len(t) > 2]
+        unique_tokens = list(dict.fromkeys(tokens))
+        posts_tokens.append(unique_tokens)
+        for t in unique_tokens:
+            word_counts[t] += 1
+            word_sent_map[t].append(str(row.get("Sentimiento", "")).lower())
+
+    if not word_counts:
+        return []
+
+    top_words = [w for w, _ in word_counts.most_common(top_n)]
+    G = nx.Graph()
+
+    for w in top_words:
+        freq = word_counts[w]
+        sents = [s for s in word_sent_map.get(w, []) if s]
+        sent_mode = dominant_sentiment(collections.Counter(sents)) if sents else None
+        color = color_map.get(sent_mode, "#7f7f7f")
+        size = max(20, 8 + freq * 7)
+        G.add_node(w, size=size, color=color, freq=int(freq), sentiment=sent_mode)
+
+    edge_counts = collections.Counter()
+    for tokens in posts_tokens:
+        present = [t for t in tokens if t in top_words]
+        for a, b in itertools.combinations(sorted(set(present)), 2):
+            edge_counts[(a,b)] += 1
+
+    for (a,b), w in edge_counts.items():
+        if a in G.nodes and b in G.nodes:
+            G.add_edge(a, b, weight=int(w))
+
+    elements = []
+    for node, attrs in G.nodes(data=True):
+        elements.append({
+            "data": {"id": node, "label": node, "freq": attrs.get("freq", 1), "sentiment": attrs.get("sentiment")},
+            "style": {"width": attrs["size"], "height": attrs["size"], "background-color": attrs["color"]}
+        })
+    for source, target, attrs in G.edges(data=True):
+        elements.append({
+            "data": {"id": f"e-{source}-{target}", "source": source, "target": target, "weight": attrs.get("weight", 1)}
+        })
+
+    return elements
+
+# -----------------------------
+# Ruta vectorizada
+# -----------------------------
+def tokenize_posts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tokeniza todos los posts de una vez con métodos .str de pandas.
+    Devuelve un DataFrame largo con columnas post (posición), token y sent,
+    sin stopwords, deduplicado por post y en orden de aparición.
+    """
+    posts = df["Post"].astype(str).str.lower().str.split()
+    posts.index = np.arange(len(posts))
+    raw = posts.explode().dropna()
+
+    # Limpiar y filtrar sólo el vocabulario único; luego proyectar con los códigos
+    codes, uniques = pd.factorize(raw.to_numpy())
+    cleaned = pd.Series(uniques, dtype=object).str.replace(_punct_re, "", regex=True)
+    keep = ((cleaned.str.len() > 2) & ~cleaned.isin(stopwords_es)).to_numpy()
+    mask = keep[codes]
+    tokens = pd.Series(cleaned.to_numpy()[codes[mask]], index=raw.index[mask])
+
+    if "Sentimiento" in df.columns:
+        sents = df["Sentimiento"].astype(str).str.lower().to_numpy()
+    else:
+        sents = np.full(len(df), "", dtype=object)
+
+    post_idx = tokens.index.to_numpy()
+    frame = pd.DataFrame({"post": post_idx, "token": tokens.to_numpy(), "sent": sents[post_idx]})
+    return frame.drop_duplicates(["post", "token"], ignore_index=True)
+
+def _top_terms(frame: pd.DataFrame, top_n: int) -> pd.Series:
+    """Frecuencia documental de los top_n términos; empates por primera aparición (como Counter.most_common)."""
+    counts = frame.groupby("token", sort=False).size()
+    order = np.argsort(-counts.to_numpy(), kind="stable")[:top_n]
+    return counts.iloc[order]
+
+def dominant_sentiment(counts: dict) -> str:
+    """
+    Sentimiento más frecuente de {sentimiento: n}. Los empates se resuelven
+    por orden alfabético y no por orden de aparición, para que el grafo sea
+    el mismo se calcule sobre los posts o sobre los agregados incrementales.
+    """
+    return min(counts.items(), key=lambda kv: (-kv[1], kv[0]))[0]
+
+def _sentiment_modes(frame: pd.DataFrame, top_terms) -> dict:
+    """Sentimiento más frecuente por término (empates como en dominant_sentiment)."""
+    sub = frame[frame["token"].isin(top_terms) & (frame["sent"] != "")]
+    if sub.empty:
+        return {}
+    pairs = sub.groupby(["token", "sent"], sort=False).size().reset_index(name="n")
+    pairs = pairs.iloc[np.lexsort((pairs["sent"].to_numpy(dtype=str), -pairs["n"].to_numpy()))]
+    pairs = pairs.drop_duplicates("token")
+    return dict(zip(pairs["token"], pairs["sent"]))
+
+def incidence_matrix(frame: pd.DataFrame, terms, n_posts: int) -> sp.csr_matrix:
+    """Matriz binaria dispersa post×término restringida a terms (columnas en ese orden)."""
+    cols = pd.Index(terms).get_indexer(frame["token"])
+    present = cols >= 0
+    rows = frame["post"].to_numpy()[present]
+    data = np.ones(int(present.sum()), dtype=np.int32)
+    return sp.csr_matrix((data, (rows, cols[present])), shape=(n_posts, len(terms)))
+
+def cooccurrence_edges(X: sp.csr_matrix, min_weight: int = 1, top_k: int = None):
+    """Pesos de co-ocurrencia de todos los pares con un solo producto Xᵀ·X (ver prune_edges)."""
+    return prune_edges(X.T @ X, min_weight=min_weight, top_k=top_k)
+
+def prune_edges(C: sp.spmatrix, min_weight: int = 1, top_k: int = None):
+    """
+    Aristas de una matriz simétrica de co-ocurrencia término×término.
+    Devuelve (a, b, peso) como arrays con a < b (índices de columna), ordenados por (a, b).
+
+    - min_weight: descarta pares que co-ocurren en menos posts.
+    - top_k: conserva una arista si está entre las k más pesadas de cualquiera
+      de sus dos nodos (empates por rango del término vecino).
+    """
+    C = sp.triu(C, k=1).tocoo()
+    a, b, w = C.row, C.col, C.data
+    keep = w >= max(min_weight, 1)
+    a, b, w = a[keep], b[keep], w[keep]
+
+    if top_k and len(w):
+        # Cada arista vista desde ambos extremos, rankeada dentro de su nodo
+        node = np.concatenate([a, b])
+        other = np.concatenate([b, a])
+        weight = np.concatenate([w, w])
+        edge_id = np.concatenate([np.arange(len(w)), np.arange(len(w))])
+        order = np.lexsort((other, -weight, node))
+        node_sorted = node[order]
+        starts = np.searchsorted(node_sorted, node_sorted, side="left")
+        rank = np.arange(len(order)) - starts
+        selected = np.zeros(len(w), dtype=bool)
+        selected[edge_id[order][rank < top_k]] = True
+        a, b, w = a[selected], b[selected], w[selected]
+
+    order = np.lexsort((b, a))
+    return a[order], b[order], w[order]
+
+def build_elements(top_terms, freqs, sent_modes, edges):
+    """
+    Arma los elementos de Cytoscape: nodos en orden de frecuencia y luego las
+    aristas (origen = término de mayor rango, como las emitía networkx).
+    """
+    elements = []
+    for w, freq in zip(top_terms, freqs):
+        sent_mode = sent_modes.get(w)
+        size = max(20, 8 + int(freq) * 7)
+        elements.append({
+            "data": {"id": w, "label": w, "freq": int(freq), "sentiment": sent_mode},
+            "style": {"width": size, "height": size, "background-color": color_map.get(sent_mode, "#7f7f7f")}
+        })
+    for source, target, weight in edges:
+        elements.append({
+            "data": {"id": f"e-{source}-{target}", "source": source, "target": target, "weight": int(weight)}
+        })
+    return elements
+
+def generar_grafo_palabras(df: pd.DataFrame, top_n: int = TOP_WORDS_DEFAULT,
+                           min_weight: int = 1, top_k_edges: int = None):
+    if df.empty or "Post" not in df.columns:
+        return []
+
+    frame = tokenize_posts(df)
+    if frame.empty:
+        return []
+
+    top = _top_terms(frame, top_n)
+    top_terms = top.index.tolist()
+    sent_modes = _sentiment_modes(frame, top_terms)
+    X = incidence_matrix(frame, top_terms, len(df))
+    a, b, w = cooccurrence_edges(X, min_weight=min_weight, top_k=top_k_edges)
+    terms = np.asarray(top_terms, dtype=object)
+    return build_elements(top_terms, top.to_numpy(), sent_modes, zip(terms[a], terms[b], w))
+
+# -----------------------------
+# Índice incremental de tokens por post
+# -----------------------------
+def _post_keys(df: pd.DataFrame):
+    """Hash de 64 bits del texto (y sentimiento) de cada post, más el sentimiento normalizado."""
+    posts = df["Post"].astype(str)
+    if "Sentimiento" in df.columns:
+        sents = df["Sentimiento"].astype(str).str.lower()
+    else:
+        sents = pd.Series("", index=df.index, dtype=object)
+    keys = pd.util.hash_pandas_object(pd.DataFrame({"p": posts, "s": sents}), index=False)
+    return keys.to_numpy(), sents.to_numpy()
+
+class TokenIndex:
+    """
+    Índice persistente de tokens por post para refrescos incrementales del grafo.
+
+    Cada entrada (clave = hash del texto y su sentimiento) guarda los ids de los
+    tokens limpios y deduplicados del post. En cada update() sólo se tokenizan
+    los posts que no están en el índice; los conteos de palabras y la matriz de
+    co-ocurrencia se ajustan con la diferencia de multiplicidades respecto a la
+    ventana anterior. Las entradas que salieron de la ventana se desalojan en
+    orden LRU cuando el índice supera max_posts.
+
+    Si la ventana no cambió (mismo DataFrame cacheado por load_latest_csv o
+    mismas claves en el mismo orden), update() y elements() no recalculan nada.
+
+    Los términos de posts desalojados siguen ocupando un id; cuando el
+    vocabulario llega a compact_min_terms (y después, al doble de lo que quedó
+    en la última compactación) se renumeran sólo los términos que aún usa
+    alguna entrada, con sus conteos y su co-ocurrencia.
+    """
+
+    def __init__(self, max_posts: int = 50_000, compact_min_terms: int = VOCAB_COMPACT_MIN_TERMS):
+        self.max_posts = max_posts
+        self.compact_min_terms = compact_min_terms
+        self._compact_at = compact_min_terms
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # clave -> (token_ids, sentimiento)
+        self._vocab = {}
+        self._terms = []
+        self._window = pd.Series(dtype="int64")     # clave -> multiplicidad en la ventana
+        self._order = np.empty(0, dtype=np.uint64)  # claves en el orden del DataFrame
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._cooc = sp.csr_matrix((0, 0), dtype=np.int64)
+        self._last_df = None
+        self._version = 0
+        self._elements_cache = {}
+        self.stats = {"tokenized": 0, "reused": 0, "evicted": 0, "compactions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _term_ids(self, tokens: np.ndarray) -> np.ndarray:
+        codes, uniques = pd.factorize(tokens)
+        lookup = np.empty(len(uniques), dtype=np.int32)
+        for i, term in enumerate(uniques):
+            term_id = self._vocab.get(term)
+            if term_id is None:
+                term_id = self._vocab[term] = len(self._terms)
+                self._terms.append(term)
+            lookup[i] = term_id
+        return lookup[codes]
+
+    def _tokenize_new(self, df: pd.DataFrame, keys: np.ndarray, sents: np.ndarray):
+        is_new = ~pd.Series(keys).isin(self._entries.keys()).to_numpy()
+        _, first = np.unique(keys, return_index=True)
+        pos = np.sort(first[is_new[first]])
+        self.stats["reused"] += len(df) - len(pos)
+        if not len(pos):
+            return
+        self.stats["tokenized"] += len(pos)
+
+        frame = tokenize_posts(df.iloc[pos])
+        ids = self._term_ids(frame["token"].to_numpy()) if len(frame) else np.empty(0, dtype=np.int32)
+        per_post = np.split(ids, np.cumsum(np.bincount(frame["post"].to_numpy(), minlength=len(pos)))[:-1])
+        for p, token_ids in zip(pos, per_post):
+            self._entries[keys[p]] = (token_ids, sents[p])
+
+    def _apply(self, delta: pd.Series):
+        """Suma delta[clave] veces la contribución de cada post a los conteos."""
+        n_terms = len(self._terms)
+        if len(self._counts) < n_terms:
+            self._counts = np.concatenate([self._counts, np.zeros(n_terms - len(self._counts), dtype=np.int64)])
+            self._cooc.resize((n_terms, n_terms))
+        if delta.empty:
+            return
+
+        token_ids = [self._entries[k][0] for k in delta.index]
+        lengths = np.fromiter((len(t) for t in token_ids), dtype=np.int64, count=len(token_ids))
+        cols = np.concatenate(token_ids) if token_ids else np.empty(0, dtype=np.int32)
+        rows = np.repeat(np.arange(len(token_ids)), lengths)
+        weights = np.repeat(delta.to_numpy(), lengths)
+
+        self._counts += np.bincount(cols, weights=weights, minlength=n_terms).astype(np.int64)
+        X = sp.csr_matrix((np.ones(len(cols), dtype=np.int64), (rows, cols)), shape=(len(token_ids), n_terms))
+        self._cooc = (self._cooc + X.T @ sp.diags(delta.to_numpy()) @ X).tocsr()
+        self._cooc.eliminate_zeros()
+
+    def _evict(self):
+        # Las entradas de la ventana actual se movieron al final: al frente quedan
+        # las de posts que ya salieron, de la menos a la más recientemente usada.
+        while len(self._entries) > self.max_posts:
+            key = next(iter(self._entries))
+            if key in self._window.index:
+                break
+            del self._entries[key]
+            self.stats["evicted"] += 1
+
+    def _compact_vocab(self):
+        """Renumera los términos que usa alguna entrada y descarta el resto (lock tomado)."""
+        token_ids = [e[0] for e in self._entries.values()]
+        live = np.unique(np.concatenate(token_ids)) if token_ids else np.empty(0, dtype=np.int32)
+        if len(live) < len(self._terms):
+            remap = np.full(len(self._terms), -1, dtype=np.int32)
+            remap[live] = np.arange(len(live), dtype=np.int32)
+            for key, (ids, sent) in self._entries.items():
+                self._entries[key] = (remap[ids], sent)
+            self._terms = [self._terms[i] for i in live]
+            self._vocab = {term: i for i, term in enumerate(self._terms)}
+            # Un término sin entradas tiene conteo y co-ocurrencia cero: no se pierde nada
+            self._counts = self._counts[live]
+            self._cooc = self._cooc[live][:, live].tocsr()
+            self.stats["compactions"] += 1
+        self._compact_at = max(self.compact_min_terms, 2 * len(self._terms))
+
+    def update(self, df: pd.DataFrame):
+        """Sincroniza el índice con la ventana df (tokeniza sólo lo nuevo)."""
+        if df.empty or "Post" not in df.columns:
+            df = pd.DataFrame({"Post": pd.Series(dtype=object)})
+        with self._lock:
+            if df is self._last_df:
+                return
+            keys, sents = _post_keys(df)
+            self._last_df = df
+            if np.array_equal(keys, self._order):
+                return
+            self._tokenize_new(df, keys, sents)
+
+            window = pd.Series(keys).value_counts()
+            delta = window.sub(self._window, fill_value=0).astype(np.int64)
+            self._apply(delta[delta != 0])
+            self._window, self._order = window, keys
+            self._version += 1
+            self._elements_cache.clear()
+
+            for key in window.index:
+                self._entries.move_to_end(key)
+            self._evict()
+            if len(self._terms) >= self._compact_at:
+                self._compact_vocab()
+
+    def elements(self, top_n: int = TOP_WORDS_DEFAULT, min_weight: int = 1, top_k_edges: int = None):
+        """Elementos de Cytoscape de la ventana actual (mismo resultado que generar_grafo_palabras)."""
+        with self._lock:
+            cache_key = (top_n, min_weight, top_k_edges)
+            if cache_key not in self._elements_cache:
+                self._elements_cache[cache_key] = self._compute_elements(top_n, min_weight, top_k_edges)
+            return self._elements_cache[cache_key]
+
+    def _compute_elements(self, top_n, min_weight, top_k_edges):
+        """Recalcula los elementos desde el índice (se llama con el lock tomado)."""
+        if not len(self._order):
+            return []
+        entries = [self._entries[k] for k in self._order]
+        lengths = np.fromiter((len(e[0]) for e in entries), dtype=np.int64, count=len(entries))
+        if not lengths.sum():
+            return []
+        ids = np.concatenate([e[0] for e in entries])
+        token_sents = np.repeat(np.array([e[1] for e in entries], dtype=object), lengths)
+
+        # Empates de frecuencia por primera aparición, igual que la ruta completa
+        present, first = np.unique(ids, return_index=True)
+        counts = self._counts[present]
+        order = np.lexsort((first, -counts))[:top_n]
+        top_ids = present[order]
+        terms = np.asarray(self._terms, dtype=object)
+        top_terms = terms[top_ids].tolist()
+
+        mask = np.isin(ids, top_ids)
+        sent_modes = _sentiment_modes(pd.DataFrame({"token": terms[ids[mask]], "sent": token_sents[mask]}), top_terms)
+        a, b, w = prune_edges(self._cooc[top_ids][:, top_ids], min_weight=min_weight, top_k=top_k_edges)
+        top_arr = np.asarray(top_terms, dtype=object)
+        return build_elements(top_terms, counts[order], sent_modes, zip(top_arr[a], top_arr[b], w))